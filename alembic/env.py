@@ -1,9 +1,9 @@
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
-from db.database import Base
+from db.database import Base, profile
+from db.profile import create_profiled_engine
 from models.models import *
 
 from alembic import context
@@ -60,9 +60,10 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
+    # Mesmo perfil (pragmas, busy_timeout, echo) usado pela aplicação
+    connectable = create_profiled_engine(
+        config.get_main_option("sqlalchemy.url"),
+        profile,
         poolclass=pool.NullPool,
     )
 
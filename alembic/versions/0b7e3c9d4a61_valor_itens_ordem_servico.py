@@ -0,0 +1,39 @@
+"""valor itens ordem servico
+
+Revision ID: 0b7e3c9d4a61
+Revises: f1c4d8b6a295
+Create Date: 2026-10-18 19:40:12.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b7e3c9d4a61'
+down_revision: Union[str, None] = 'f1c4d8b6a295'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ordem_servico_servico', sa.Column('valor', sa.Float(), server_default='0', nullable=False))
+    op.add_column('ordem_servico_peca', sa.Column('valor_total', sa.Float(), server_default='0', nullable=False))
+
+    # Sem histórico de preços, os itens existentes recebem o preço atual do catálogo;
+    # scripts.repair_totais mostra as ordens abertas cujo subtotal não bate com esses valores
+    op.execute("""
+        UPDATE ordem_servico_servico SET
+            valor = (SELECT s.valor FROM servico s WHERE s.id = ordem_servico_servico.servico_id)
+    """)
+    op.execute("""
+        UPDATE ordem_servico_peca SET
+            valor_total = round((SELECT p.valor FROM peca p WHERE p.id = ordem_servico_peca.peca_id) * quantidade, 2)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('ordem_servico_peca', 'valor_total')
+    op.drop_column('ordem_servico_servico', 'valor')
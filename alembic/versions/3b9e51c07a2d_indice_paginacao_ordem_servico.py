@@ -0,0 +1,26 @@
+"""indice paginacao ordem servico
+
+Revision ID: 3b9e51c07a2d
+Revises: 8d770029d7d8
+Create Date: 2026-10-18 09:12:41.508213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e51c07a2d'
+down_revision: Union[str, None] = '8d770029d7d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_ordem_servico_data_abertura_id', 'ordem_servico', ['data_abertura', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ordem_servico_data_abertura_id', table_name='ordem_servico')
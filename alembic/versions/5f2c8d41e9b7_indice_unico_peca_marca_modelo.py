@@ -0,0 +1,26 @@
+"""indice unico peca marca modelo
+
+Revision ID: 5f2c8d41e9b7
+Revises: 3b9e51c07a2d
+Create Date: 2026-10-18 10:03:17.224915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2c8d41e9b7'
+down_revision: Union[str, None] = '3b9e51c07a2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('uq_peca_marca_modelo', 'peca', ['marca', 'modelo'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_peca_marca_modelo', table_name='peca')
@@ -0,0 +1,41 @@
+"""categoria itens ordem servico
+
+Revision ID: 6e2f9b8c3d15
+Revises: 0b7e3c9d4a61
+Create Date: 2026-10-18 20:25:48.911402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2f9b8c3d15'
+down_revision: Union[str, None] = '0b7e3c9d4a61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ordem_servico_servico', sa.Column('categoria', sa.String(), server_default='', nullable=False))
+    op.execute("""
+        UPDATE ordem_servico_servico SET
+            categoria = (SELECT s.categoria FROM servico s WHERE s.id = ordem_servico_servico.servico_id)
+    """)
+
+    # Os resumos por categoria passam a vir dos valores guardados nos itens, os mesmos de valor_servicos
+    op.execute("DELETE FROM relatorio_categoria")
+    op.execute("""
+        INSERT INTO relatorio_categoria (dia, mecanico_id, categoria, situacao, servicos, valor)
+        SELECT date(CASE WHEN os.situacao = 'concluida' THEN os.data_conclusao ELSE os.data_abertura END), os.mecanico_id,
+               oss.categoria, os.situacao, count(*), round(sum(oss.valor), 2)
+        FROM ordem_servico os
+        JOIN ordem_servico_servico oss ON oss.ordem_servico_id = os.id
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('ordem_servico_servico', 'categoria')
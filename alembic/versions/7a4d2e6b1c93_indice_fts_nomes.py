@@ -0,0 +1,54 @@
+"""indice fts nomes
+
+Revision ID: 7a4d2e6b1c93
+Revises: 5f2c8d41e9b7
+Create Date: 2026-10-18 11:20:54.317408
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a4d2e6b1c93'
+down_revision: Union[str, None] = '5f2c8d41e9b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABELAS = ("cliente", "mecanico")
+
+
+def upgrade() -> None:
+    # Índices FTS5 de conteúdo externo sobre nome/sobrenome, mantidos por triggers
+    for tabela in TABELAS:
+        fts = f"{tabela}_fts"
+        op.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5("
+            f"nome, sobrenome, content='{tabela}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabela} BEGIN "
+            f"INSERT INTO {fts}(rowid, nome, sobrenome) VALUES (new.id, new.nome, new.sobrenome); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabela} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, nome, sobrenome) VALUES ('delete', old.id, old.nome, old.sobrenome); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE OF nome, sobrenome ON {tabela} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, nome, sobrenome) VALUES ('delete', old.id, old.nome, old.sobrenome); "
+            f"INSERT INTO {fts}(rowid, nome, sobrenome) VALUES (new.id, new.nome, new.sobrenome); END"
+        )
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    for tabela in TABELAS:
+        fts = f"{tabela}_fts"
+        op.execute(f"DROP TRIGGER IF EXISTS {fts}_au")
+        op.execute(f"DROP TRIGGER IF EXISTS {fts}_ad")
+        op.execute(f"DROP TRIGGER IF EXISTS {fts}_ai")
+        op.execute(f"DROP TABLE IF EXISTS {fts}")
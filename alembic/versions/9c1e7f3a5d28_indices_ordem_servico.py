@@ -0,0 +1,46 @@
+"""indices ordem servico
+
+Revision ID: 9c1e7f3a5d28
+Revises: 7a4d2e6b1c93
+Create Date: 2026-10-18 12:41:09.662301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1e7f3a5d28'
+down_revision: Union[str, None] = '7a4d2e6b1c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Os índices ix_*_id duplicavam a chave primária (rowid)
+    op.drop_index('ix_cliente_id', table_name='cliente')
+    op.drop_index('ix_mecanico_id', table_name='mecanico')
+    op.drop_index('ix_peca_id', table_name='peca')
+    op.drop_index('ix_servico_id', table_name='servico')
+    op.drop_index('ix_ordem_servico_id', table_name='ordem_servico')
+
+    # Filtros do list por cliente/mecânico já ordenados por data, e as verificações do delete
+    op.create_index('ix_ordem_servico_cliente_id_data_abertura', 'ordem_servico', ['cliente_id', 'data_abertura', 'id'], unique=False)
+    op.create_index('ix_ordem_servico_mecanico_id_data_abertura', 'ordem_servico', ['mecanico_id', 'data_abertura', 'id'], unique=False)
+    op.create_index('ix_ordem_servico_peca_peca_id', 'ordem_servico_peca', ['peca_id'], unique=False)
+    op.create_index('ix_ordem_servico_servico_servico_id', 'ordem_servico_servico', ['servico_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ordem_servico_servico_servico_id', table_name='ordem_servico_servico')
+    op.drop_index('ix_ordem_servico_peca_peca_id', table_name='ordem_servico_peca')
+    op.drop_index('ix_ordem_servico_mecanico_id_data_abertura', table_name='ordem_servico')
+    op.drop_index('ix_ordem_servico_cliente_id_data_abertura', table_name='ordem_servico')
+
+    op.create_index(op.f('ix_ordem_servico_id'), 'ordem_servico', ['id'], unique=False)
+    op.create_index(op.f('ix_servico_id'), 'servico', ['id'], unique=False)
+    op.create_index(op.f('ix_peca_id'), 'peca', ['id'], unique=False)
+    op.create_index(op.f('ix_mecanico_id'), 'mecanico', ['id'], unique=False)
+    op.create_index(op.f('ix_cliente_id'), 'cliente', ['id'], unique=False)
@@ -0,0 +1,44 @@
+"""subtotais ordem servico
+
+Revision ID: b4e8a1d6f2c7
+Revises: 9c1e7f3a5d28
+Create Date: 2026-10-18 14:02:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8a1d6f2c7'
+down_revision: Union[str, None] = '9c1e7f3a5d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ordem_servico', sa.Column('valor_servicos', sa.Float(), server_default='0', nullable=False))
+    op.add_column('ordem_servico', sa.Column('valor_pecas', sa.Float(), server_default='0', nullable=False))
+
+    # Preenche os subtotais das ordens existentes a partir dos itens
+    op.execute("""
+        UPDATE ordem_servico SET
+            valor_servicos = round(coalesce((
+                SELECT sum(s.valor) FROM ordem_servico_servico oss
+                JOIN servico s ON s.id = oss.servico_id
+                WHERE oss.ordem_servico_id = ordem_servico.id
+            ), 0), 2),
+            valor_pecas = round(coalesce((
+                SELECT sum(p.valor * osp.quantidade) FROM ordem_servico_peca osp
+                JOIN peca p ON p.id = osp.peca_id
+                WHERE osp.ordem_servico_id = ordem_servico.id
+            ), 0), 2)
+    """)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('ordem_servico') as batch_op:
+        batch_op.drop_column('valor_pecas')
+        batch_op.drop_column('valor_servicos')
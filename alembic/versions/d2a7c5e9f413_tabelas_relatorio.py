@@ -0,0 +1,62 @@
+"""tabelas relatorio
+
+Revision ID: d2a7c5e9f413
+Revises: b4e8a1d6f2c7
+Create Date: 2026-10-18 15:20:44.507381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7c5e9f413'
+down_revision: Union[str, None] = 'b4e8a1d6f2c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('relatorio_ordem',
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('mecanico_id', sa.Integer(), nullable=False),
+    sa.Column('situacao', sa.String(), nullable=False),
+    sa.Column('ordens', sa.Integer(), nullable=False),
+    sa.Column('valor_servicos', sa.Float(), nullable=False),
+    sa.Column('valor_pecas', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('dia', 'mecanico_id', 'situacao')
+    )
+    op.create_table('relatorio_categoria',
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('mecanico_id', sa.Integer(), nullable=False),
+    sa.Column('categoria', sa.String(), nullable=False),
+    sa.Column('situacao', sa.String(), nullable=False),
+    sa.Column('servicos', sa.Integer(), nullable=False),
+    sa.Column('valor', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('dia', 'mecanico_id', 'categoria', 'situacao')
+    )
+
+    # Ordens concluídas contam no dia da conclusão; as pendentes, no dia da abertura
+    op.execute("""
+        INSERT INTO relatorio_ordem (dia, mecanico_id, situacao, ordens, valor_servicos, valor_pecas)
+        SELECT date(CASE WHEN situacao = 'concluida' THEN data_conclusao ELSE data_abertura END), mecanico_id, situacao,
+               count(*), round(sum(valor_servicos), 2), round(sum(valor_pecas), 2)
+        FROM ordem_servico
+        GROUP BY 1, 2, 3
+    """)
+    op.execute("""
+        INSERT INTO relatorio_categoria (dia, mecanico_id, categoria, situacao, servicos, valor)
+        SELECT date(CASE WHEN os.situacao = 'concluida' THEN os.data_conclusao ELSE os.data_abertura END), os.mecanico_id,
+               s.categoria, os.situacao, count(*), round(sum(s.valor), 2)
+        FROM ordem_servico os
+        JOIN ordem_servico_servico oss ON oss.ordem_servico_id = os.id
+        JOIN servico s ON s.id = oss.servico_id
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('relatorio_categoria')
+    op.drop_table('relatorio_ordem')
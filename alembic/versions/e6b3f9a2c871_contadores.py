@@ -0,0 +1,66 @@
+"""contadores
+
+Revision ID: e6b3f9a2c871
+Revises: d2a7c5e9f413
+Create Date: 2026-10-18 16:05:12.840126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b3f9a2c871'
+down_revision: Union[str, None] = 'd2a7c5e9f413'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABELAS = ("cliente", "mecanico", "peca", "servico", "ordem_servico")
+
+INCREMENTO = (
+    "INSERT INTO contador (chave, quantidade) VALUES ({chave}, {delta}) "
+    "ON CONFLICT(chave) DO UPDATE SET quantidade = quantidade + excluded.quantidade;"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE TABLE contador (chave TEXT PRIMARY KEY, quantidade INTEGER NOT NULL) WITHOUT ROWID")
+
+    # Contadores mantidos por triggers na mesma transação de cada INSERT/DELETE
+    for tabela in TABELAS:
+        op.execute(
+            f"CREATE TRIGGER {tabela}_contador_ai AFTER INSERT ON {tabela} BEGIN "
+            + INCREMENTO.format(chave=f"'{tabela}'", delta=1)
+            + (INCREMENTO.format(chave=f"'{tabela}:' || new.situacao", delta=1) if tabela == "ordem_servico" else "")
+            + " END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {tabela}_contador_ad AFTER DELETE ON {tabela} BEGIN "
+            + INCREMENTO.format(chave=f"'{tabela}'", delta=-1)
+            + (INCREMENTO.format(chave=f"'{tabela}:' || old.situacao", delta=-1) if tabela == "ordem_servico" else "")
+            + " END"
+        )
+        op.execute(f"INSERT INTO contador (chave, quantidade) SELECT '{tabela}', count(*) FROM {tabela}")
+
+    # Ordens também contam por situação
+    op.execute(
+        "CREATE TRIGGER ordem_servico_contador_au AFTER UPDATE OF situacao ON ordem_servico "
+        "WHEN old.situacao IS NOT new.situacao BEGIN "
+        + INCREMENTO.format(chave="'ordem_servico:' || old.situacao", delta=-1) + " "
+        + INCREMENTO.format(chave="'ordem_servico:' || new.situacao", delta=1)
+        + " END"
+    )
+    op.execute(
+        "INSERT INTO contador (chave, quantidade) "
+        "SELECT 'ordem_servico:' || situacao, count(*) FROM ordem_servico GROUP BY situacao"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS ordem_servico_contador_au")
+    for tabela in TABELAS:
+        op.execute(f"DROP TRIGGER IF EXISTS {tabela}_contador_ad")
+        op.execute(f"DROP TRIGGER IF EXISTS {tabela}_contador_ai")
+    op.execute("DROP TABLE IF EXISTS contador")
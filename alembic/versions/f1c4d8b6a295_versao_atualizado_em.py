@@ -0,0 +1,63 @@
+"""versao atualizado_em
+
+Revision ID: f1c4d8b6a295
+Revises: e6b3f9a2c871
+Create Date: 2026-10-18 17:12:30.274519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c4d8b6a295'
+down_revision: Union[str, None] = 'e6b3f9a2c871'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABELAS = ("cliente", "mecanico", "peca", "servico", "ordem_servico")
+ITENS = ("ordem_servico_peca", "ordem_servico_servico")
+
+INCREMENTO = "UPDATE {tabela} SET versao = versao + 1, atualizado_em = CURRENT_TIMESTAMP WHERE id = {id};"
+
+
+def upgrade() -> None:
+    for tabela in TABELAS:
+        op.add_column(tabela, sa.Column('versao', sa.Integer(), server_default='1', nullable=False))
+        op.add_column(tabela, sa.Column('atualizado_em', sa.DateTime(), nullable=True))
+        op.execute(f"UPDATE {tabela} SET atualizado_em = CURRENT_TIMESTAMP")
+
+        # Qualquer UPDATE incrementa a versão; o WHEN evita repetir quando a instrução já a alterou
+        op.execute(
+            f"CREATE TRIGGER {tabela}_versao_au AFTER UPDATE ON {tabela} "
+            f"WHEN new.versao = old.versao BEGIN {INCREMENTO.format(tabela=tabela, id='new.id')} END"
+        )
+
+    # Alterações nos itens incrementam a versão da ordem de serviço
+    for tabela in ITENS:
+        op.execute(
+            f"CREATE TRIGGER {tabela}_versao_ai AFTER INSERT ON {tabela} "
+            f"BEGIN {INCREMENTO.format(tabela='ordem_servico', id='new.ordem_servico_id')} END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {tabela}_versao_au AFTER UPDATE ON {tabela} "
+            f"BEGIN {INCREMENTO.format(tabela='ordem_servico', id='new.ordem_servico_id')} END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {tabela}_versao_ad AFTER DELETE ON {tabela} "
+            f"BEGIN {INCREMENTO.format(tabela='ordem_servico', id='old.ordem_servico_id')} END"
+        )
+
+
+def downgrade() -> None:
+    for tabela in ITENS:
+        op.execute(f"DROP TRIGGER IF EXISTS {tabela}_versao_ad")
+        op.execute(f"DROP TRIGGER IF EXISTS {tabela}_versao_au")
+        op.execute(f"DROP TRIGGER IF EXISTS {tabela}_versao_ai")
+
+    for tabela in TABELAS:
+        op.execute(f"DROP TRIGGER IF EXISTS {tabela}_versao_au")
+        op.drop_column(tabela, 'atualizado_em')
+        op.drop_column(tabela, 'versao')
@@ -0,0 +1,108 @@
+"""Compara a vazão de requisições concorrentes com DATABASE_MODE=sync e DATABASE_MODE=async.
+
+Cada modo roda em um subprocesso próprio, sobre um banco SQLite descartável, e a aplicação
+é exercitada em processo via httpx.ASGITransport com uma mistura de escritas e leituras.
+
+Uso: python -m benchmarks.async_throughput --requisicoes 2000 --concorrencia 50
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+def seed(session, quantidade: int = 50):
+  from models.models import Cliente, Mecanico
+
+  session.add_all([Cliente(nome=f"Cliente {i}", sobrenome="Silva", endereco="Rua A", telefone="119999") for i in range(quantidade)])
+  session.add_all([Mecanico(nome=f"Mecânico {i}", sobrenome="Souza", telefone="119999", email="m@oficina.com") for i in range(quantidade)])
+  session.commit()
+
+async def drive(app, requisicoes: int, concorrencia: int):
+  import httpx
+
+  fila = asyncio.Queue()
+  for i in range(requisicoes):
+    fila.put_nowait(i)
+
+  latencias = []
+  erros = 0
+
+  async def worker(client):
+    nonlocal erros
+    while not fila.empty():
+      i = fila.get_nowait()
+      inicio = time.perf_counter()
+      if i % 2 == 0:
+        response = await client.post("/ordens_servicos/", json={"cliente_id": i % 50 + 1, "mecanico_id": i % 50 + 1})
+      else:
+        response = await client.get("/ordens_servicos/", params={"limit": 20})
+      latencias.append(time.perf_counter() - inicio)
+      if response.status_code != 200:
+        erros += 1
+
+  transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+  async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+    inicio = time.perf_counter()
+    await asyncio.gather(*[worker(client) for _ in range(concorrencia)])
+    duracao = time.perf_counter() - inicio
+
+  from db.database import async_engine
+  if async_engine is not None:
+    await async_engine.dispose()
+
+  latencias.sort()
+  return {
+    "requisicoes": requisicoes,
+    "erros": erros,
+    "duracao_s": round(duracao, 3),
+    "req_por_s": round(requisicoes / duracao, 1),
+    "p50_ms": round(latencias[len(latencias) // 2] * 1000, 2),
+    "p95_ms": round(latencias[int(len(latencias) * 0.95)] * 1000, 2),
+  }
+
+def run_mode(args):
+  from db.database import Base, SessionLocal, engine
+  import models.models  # noqa: F401
+
+  # O log de DEBUG do aiosqlite registra cada operação e distorceria a comparação entre os modos
+  logging.disable(logging.DEBUG)
+  Base.metadata.create_all(engine)
+  with SessionLocal() as session:
+    seed(session)
+
+  from main import app
+
+  resultado = asyncio.run(drive(app, args.requisicoes, args.concorrencia))
+  print(json.dumps(resultado))
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--requisicoes", type=int, default=2000)
+  parser.add_argument("--concorrencia", type=int, default=50)
+  parser.add_argument("--modo", choices=["sync", "async"], help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  if args.modo:
+    return run_mode(args)
+
+  resultados = {}
+  for modo in ("sync", "async"):
+    with tempfile.TemporaryDirectory() as diretorio:
+      env = dict(os.environ, DATABASE_MODE=modo, DATABASE_URL=f"sqlite:///{diretorio}/bench.db")
+      saida = subprocess.run(
+        [sys.executable, "-m", "benchmarks.async_throughput", "--modo", modo,
+         "--requisicoes", str(args.requisicoes), "--concorrencia", str(args.concorrencia)],
+        env=env, capture_output=True, text=True, check=True,
+      )
+      resultados[modo] = json.loads(saida.stdout.strip().splitlines()[-1])
+
+  for modo, resultado in resultados.items():
+    print(f"{modo:>5}: {resultado['req_por_s']:>8} req/s | p50 {resultado['p50_ms']} ms | p95 {resultado['p95_ms']} ms | erros {resultado['erros']}")
+
+if __name__ == "__main__":
+  main()
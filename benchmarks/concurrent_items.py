@@ -0,0 +1,155 @@
+"""Dispara inclusões simultâneas das mesmas peças e serviços em uma ordem e confere que nada se perde.
+
+Vários subprocessos (como workers do uvicorn) sobre o mesmo banco SQLite descartável enviam, cada um com várias
+requisições em paralelo, POST /ordens_servicos/1/pecas para as mesmas peças e POST /ordens_servicos/1/servicos para
+os mesmos serviços. Ao final confere que:
+- a quantidade de cada peça é exatamente a soma das quantidades enviadas com resposta 200;
+- cada serviço foi incluído uma única vez, com exatamente um 200 e as demais respostas 400;
+- valor_pecas e valor_servicos da ordem batem com os itens, e nenhuma requisição terminou em 500.
+Sai com status 1 se alguma conferência falhar.
+
+Uso: python -m benchmarks.concurrent_items --processos 4 --requisicoes 200 --concorrencia 16
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+PECAS = 5
+SERVICOS = 10
+
+def prepare():
+  from datetime import datetime
+  from db.database import Base, SessionLocal, engine
+  from models.models import Cliente, Mecanico, OrdemServico, Peca, Servico
+
+  Base.metadata.create_all(engine)
+  with SessionLocal() as session:
+    session.add(Cliente(nome="Cliente", sobrenome="Silva", endereco="Rua A", telefone="119999"))
+    session.add(Mecanico(nome="Mecânico", sobrenome="Souza", telefone="119999", email="m@oficina.com"))
+    session.add_all([Peca(nome=f"Peça {i}", marca="Bosch", modelo=f"M{i}", valor=10.5 + i) for i in range(PECAS)])
+    session.add_all([Servico(nome=f"Serviço {i}", valor=50.25 + i, ativo=True, categoria="Manutenção") for i in range(SERVICOS)])
+    session.flush()
+    session.add(OrdemServico(cliente_id=1, mecanico_id=1, data_abertura=datetime(2025, 1, 1), situacao="pendente", valor_servicos=0, valor_pecas=0))
+    session.commit()
+
+async def drive(app, requisicoes: int, concorrencia: int, processo: int):
+  import httpx
+
+  fila = asyncio.Queue()
+  for i in range(requisicoes):
+    fila.put_nowait(i)
+
+  pecas = {}
+  servicos = {}
+  status = {}
+
+  async def worker(client):
+    while not fila.empty():
+      i = fila.get_nowait()
+      if i % 4 == 3:
+        servico_id = (i + processo) % SERVICOS + 1
+        response = await client.post("/ordens_servicos/1/servicos", params={"servico_id": servico_id})
+        if response.status_code == 200:
+          servicos[servico_id] = servicos.get(servico_id, 0) + 1
+      else:
+        peca_id = i % PECAS + 1
+        quantidade = i % 3 + 1
+        response = await client.post("/ordens_servicos/1/pecas", json={"peca_id": peca_id, "quantidade": quantidade})
+        if response.status_code == 200:
+          pecas[peca_id] = pecas.get(peca_id, 0) + quantidade
+      status[response.status_code] = status.get(response.status_code, 0) + 1
+
+  transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+  async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+    await asyncio.gather(*[worker(client) for _ in range(concorrencia)])
+
+  return {"pecas": pecas, "servicos": servicos, "status": status}
+
+def run_process(args):
+  logging.disable(logging.INFO)
+  from main import app
+
+  print(json.dumps(asyncio.run(drive(app, args.requisicoes, args.concorrencia, args.processo))))
+
+def somar(parciais: list, campo: str) -> dict:
+  total = {}
+  for parcial in parciais:
+    for chave, valor in parcial[campo].items():
+      total[int(chave)] = total.get(int(chave), 0) + valor
+  return total
+
+def check(banco: str, parciais: list) -> list:
+  pecas = somar(parciais, "pecas")
+  servicos = somar(parciais, "servicos")
+  status = somar(parciais, "status")
+
+  with sqlite3.connect(banco) as conexao:
+    gravadas = dict(conexao.execute("SELECT peca_id, quantidade FROM ordem_servico_peca WHERE ordem_servico_id = 1"))
+    incluidos = [servico_id for servico_id, in conexao.execute("SELECT servico_id FROM ordem_servico_servico WHERE ordem_servico_id = 1")]
+    valor_servicos, valor_pecas = conexao.execute("SELECT valor_servicos, valor_pecas FROM ordem_servico WHERE id = 1").fetchone()
+    esperado_pecas, = conexao.execute(
+      "SELECT coalesce(sum(p.valor * i.quantidade), 0) FROM ordem_servico_peca i JOIN peca p ON p.id = i.peca_id WHERE i.ordem_servico_id = 1"
+    ).fetchone()
+    esperado_servicos, = conexao.execute(
+      "SELECT coalesce(sum(s.valor), 0) FROM ordem_servico_servico i JOIN servico s ON s.id = i.servico_id WHERE i.ordem_servico_id = 1"
+    ).fetchone()
+
+  falhas = []
+  if status.get(500):
+    falhas.append(f"{status[500]} respostas 500")
+  if gravadas != pecas:
+    falhas.append(f"quantidades gravadas {gravadas} != enviadas com 200 {pecas}")
+  if sorted(incluidos) != sorted(servicos) or any(vezes != 1 for vezes in servicos.values()):
+    falhas.append(f"serviços gravados {sorted(incluidos)}, respostas 200 por serviço {servicos}")
+  if abs(valor_pecas - esperado_pecas) > 0.005:
+    falhas.append(f"valor_pecas {valor_pecas} != {esperado_pecas}")
+  if abs(valor_servicos - esperado_servicos) > 0.005:
+    falhas.append(f"valor_servicos {valor_servicos} != {esperado_servicos}")
+
+  print(f"status {status} | peças {gravadas} | serviços {len(incluidos)} | valor_pecas {valor_pecas} | valor_servicos {valor_servicos}")
+  return falhas
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--processos", type=int, default=4)
+  parser.add_argument("--requisicoes", type=int, default=200, help="por processo")
+  parser.add_argument("--concorrencia", type=int, default=16, help="requisições simultâneas por processo")
+  parser.add_argument("--processo", type=int, help=argparse.SUPPRESS)
+  parser.add_argument("--preparar", action="store_true", help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  if args.preparar:
+    return prepare()
+  if args.processo is not None:
+    return run_process(args)
+
+  with tempfile.TemporaryDirectory() as diretorio:
+    banco = f"{diretorio}/bench.db"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{banco}")
+    comando = [sys.executable, "-m", "benchmarks.concurrent_items"]
+    subprocess.run(comando + ["--preparar"], env=env, check=True)
+
+    processos = [
+      subprocess.Popen(
+        comando + ["--processo", str(indice), "--requisicoes", str(args.requisicoes), "--concorrencia", str(args.concorrencia)],
+        env=env, stdout=subprocess.PIPE, text=True,
+      )
+      for indice in range(args.processos)
+    ]
+    parciais = [json.loads(processo.communicate()[0].strip().splitlines()[-1]) for processo in processos]
+    falhas = check(banco, parciais)
+
+  for falha in falhas:
+    print(f"FALHA: {falha}")
+  if falhas:
+    sys.exit(1)
+  print("ok")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,171 @@
+"""Compara a vazão de escritas concorrentes com e sem a fila de escrita com commit em grupo (DB_WRITE_QUEUE).
+
+Cada configuração roda em --processos subprocessos sobre o mesmo banco SQLite descartável (como workers do uvicorn),
+e cada um exercita a aplicação em processo via httpx.ASGITransport só com escritas: abertura de ordens, inclusão de serviços e, a cada 20
+requisições, uma ordem com cliente inexistente (404) para conferir que o erro volta só para quem o causou.
+Ao final confere que as ordens gravadas batem com as respostas 200.
+
+Uso: python -m benchmarks.group_commit --requisicoes 4000 --concorrencia 32 --synchronous FULL [--processos 4]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+def seed(session, quantidade: int = 50):
+  from models.models import Cliente, Mecanico, OrdemServico, Servico
+  from datetime import datetime
+
+  session.add_all([Cliente(nome=f"Cliente {i}", sobrenome="Silva", endereco="Rua A", telefone="119999") for i in range(quantidade)])
+  session.add_all([Mecanico(nome=f"Mecânico {i}", sobrenome="Souza", telefone="119999", email="m@oficina.com") for i in range(quantidade)])
+  session.add_all([Servico(nome=f"Serviço {i}", valor=50 + i, ativo=True, categoria="Manutenção") for i in range(quantidade)])
+  session.flush()
+  session.add_all([
+    OrdemServico(cliente_id=i + 1, mecanico_id=i + 1, data_abertura=datetime(2025, 1, 1), situacao="pendente", valor_servicos=0, valor_pecas=0)
+    for i in range(quantidade)
+  ])
+  session.commit()
+
+async def drive(app, requisicoes: int, concorrencia: int, deslocamento: int = 0):
+  import httpx
+
+  fila = asyncio.Queue()
+  for i in range(deslocamento, deslocamento + requisicoes):
+    fila.put_nowait(i)
+
+  latencias = []
+  status = {}
+  criadas = 0
+
+  async def worker(client):
+    nonlocal criadas
+    while not fila.empty():
+      i = fila.get_nowait()
+      inicio = time.perf_counter()
+      if i % 20 == 0:
+        response = await client.post("/ordens_servicos/", json={"cliente_id": 999999, "mecanico_id": 1})
+      elif i % 2 == 0:
+        response = await client.post("/ordens_servicos/", json={"cliente_id": i % 50 + 1, "mecanico_id": i % 50 + 1})
+        criadas += response.status_code == 200
+      else:
+        # Pares (ordem, serviço) distintos até 5000 requisições
+        response = await client.post(f"/ordens_servicos/{i // 2 % 50 + 1}/servicos", params={"servico_id": i // 100 % 50 + 1})
+      latencias.append(time.perf_counter() - inicio)
+      status[response.status_code] = status.get(response.status_code, 0) + 1
+
+  transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+  async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+    inicio = time.perf_counter()
+    await asyncio.gather(*[worker(client) for _ in range(concorrencia)])
+    duracao = time.perf_counter() - inicio
+
+  latencias.sort()
+  return {
+    "requisicoes": requisicoes,
+    "status": status,
+    "criadas": criadas,
+    "duracao_s": round(duracao, 3),
+    "req_por_s": round(requisicoes / duracao, 1),
+    "p50_ms": round(latencias[len(latencias) // 2] * 1000, 2),
+    "p95_ms": round(latencias[int(len(latencias) * 0.95)] * 1000, 2),
+    "p99_ms": round(latencias[int(len(latencias) * 0.99)] * 1000, 2),
+  }
+
+def prepare():
+  from db.database import Base, SessionLocal, engine
+
+  import models.models  # noqa: F401
+  Base.metadata.create_all(engine)
+  with SessionLocal() as session:
+    seed(session)
+
+def run_config(args):
+  from db.database import writer
+
+  logging.disable(logging.INFO)
+  from main import app
+
+  resultado = asyncio.run(drive(app, args.requisicoes, args.concorrencia, args.deslocamento))
+  if writer is not None:
+    writer.stop()
+    resultado["fila"] = writer.stats()
+  print(json.dumps(resultado))
+
+def run_processes(config: str, args) -> dict:
+  # Os processos escrevem no mesmo arquivo, como workers do uvicorn; a fila agrupa as escritas dentro de cada processo
+  with tempfile.TemporaryDirectory(dir=args.diretorio) as diretorio:
+    env = dict(
+      os.environ, DATABASE_URL=f"sqlite:///{diretorio}/bench.db", DB_SYNCHRONOUS=args.synchronous,
+      DB_WRITE_QUEUE="on" if config == "fila" else "off",
+    )
+    comando = [sys.executable, "-m", "benchmarks.group_commit"]
+    subprocess.run(comando + ["--preparar"], env=env, check=True)
+
+    por_processo = args.requisicoes // args.processos
+    inicio = time.perf_counter()
+    processos = [
+      subprocess.Popen(
+        comando + [
+          "--config", config, "--requisicoes", str(por_processo), "--concorrencia", str(args.concorrencia),
+          "--deslocamento", str(indice * por_processo),
+        ],
+        env=env, stdout=subprocess.PIPE, text=True,
+      )
+      for indice in range(args.processos)
+    ]
+    parciais = [json.loads(processo.communicate()[0].strip().splitlines()[-1]) for processo in processos]
+    duracao = time.perf_counter() - inicio
+
+    with sqlite3.connect(f"{diretorio}/bench.db") as conexao:
+      gravadas = conexao.execute("SELECT count(*) FROM ordem_servico").fetchone()[0] - 50
+
+  status = {}
+  for parcial in parciais:
+    for codigo, quantidade in parcial["status"].items():
+      status[codigo] = status.get(codigo, 0) + quantidade
+  total = por_processo * args.processos
+  return {
+    "req_por_s": round(total / duracao, 1),
+    "p50_ms": max(parcial["p50_ms"] for parcial in parciais),
+    "p95_ms": max(parcial["p95_ms"] for parcial in parciais),
+    "p99_ms": max(parcial["p99_ms"] for parcial in parciais),
+    "status": status,
+    "criadas": sum(parcial["criadas"] for parcial in parciais),
+    "ordens_gravadas": gravadas,
+    "fila": [parcial["fila"] for parcial in parciais if "fila" in parcial],
+  }
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--requisicoes", type=int, default=4000, help="total, dividido entre os processos")
+  parser.add_argument("--concorrencia", type=int, default=32, help="requisições simultâneas por processo")
+  parser.add_argument("--processos", type=int, default=1)
+  parser.add_argument("--synchronous", default="FULL", help="PRAGMA synchronous dos dois lados (FULL faz fsync a cada commit)")
+  parser.add_argument("--diretorio", help="onde criar o banco (o custo do fsync depende do disco)")
+  parser.add_argument("--config", choices=["direto", "fila"], help=argparse.SUPPRESS)
+  parser.add_argument("--preparar", action="store_true", help=argparse.SUPPRESS)
+  parser.add_argument("--deslocamento", type=int, default=0, help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  if args.preparar:
+    return prepare()
+  if args.config:
+    return run_config(args)
+
+  for config in ("direto", "fila"):
+    resultado = run_processes(config, args)
+    print(
+      f"{config:>6}: {resultado['req_por_s']:>8} req/s | p50 {resultado['p50_ms']} ms | p95 {resultado['p95_ms']} ms | "
+      f"p99 {resultado['p99_ms']} ms | status {resultado['status']} | ordens {resultado['criadas']}/{resultado['ordens_gravadas']}"
+    )
+    for estatisticas in resultado["fila"]:
+      print(f"        {estatisticas}")
+
+if __name__ == "__main__":
+  main()
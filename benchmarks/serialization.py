@@ -0,0 +1,93 @@
+"""Mede o custo de CPU por requisição dos GETs que devolvem páginas de 100 itens e a ordem completa.
+
+Roda a aplicação em processo (fastapi.testclient) sobre um banco SQLite descartável com dados de exemplo
+e reporta, por endpoint, o tempo de CPU e o tempo total médio por requisição e o tamanho da resposta.
+
+Uso: python -m benchmarks.serialization --repeticoes 200
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+ENDPOINTS = [
+  "/clientes/?limit=100",
+  "/pecas/?limit=100",
+  "/ordens_servicos/?limit=100",
+  "/ordens_servicos/1",
+]
+
+def seed(session, quantidade: int = 100):
+  from datetime import datetime, timedelta
+  from models.models import Cliente, Mecanico, OrdemServico, OrdemServicoPeca, OrdemServicoServico, Peca, Servico
+
+  session.add_all([Cliente(nome=f"Cliente {i}", sobrenome="Silva", endereco="Rua A, 100", telefone="119999") for i in range(quantidade)])
+  session.add_all([Mecanico(nome=f"Mecânico {i}", sobrenome="Souza", telefone="119999", email="m@oficina.com") for i in range(quantidade)])
+  session.add_all([Peca(nome=f"Peça {i}", marca="Bosch", modelo=f"M{i}", valor=10 + i) for i in range(quantidade)])
+  session.add_all([Servico(nome=f"Serviço {i}", valor=50 + i, ativo=True, categoria="Manutenção") for i in range(quantidade)])
+  session.flush()
+
+  inicio = datetime(2025, 1, 1)
+  for i in range(quantidade):
+    session.add(OrdemServico(
+      cliente_id=i + 1, mecanico_id=i + 1, data_abertura=inicio + timedelta(hours=i), situacao="pendente",
+      valor_servicos=0, valor_pecas=0,
+    ))
+  session.flush()
+  # A ordem 1 tem uma lista de itens do tamanho de uma página
+  session.add_all([OrdemServicoPeca(ordem_servico_id=1, peca_id=i + 1, quantidade=2) for i in range(quantidade // 2)])
+  session.add_all([OrdemServicoServico(ordem_servico_id=1, servico_id=i + 1) for i in range(quantidade // 2)])
+  session.commit()
+
+def medir(client, url: str, repeticoes: int) -> dict:
+  for _ in range(10):
+    client.get(url)
+
+  cpu = time.process_time()
+  total = time.perf_counter()
+  for _ in range(repeticoes):
+    response = client.get(url)
+  cpu = time.process_time() - cpu
+  total = time.perf_counter() - total
+
+  return {
+    "status": response.status_code,
+    "cpu_ms": round(cpu / repeticoes * 1000, 3),
+    "total_ms": round(total / repeticoes * 1000, 3),
+    "bytes": len(response.content),
+  }
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--repeticoes", type=int, default=200)
+  parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+  args = parser.parse_args()
+
+  diretorio = tempfile.mkdtemp()
+  os.environ["DATABASE_URL"] = f"sqlite:///{diretorio}/bench.db"
+  logging.disable(logging.INFO)
+
+  from fastapi.testclient import TestClient
+  from db.database import Base, SessionLocal, engine
+  import models.models  # noqa: F401
+
+  Base.metadata.create_all(engine)
+  with SessionLocal() as session:
+    seed(session)
+
+  from main import app
+
+  with TestClient(app) as client:
+    resultados = {url: medir(client, url, args.repeticoes) for url in ENDPOINTS}
+
+  if args.json:
+    print(json.dumps(resultados))
+    return
+
+  for url, resultado in resultados.items():
+    print(f"{url:<30} cpu {resultado['cpu_ms']:>8} ms | total {resultado['total_ms']:>8} ms | {resultado['bytes']:>7} bytes | {resultado['status']}")
+
+if __name__ == "__main__":
+  main()
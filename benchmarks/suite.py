@@ -0,0 +1,367 @@
+"""Suíte de benchmarks de todos os routers da aplicação sobre um banco gerado no volume pedido.
+
+Gera (ou reaproveita, com --banco) um banco com scripts.seed, copia para um diretório temporário e exercita
+em processo (fastapi.testclient) as listagens com cada filtro, os GETs por id, as contagens, as exportações, os
+relatórios e as mutações, inclusive a sequência completa de uma ordem (itens, atualização, conclusão e remoção).
+Para cada cenário reporta p50/p95/p99, requisições por segundo e consultas SQL por requisição.
+
+--saida grava o resultado em JSON; --baseline compara com um resultado salvo (sem caminho, o versionado em
+benchmarks/baselines/<escala>.json) e sai com status 1 se algum cenário ficou mais lento além da tolerância, passou a
+fazer mais consultas ou respondeu com um status inesperado. Latências só são comparadas com um baseline medido na
+mesma plataforma e versão do Python; consultas por requisição e status, sempre.
+
+Uso:
+  python -m benchmarks.suite --escala media --banco /tmp/bench-media.db --saida atual.json
+  python -m benchmarks.suite --escala media --banco /tmp/bench-media.db --baseline atual.json
+  python -m benchmarks.suite --baseline
+  python -m benchmarks.suite --cenarios ordens --repeticoes 500
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+@dataclass
+class Cenario:
+  nome: str
+  metodo: str
+  # (k, ctx) -> (url, kwargs do client.request); k vai de 0 a aquecimento + repeticoes - 1
+  requisicao: callable
+  esperado: tuple = (200,)
+  # (k, ctx, response) -> None; guarda ids criados, cursores etc. para os cenários seguintes
+  depois: callable = None
+  preparar: callable = None
+
+# Resultados versionados usados por --baseline sem caminho, um por escala
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines")
+
+# Cenários que dependem dos ids criados por "<recurso>.criar"
+DEPENDENTES = {"atualizar", "remover", "adicionar_peca", "adicionar_servico", "itens", "remover_peca", "remover_servico", "concluir"}
+
+def cliente_payload(k: int) -> dict:
+  return {"nome": f"Bench {k}", "sobrenome": "Silva", "endereco": f"Rua B, {k}", "telefone": "11 90000-0000"}
+
+def mecanico_payload(k: int) -> dict:
+  return {"nome": f"Bench {k}", "sobrenome": "Souza", "telefone": "11 80000-0000", "email": f"bench{k}@oficina.com"}
+
+def guardar(chave: str):
+  def depois(k, ctx, response):
+    if response.status_code == 200:
+      ctx.setdefault(chave, []).append(response.json()["id"])
+  return depois
+
+def seguir_cursor(chave: str):
+  def depois(k, ctx, response):
+    ctx[chave] = response.json()["pagination"]["next_cursor"] if response.status_code == 200 else None
+  return depois
+
+def com_cursor(url: str, chave: str):
+  def requisicao(k, ctx):
+    cursor = ctx.get(chave)
+    return url, {"params": {"limit": 20, **({"cursor": cursor} if cursor else {})}}
+  return requisicao
+
+def etag(url: str, chave: str):
+  def preparar(client, ctx):
+    ctx[chave] = client.get(url).headers["etag"]
+  return preparar
+
+def nomes(recurso: str, chave: str):
+  # Nomes completos reais do banco gerado, para os filtros por nome
+  def preparar(client, ctx):
+    ctx[chave] = [f"{item['nome']} {item['sobrenome']}" for item in client.get(f"/{recurso}/", params={"limit": 100}).json()[recurso]]
+  return preparar
+
+def peca_ids(k: int, ctx) -> tuple:
+  # Duas peças e dois serviços distintos por ordem criada (uma ordem por valor de k)
+  pecas, servicos = ctx["quantidades"]["pecas"], ctx["quantidades"]["servicos"]
+  return (k * 7) % pecas + 1, (k * 7 + 1) % pecas + 1, k % servicos + 1, (k + 1) % servicos + 1
+
+def ordem(k: int, ctx) -> int:
+  return ctx["ordens_criadas"][k]
+
+def cenarios(quantidades: dict) -> list:
+  clientes, mecanicos, ordens = quantidades["clientes"], quantidades["mecanicos"], quantidades["ordens"]
+  pecas, servicos = quantidades["pecas"], quantidades["servicos"]
+  aleatorio = lambda k, total: (k * 7919) % total + 1
+  periodo = {"data_abertura_inicio": "2024-03-01T00:00:00", "data_abertura_fim": "2024-03-08T00:00:00"}
+
+  lista = [Cenario("root", "GET", lambda k, ctx: ("/", {}))]
+
+  for recurso, total, payload in (("clientes", clientes, cliente_payload), ("mecanicos", mecanicos, mecanico_payload)):
+    lista += [
+      Cenario(f"{recurso}.listar", "GET", lambda k, ctx, r=recurso: (f"/{r}/", {"params": {"skip": k % 50 * 20, "limit": 20}})),
+      Cenario(f"{recurso}.listar_cursor", "GET", com_cursor(f"/{recurso}/", f"cursor_{recurso}"), depois=seguir_cursor(f"cursor_{recurso}")),
+      Cenario(f"{recurso}.buscar", "GET", lambda k, ctx, r=recurso, t=total: (f"/{r}/{aleatorio(k, t)}", {})),
+      Cenario(
+        f"{recurso}.buscar_304", "GET", lambda k, ctx, r=recurso: (f"/{r}/1", {"headers": {"If-None-Match": ctx[f"etag_{r}"]}}),
+        esperado=(304,), preparar=etag(f"/{recurso}/1", f"etag_{recurso}"),
+      ),
+      Cenario(f"{recurso}.contar", "GET", lambda k, ctx, r=recurso: (f"/{r}/count", {})),
+      Cenario(f"{recurso}.criar", "POST", lambda k, ctx, r=recurso, p=payload: (f"/{r}/", {"json": p(k)}), depois=guardar(f"{recurso}_criados")),
+      Cenario(f"{recurso}.bulk_100", "POST", lambda k, ctx, r=recurso, p=payload: (f"/{r}/bulk", {"json": [p(k * 100 + j) for j in range(100)]})),
+      Cenario(f"{recurso}.atualizar", "PUT", lambda k, ctx, r=recurso, p=payload: (f"/{r}/{ctx[f'{r}_criados'][k]}", {"json": p(-k)})),
+      Cenario(f"{recurso}.remover", "DELETE", lambda k, ctx, r=recurso: (f"/{r}/{ctx[f'{r}_criados'][k]}", {})),
+    ]
+
+  csv_pecas = "nome,marca,modelo,valor\n" + "".join(f"Peça importada {j},Bench,I-{j},{10 + j}\n" for j in range(100))
+  lista += [
+    Cenario("pecas.listar", "GET", lambda k, ctx: ("/pecas/", {"params": {"skip": k % 50 * 20, "limit": 20}})),
+    Cenario("pecas.buscar", "GET", lambda k, ctx: (f"/pecas/{aleatorio(k, pecas)}", {})),
+    Cenario("pecas.contar", "GET", lambda k, ctx: ("/pecas/count", {})),
+    Cenario("pecas.cache", "GET", lambda k, ctx: ("/pecas/cache", {})),
+    Cenario("pecas.criar", "POST", lambda k, ctx: ("/pecas/", {"json": {"nome": f"Peça {k}", "marca": "Bench", "modelo": f"C-{k}", "valor": 10}}), depois=guardar("pecas_criadas")),
+    Cenario("pecas.bulk_100", "POST", lambda k, ctx: ("/pecas/bulk", {"json": [
+      {"nome": f"Peça {k}-{j}", "marca": "Bench", "modelo": f"B-{k}-{j}", "valor": 10} for j in range(100)
+    ]})),
+    Cenario("pecas.importar_100", "POST", lambda k, ctx: ("/pecas/import", {"content": csv_pecas, "headers": {"Content-Type": "text/csv"}})),
+    Cenario("pecas.atualizar", "PUT", lambda k, ctx: (f"/pecas/{ctx['pecas_criadas'][k]}", {"json": {"nome": f"Peça {k}", "marca": "Bench", "modelo": f"C-{k}", "valor": 12}})),
+    Cenario("pecas.remover", "DELETE", lambda k, ctx: (f"/pecas/{ctx['pecas_criadas'][k]}", {})),
+
+    Cenario("servicos.listar", "GET", lambda k, ctx: ("/servicos/", {"params": {"skip": k % 10 * 10, "limit": 20}})),
+    Cenario("servicos.buscar", "GET", lambda k, ctx: (f"/servicos/{aleatorio(k, servicos)}", {})),
+    Cenario("servicos.contar", "GET", lambda k, ctx: ("/servicos/count", {})),
+    Cenario("servicos.cache", "GET", lambda k, ctx: ("/servicos/cache", {})),
+    Cenario("servicos.criar", "POST", lambda k, ctx: ("/servicos/", {"json": {"nome": f"Serviço {k}", "valor": 80, "categoria": "Bench"}}), depois=guardar("servicos_criados")),
+    Cenario("servicos.bulk_100", "POST", lambda k, ctx: ("/servicos/bulk", {"json": [{"nome": f"Serviço {k}-{j}", "valor": 80, "categoria": "Bench"} for j in range(100)]})),
+    Cenario("servicos.atualizar", "PUT", lambda k, ctx: (f"/servicos/{ctx['servicos_criados'][k]}", {"json": {"nome": f"Serviço {k}", "valor": 90, "ativo": True, "categoria": "Bench"}})),
+    Cenario("servicos.remover", "DELETE", lambda k, ctx: (f"/servicos/{ctx['servicos_criados'][k]}", {})),
+  ]
+
+  filtros = {
+    "mecanico": (lambda k, ctx: {"mecanico_id": aleatorio(k, mecanicos)}, None),
+    "cliente": (lambda k, ctx: {"cliente_id": aleatorio(k, clientes)}, None),
+    "nome_mecanico": (
+      lambda k, ctx: {"nome_mecanico": ctx["nomes_mecanicos"][k % len(ctx["nomes_mecanicos"])]}, nomes("mecanicos", "nomes_mecanicos"),
+    ),
+    "nome_cliente": (lambda k, ctx: {"nome_cliente": ctx["nomes_clientes"][k % len(ctx["nomes_clientes"])]}, nomes("clientes", "nomes_clientes")),
+    "periodo": (lambda k, ctx: periodo, None),
+    "todos": (lambda k, ctx: {"mecanico_id": aleatorio(k, mecanicos), "nome_cliente": "Silva", **periodo}, None),
+  }
+  lista += [
+    Cenario("ordens.listar", "GET", lambda k, ctx: ("/ordens_servicos/", {"params": {"skip": k % 50 * 20, "limit": 20}})),
+    Cenario("ordens.listar_cursor", "GET", com_cursor("/ordens_servicos/", "cursor_ordens"), depois=seguir_cursor("cursor_ordens")),
+    *[
+      Cenario(f"ordens.listar_{nome}", "GET", lambda k, ctx, f=filtro: ("/ordens_servicos/", {"params": {"limit": 20, **f(k, ctx)}}), preparar=preparo)
+      for nome, (filtro, preparo) in filtros.items()
+    ],
+    Cenario("ordens.buscar", "GET", lambda k, ctx: (f"/ordens_servicos/{aleatorio(k, ordens)}", {})),
+    Cenario(
+      "ordens.buscar_304", "GET", lambda k, ctx: ("/ordens_servicos/1", {"headers": {"If-None-Match": ctx["etag_ordem"]}}),
+      esperado=(304,), preparar=etag("/ordens_servicos/1", "etag_ordem"),
+    ),
+    Cenario("ordens.contar", "GET", lambda k, ctx: ("/ordens_servicos/count", {})),
+    Cenario("ordens.exportar_cliente", "GET", lambda k, ctx: ("/ordens_servicos/export", {"params": {"cliente_id": aleatorio(k, clientes)}})),
+    Cenario("ordens.exportar_csv_cliente", "GET", lambda k, ctx: ("/ordens_servicos/export", {"params": {"cliente_id": aleatorio(k, clientes), "formato": "csv"}})),
+    Cenario(
+      "ordens.criar", "POST", lambda k, ctx: ("/ordens_servicos/", {"json": {"cliente_id": aleatorio(k, clientes), "mecanico_id": aleatorio(k, mecanicos)}}),
+      depois=guardar("ordens_criadas"),
+    ),
+    Cenario("ordens.adicionar_peca", "POST", lambda k, ctx: (f"/ordens_servicos/{ordem(k, ctx)}/pecas", {"json": {"peca_id": peca_ids(k, ctx)[0], "quantidade": 2}})),
+    Cenario("ordens.adicionar_servico", "POST", lambda k, ctx: (f"/ordens_servicos/{ordem(k, ctx)}/servicos", {"params": {"servico_id": peca_ids(k, ctx)[2]}})),
+    Cenario("ordens.itens", "POST", lambda k, ctx: (f"/ordens_servicos/{ordem(k, ctx)}/itens", {"json": [
+      {"acao": "adicionar", "tipo": "peca", "id": peca_ids(k, ctx)[1], "quantidade": 2},
+      {"acao": "adicionar", "tipo": "servico", "id": peca_ids(k, ctx)[3]},
+      {"acao": "adicionar", "tipo": "peca", "id": peca_ids(k, ctx)[0], "quantidade": 1},
+    ]})),
+    Cenario("ordens.remover_peca", "DELETE", lambda k, ctx: (f"/ordens_servicos/{ordem(k, ctx)}/pecas/{peca_ids(k, ctx)[0]}", {})),
+    Cenario("ordens.remover_servico", "DELETE", lambda k, ctx: (f"/ordens_servicos/{ordem(k, ctx)}/servicos/{peca_ids(k, ctx)[2]}", {})),
+    Cenario("ordens.atualizar", "PUT", lambda k, ctx: (f"/ordens_servicos/{ordem(k, ctx)}", {"json": {"cliente_id": aleatorio(k + 1, clientes), "mecanico_id": aleatorio(k + 1, mecanicos)}})),
+    Cenario("ordens.concluir", "PATCH", lambda k, ctx: (f"/ordens_servicos/{ordem(k, ctx)}/concluir", {})),
+    Cenario("ordens.remover", "DELETE", lambda k, ctx: (f"/ordens_servicos/{ordem(k, ctx)}", {})),
+
+    Cenario("relatorios.receita_mecanicos", "GET", lambda k, ctx: ("/relatorios/receita/mecanicos", {"params": {"inicio": "2024-01-01", "fim": "2024-06-30"}})),
+    Cenario("relatorios.receita_categorias", "GET", lambda k, ctx: ("/relatorios/receita/categorias", {"params": {"inicio": "2024-01-01", "fim": "2024-06-30"}})),
+    Cenario("relatorios.receita_mensal", "GET", lambda k, ctx: ("/relatorios/receita/mensal", {"params": {"mecanico_id": aleatorio(k, mecanicos)}})),
+    Cenario("relatorios.ordens_situacoes", "GET", lambda k, ctx: ("/relatorios/ordens/situacoes", {})),
+  ]
+  return lista
+
+def percentil(valores: list, p: float) -> float:
+  # Nearest-rank sobre a lista já ordenada
+  return valores[max(math.ceil(p * len(valores)) - 1, 0)]
+
+def medir(client, cenario: Cenario, ctx: dict, aquecimento: int, repeticoes: int, consultas: list) -> dict:
+  if cenario.preparar:
+    cenario.preparar(client, ctx)
+
+  latencias = []
+  status = {}
+  queries = 0
+  inicio_total = None
+  for k in range(aquecimento + repeticoes):
+    url, kwargs = cenario.requisicao(k, ctx)
+    if k == aquecimento:
+      inicio_total = time.perf_counter()
+    antes = consultas[0]
+    inicio = time.perf_counter()
+    response = client.request(cenario.metodo, url, **kwargs)
+    duracao = time.perf_counter() - inicio
+    if cenario.depois:
+      cenario.depois(k, ctx, response)
+    if k < aquecimento:
+      continue
+    latencias.append(duracao * 1000)
+    queries += consultas[0] - antes
+    status[str(response.status_code)] = status.get(str(response.status_code), 0) + 1
+
+  total = time.perf_counter() - inicio_total
+  latencias.sort()
+  return {
+    "requisicoes": repeticoes,
+    "req_por_s": round(repeticoes / total, 1),
+    "media_ms": round(sum(latencias) / len(latencias), 3),
+    "p50_ms": round(percentil(latencias, 0.50), 3),
+    "p95_ms": round(percentil(latencias, 0.95), 3),
+    "p99_ms": round(percentil(latencias, 0.99), 3),
+    "queries_por_req": round(queries / repeticoes, 2),
+    "status": status,
+    "erros": sum(quantidade for codigo, quantidade in status.items() if int(codigo) not in cenario.esperado),
+  }
+
+def preparar_banco(args, quantidades: dict) -> str:
+  # O banco gerado pode ser reaproveitado entre execuções (--banco); cada execução trabalha numa cópia
+  meta = dict(quantidades, seed=args.seed)
+  origem = args.banco
+  if origem and os.path.exists(origem):
+    # O .json ao lado do banco guarda as quantidades e a seed com que ele foi gerado
+    try:
+      with open(origem + ".json", encoding="utf-8") as arquivo:
+        existente = json.load(arquivo)
+    except (OSError, ValueError):
+      sys.exit(f"{origem} existe, mas {origem}.json (parâmetros da geração) está ausente ou inválido; remova o banco ou use outro --banco")
+    if {chave: existente.get(chave) for chave in meta} != meta:
+      sys.exit(f"{origem} foi gerado com {existente}; remova-o ou use outro --banco para {meta}")
+    return origem
+
+  origem = origem or os.path.join(tempfile.mkdtemp(), "origem.db")
+  comando = [sys.executable, "-m", "scripts.seed", "--seed", str(args.seed)]
+  for campo, valor in quantidades.items():
+    comando += [f"--{campo}", str(valor)]
+  saida = subprocess.run(comando, check=True, capture_output=True, text=True, env=dict(os.environ, DATABASE_URL=f"sqlite:///{origem}"))
+  with open(origem + ".json", "w", encoding="utf-8") as arquivo:
+    arquivo.write(saida.stdout)
+  return origem
+
+def comparar(resultado: dict, baseline: dict, tolerancia: float, minimo_ms: float) -> list:
+  # Consultas por requisição não dependem da máquina; latências só são comparadas com um baseline da mesma plataforma
+  latencias = all(resultado["meta"].get(chave) == baseline["meta"].get(chave) for chave in ("python", "plataforma"))
+  if not latencias:
+    print(f"Latências não comparadas: baseline medido em {baseline['meta'].get('plataforma')} (Python {baseline['meta'].get('python')})")
+  
+  regressoes = []
+  for nome, atual in resultado["cenarios"].items():
+    anterior = baseline["cenarios"].get(nome)
+    if not anterior:
+      continue
+    for metrica in ("p50_ms", "p95_ms") if latencias else ():
+      diferenca = atual[metrica] - anterior[metrica]
+      if diferenca > minimo_ms and diferenca > anterior[metrica] * tolerancia:
+        regressoes.append(f"{nome}: {metrica} {anterior[metrica]} -> {atual[metrica]} (+{diferenca / anterior[metrica]:.0%})")
+    # Frações de consulta variam com o estado do cache do catálogo; um N+1 novo soma pelo menos uma por requisição
+    if atual["queries_por_req"] > anterior["queries_por_req"] + 0.5:
+      regressoes.append(f"{nome}: queries por requisição {anterior['queries_por_req']} -> {atual['queries_por_req']}")
+  return regressoes
+
+def main():
+  from scripts.seed import ESCALAS
+
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--escala", choices=ESCALAS, default="pequena")
+  for campo in ESCALAS["pequena"]:
+    parser.add_argument(f"--{campo}", type=int)
+  parser.add_argument("--seed", type=int, default=42)
+  parser.add_argument("--banco", help="banco gerado reaproveitado entre execuções (criado se não existir)")
+  parser.add_argument("--repeticoes", type=int, default=200)
+  parser.add_argument("--aquecimento", type=int, default=20)
+  parser.add_argument("--cenarios", help="executa só os cenários cujo nome contém este texto")
+  parser.add_argument("--saida", help="grava o resultado em JSON")
+  parser.add_argument(
+    "--baseline", nargs="?", const="",
+    help="resultado JSON anterior para comparação; sem caminho usa o versionado em benchmarks/baselines/<escala>.json",
+  )
+  parser.add_argument("--tolerancia", type=float, default=0.25, help="aumento relativo de p50/p95 tolerado (padrão 0.25)")
+  parser.add_argument("--minimo-ms", type=float, default=1.0, help="diferenças de latência abaixo disso são ignoradas")
+  args = parser.parse_args()
+
+  quantidades = {campo: getattr(args, campo) or padrao for campo, padrao in ESCALAS[args.escala].items()}
+  baseline = None
+  if args.baseline is not None:
+    caminho = args.baseline or os.path.join(BASELINES, f"{args.escala}.json")
+    try:
+      with open(caminho, encoding="utf-8") as arquivo:
+        baseline = json.load(arquivo)
+    except (OSError, ValueError) as exc:
+      sys.exit(f"Baseline {caminho} não pôde ser lido ({exc}); gere um com --saida")
+    gerado = {chave: baseline["meta"].get(chave) for chave in [*quantidades, "seed"]}
+    if gerado != dict(quantidades, seed=args.seed):
+      sys.exit(f"Baseline {caminho} foi medido com {gerado}; rode com as mesmas quantidades e seed")
+  origem = preparar_banco(args, quantidades)
+  diretorio = tempfile.mkdtemp()
+  shutil.copy(origem, os.path.join(diretorio, "bench.db"))
+  os.environ["DATABASE_URL"] = f"sqlite:///{diretorio}/bench.db"
+  logging.disable(logging.INFO)
+
+  from fastapi.testclient import TestClient
+  from sqlalchemy import event
+  from db.database import engine, read_engine
+  from main import app
+
+  consultas = [0]
+  def contar(*_):
+    consultas[0] += 1
+  for motor in {engine, read_engine}:
+    event.listen(motor, "before_cursor_execute", contar)
+
+  # As mutações usam os ids criados pelo cenário ".criar" do mesmo recurso, que entra junto na seleção
+  todos = cenarios(quantidades)
+  selecionados = [cenario for cenario in todos if not args.cenarios or args.cenarios in cenario.nome]
+  recursos = {cenario.nome.partition(".")[0] for cenario in selecionados if cenario.nome.partition(".")[2] in DEPENDENTES}
+  selecionados = [
+    cenario for cenario in todos
+    if any(cenario is selecionado for selecionado in selecionados) or (cenario.nome.partition(".")[0] in recursos and cenario.nome.endswith(".criar"))
+  ]
+
+  ctx = {"quantidades": quantidades}
+  resultado = {
+    "meta": {
+      **quantidades, "seed": args.seed, "repeticoes": args.repeticoes, "aquecimento": args.aquecimento,
+      "python": platform.python_version(), "plataforma": platform.platform(), "data": datetime.now().isoformat(timespec="seconds"),
+    },
+    "cenarios": {},
+  }
+  with TestClient(app) as client:
+    for cenario in selecionados:
+      medicao = medir(client, cenario, ctx, args.aquecimento, args.repeticoes, consultas)
+      resultado["cenarios"][cenario.nome] = medicao
+      print(
+        f"{cenario.nome:<32} {medicao['req_por_s']:>8} req/s | p50 {medicao['p50_ms']:>8} | p95 {medicao['p95_ms']:>8} | "
+        f"p99 {medicao['p99_ms']:>8} ms | {medicao['queries_por_req']:>6} queries/req" + (f" | ERROS {medicao['status']}" if medicao["erros"] else ""),
+        flush=True,
+      )
+  shutil.rmtree(diretorio, ignore_errors=True)
+
+  if args.saida:
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+      json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+
+  falhas = [f"{nome}: status inesperados {medicao['status']}" for nome, medicao in resultado["cenarios"].items() if medicao["erros"]]
+  if baseline:
+    falhas += comparar(resultado, baseline, args.tolerancia, args.minimo_ms)
+
+  for falha in falhas:
+    print(f"FALHA: {falha}")
+  if falhas:
+    sys.exit(1)
+
+if __name__ == "__main__":
+  main()
@@ -1,46 +1,62 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
-from db.database import SessionLocal
+from db.session import get_read_session, get_write_session, run
+from exceptions.exceptions import BadRequestException
 from schemas.cliente_schema import ClienteCreate, ClientePaginatedResponse, ClienteResponse, ClienteUpdate
+from schemas.bulk import BulkCreateResponse, parse_bulk_items
+from schemas.util import decode_cursor, encode_cursor
+from controllers.conditional import conditional, make_etag
+from controllers.responses import render
 import repositories.cliente_repository as cliente_repository
 
 router = APIRouter(prefix="/clientes", tags=["Clientes"])
 
-def get_session():
-  session = SessionLocal()
-  try:
-    yield session
-    session.commit()
-  except Exception:
-    session.rollback()
-    raise
-  finally:
-    session.close()
-    
 @router.post("/", response_model=ClienteResponse)
-async def create(cliente: ClienteCreate, session: Session = Depends(get_session)):
-  return cliente_repository.create(session, cliente.dict())
+async def create(cliente: ClienteCreate, session = Depends(get_write_session)):
+  return await run(session, cliente_repository.create, cliente.model_dump())
 
-@router.get("/", response_model=ClientePaginatedResponse)
-def list(skip: int = Query(0, ge=0), limit: int = Query(5, le=100), session: Session = Depends(get_session)):
-  clientes = cliente_repository.list(session, skip, limit)
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def create_bulk(request: Request, atomico: bool = Query(False), session = Depends(get_write_session)):
+  itens, erros, total = parse_bulk_items(await request.body(), request.headers.get("content-type"), ClienteCreate)
+  if erros and atomico:
+    raise BadRequestException(f"Item {erros[0].indice} inválido: {erros[0].detalhe}")
 
+  ids, erros_insercao = await run(session, cliente_repository.create_many, itens, atomico)
   return {
+    "ids": [ids.get(indice) for indice in range(total)],
+    "erros": sorted(erros + erros_insercao, key=lambda erro: erro.indice),
+  }
+
+@router.get("/", response_model=ClientePaginatedResponse)
+def list(request: Request, response: Response, skip: int = Query(0, ge=0), limit: int = Query(5, le=100), cursor: str = Query(None), session: Session = Depends(get_read_session)):
+  ultimo_id = decode_cursor(cursor, int)[0] if cursor else None
+  clientes = cliente_repository.list(session, skip, limit, ultimo_id)
+
+  etag = make_etag("clientes", skip, limit, cursor, [(cliente.id, cliente.versao) for cliente in clientes])
+  return conditional(request, response, etag) or render(ClientePaginatedResponse, {
     "clientes": clientes,
     "pagination": {
       "skip": skip,
       "limit": limit,
+      "cursor": cursor,
+      "next_cursor": encode_cursor(clientes[-1].id) if clientes and len(clientes) == limit else None,
     }
-  } 
+  }, response)
+
+@router.get("/count", response_model=dict)
+def count(request: Request, response: Response, session: Session = Depends(get_read_session)):
+  resultado = cliente_repository.count(session)
+  return conditional(request, response, make_etag("clientes/count", resultado)) or resultado
 
 @router.get("/{cliente_id}", response_model=ClienteResponse)
-def get(cliente_id: int, session: Session = Depends(get_session)):
-  return cliente_repository.get(session, cliente_id)
+def get(cliente_id: int, request: Request, response: Response, session: Session = Depends(get_read_session)):
+  cliente = cliente_repository.get(session, cliente_id)
+  return conditional(request, response, make_etag("cliente", cliente.id, cliente.versao), cliente.atualizado_em) or render(ClienteResponse, cliente, response)
   
 @router.put("/{cliente_id}", response_model=ClienteResponse)
-async def update(cliente_id: int, cliente: ClienteUpdate, session: Session = Depends(get_session)):
-  return cliente_repository.update(session, cliente_id, cliente.dict())
+async def update(cliente_id: int, cliente: ClienteUpdate, session = Depends(get_write_session)):
+  return await run(session, cliente_repository.update, cliente_id, cliente.model_dump())
   
 @router.delete("/{cliente_id}", response_model=ClienteResponse)
-async def delete(cliente_id: int, session: Session = Depends(get_session)):
-  return cliente_repository.delete(session, cliente_id)
+async def delete(cliente_id: int, session = Depends(get_write_session)):
+  return await run(session, cliente_repository.delete, cliente_id)
@@ -0,0 +1,48 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+
+def make_etag(*partes) -> str:
+  return '"' + hashlib.blake2b(repr(partes).encode(), digest_size=12).hexdigest() + '"'
+
+def http_date(data: datetime) -> str:
+  return format_datetime(data.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+def last_modified(atualizado_em: datetime, agora: datetime = None) -> str:
+  # HTTP-date tem resolução de 1 s: enquanto o segundo da alteração não termina, outra alteração nele teria o mesmo
+  # Last-Modified e um If-Modified-Since responderia 304 com a cópia velha. Por isso ele só é enviado depois desse
+  # segundo (RFC 9110, 8.8.2.2); até lá o cliente revalida só pelo ETag
+  agora = agora or datetime.now(timezone.utc)
+  if atualizado_em.replace(tzinfo=timezone.utc, microsecond=0) + timedelta(seconds=1) > agora:
+    return None
+  return http_date(atualizado_em)
+
+def is_fresh(request: Request, etag: str, atualizado_em: datetime = None) -> bool:
+  # O ETag é o validador que vale: If-Modified-Since só é considerado sem If-None-Match
+  if_none_match = request.headers.get("if-none-match")
+  if if_none_match is not None:
+    # Comparação fraca (RFC 9110): W/"x" e "x" são equivalentes
+    etags = {valor.strip().removeprefix("W/") for valor in if_none_match.split(",")}
+    return "*" in etags or etag in etags
+
+  if_modified_since = request.headers.get("if-modified-since")
+  if if_modified_since and atualizado_em and last_modified(atualizado_em):
+    try:
+      return atualizado_em.replace(tzinfo=timezone.utc, microsecond=0) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+      return False
+  return False
+
+def conditional(request: Request, response: Response, etag: str, atualizado_em: datetime = None):
+  # Define os cabeçalhos de validação e, se a cópia do cliente ainda vale, devolve um 304 sem corpo
+  # (a rota retorna esse valor antes de montar a resposta completa)
+  headers = { "ETag": etag, "Cache-Control": "no-cache" }
+  modificado = last_modified(atualizado_em) if atualizado_em else None
+  if modificado:
+    headers["Last-Modified"] = modificado
+  response.headers.update(headers)
+
+  if is_fresh(request, etag, atualizado_em):
+    return Response(status_code=304, headers=headers)
+  return None
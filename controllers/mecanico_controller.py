@@ -1,46 +1,62 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
-from db.database import SessionLocal
+from db.session import get_read_session, get_write_session, run
+from exceptions.exceptions import BadRequestException
 from schemas.mecanico_schema import MecanicoCreate, MecanicoPaginatedResponse, MecanicoResponse, MecanicoUpdate
+from schemas.bulk import BulkCreateResponse, parse_bulk_items
+from schemas.util import decode_cursor, encode_cursor
+from controllers.conditional import conditional, make_etag
+from controllers.responses import render
 import repositories.mecanico_repository as mecanico_repository
 
 router = APIRouter(prefix="/mecanicos", tags=["Mecanicos"])
 
-def get_session():
-  session = SessionLocal()
-  try:
-    yield session
-    session.commit()
-  except Exception:
-    session.rollback()
-    raise
-  finally:
-    session.close()
-    
 @router.post("/", response_model=MecanicoResponse)
-async def create(mecanico: MecanicoCreate, session: Session = Depends(get_session)):
-  return mecanico_repository.create(session, mecanico.dict())
+async def create(mecanico: MecanicoCreate, session = Depends(get_write_session)):
+  return await run(session, mecanico_repository.create, mecanico.model_dump())
 
-@router.get("/", response_model=MecanicoPaginatedResponse)
-def list(skip: int = Query(0, ge=0), limit: int = Query(5, le=100), session: Session = Depends(get_session)):
-  mecanicos = mecanico_repository.list(session, skip, limit)
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def create_bulk(request: Request, atomico: bool = Query(False), session = Depends(get_write_session)):
+  itens, erros, total = parse_bulk_items(await request.body(), request.headers.get("content-type"), MecanicoCreate)
+  if erros and atomico:
+    raise BadRequestException(f"Item {erros[0].indice} inválido: {erros[0].detalhe}")
 
+  ids, erros_insercao = await run(session, mecanico_repository.create_many, itens, atomico)
   return {
+    "ids": [ids.get(indice) for indice in range(total)],
+    "erros": sorted(erros + erros_insercao, key=lambda erro: erro.indice),
+  }
+
+@router.get("/", response_model=MecanicoPaginatedResponse)
+def list(request: Request, response: Response, skip: int = Query(0, ge=0), limit: int = Query(5, le=100), cursor: str = Query(None), session: Session = Depends(get_read_session)):
+  ultimo_id = decode_cursor(cursor, int)[0] if cursor else None
+  mecanicos = mecanico_repository.list(session, skip, limit, ultimo_id)
+
+  etag = make_etag("mecanicos", skip, limit, cursor, [(mecanico.id, mecanico.versao) for mecanico in mecanicos])
+  return conditional(request, response, etag) or render(MecanicoPaginatedResponse, {
     "mecanicos": mecanicos,
     "pagination": {
       "skip": skip,
       "limit": limit,
+      "cursor": cursor,
+      "next_cursor": encode_cursor(mecanicos[-1].id) if mecanicos and len(mecanicos) == limit else None,
     }
-  } 
+  }, response)
+
+@router.get("/count", response_model=dict)
+def count(request: Request, response: Response, session: Session = Depends(get_read_session)):
+  resultado = mecanico_repository.count(session)
+  return conditional(request, response, make_etag("mecanicos/count", resultado)) or resultado
 
 @router.get("/{mecanico_id}", response_model=MecanicoResponse)
-def get(mecanico_id: int, session: Session = Depends(get_session)):
-  return mecanico_repository.get(session, mecanico_id)
+def get(mecanico_id: int, request: Request, response: Response, session: Session = Depends(get_read_session)):
+  mecanico = mecanico_repository.get(session, mecanico_id)
+  return conditional(request, response, make_etag("mecanico", mecanico.id, mecanico.versao), mecanico.atualizado_em) or render(MecanicoResponse, mecanico, response)
   
 @router.put("/{mecanico_id}", response_model=MecanicoResponse)
-async def update(mecanico_id: int, mecanico: MecanicoUpdate, session: Session = Depends(get_session)):
-  return mecanico_repository.update(session, mecanico_id, mecanico.dict())
+async def update(mecanico_id: int, mecanico: MecanicoUpdate, session = Depends(get_write_session)):
+  return await run(session, mecanico_repository.update, mecanico_id, mecanico.model_dump())
   
 @router.delete("/{mecanico_id}", response_model=MecanicoResponse)
-async def delete(mecanico_id: int, session: Session = Depends(get_session)):
-  return mecanico_repository.delete(session, mecanico_id)
+async def delete(mecanico_id: int, session = Depends(get_write_session)):
+  return await run(session, mecanico_repository.delete, mecanico_id)
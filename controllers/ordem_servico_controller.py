@@ -1,116 +1,172 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import and_
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal
+from sqlalchemy import and_, false
 from sqlalchemy.orm import Session
-from db.database import SessionLocal
-from models.models import Cliente, Mecanico, OrdemServico
-from schemas.ordem_servico_schema import OrdemServicoCreate, OrdemServicoFullResponse, OrdemServicoPaginatedResponse, OrdemServicoPecaCreate, OrdemServicoResponse, OrdemServicoUpdate
+from db.database import ReadSessionLocal
+from db.search import match_expression, matching_ids
+from db.session import get_read_session, get_write_session, run
+from exceptions.exceptions import BadRequestException
+from models.models import OrdemServico
+from schemas.ordem_servico_schema import OrdemServicoCreate, OrdemServicoFullResponse, OrdemServicoItemOperacao, OrdemServicoPaginatedResponse, OrdemServicoPecaCreate, OrdemServicoResponse, OrdemServicoUpdate
+from schemas.util import decode_cursor, encode_cursor
+from controllers.conditional import conditional, make_etag
+from controllers.responses import render
 import repositories.ordem_servico_repository as ordem_servico_repository
 from datetime import datetime
 
 router = APIRouter(prefix="/ordens_servicos", tags=["Ordens de Serviços"])
 
-def get_session():
-  session = SessionLocal()
-  try:
-    yield session
-    session.commit()
-  except Exception:
-    session.rollback()
-    raise
-  finally:
-    session.close()
-    
 @router.post("/", response_model=OrdemServicoResponse)
-async def create(ordem_servico: OrdemServicoCreate, session: Session = Depends(get_session)):
-  return ordem_servico_repository.create(session, data=ordem_servico)
+async def create(ordem_servico: OrdemServicoCreate, session = Depends(get_write_session)):
+  return await run(session, ordem_servico_repository.create, data=ordem_servico)
 
-@router.get("/", response_model=OrdemServicoPaginatedResponse)
-def list(
-  skip: int = Query(0, ge=0), 
-  limit: int = Query(5, le=100), 
+def get_filtros(
   mecanico_id: int = Query(None, alias="mecanico_id"),
   cliente_id: int = Query(None, alias="cliente_id"),
   nome_mecanico: str = Query(None, alias="nome_mecanico"),
   nome_cliente: str = Query(None, alias="nome_cliente"),
   data_abertura_inicio: datetime = Query(None, alias="data_abertura_inicio"),
   data_abertura_fim: datetime = Query(None, alias="data_abertura_fim"),
-  session: Session = Depends(get_session)
 ):
-  
   filtros = []
   if mecanico_id:
     filtros.append(OrdemServico.mecanico_id == mecanico_id)
   if cliente_id:
     filtros.append(OrdemServico.cliente_id == cliente_id)
+  # Busca por nome/sobrenome no índice FTS, sem diferenciar acentos; um termo sem nenhuma palavra não casa com nada
   if nome_mecanico:
-    filtros.append(Mecanico.nome.ilike(f"%{nome_mecanico}%"))
+    filtros.append(OrdemServico.mecanico_id.in_(matching_ids("mecanico", nome_mecanico)) if match_expression(nome_mecanico) else false())
   if nome_cliente:
-    filtros.append(Cliente.nome.ilike(f"%{nome_cliente}%"))
+    filtros.append(OrdemServico.cliente_id.in_(matching_ids("cliente", nome_cliente)) if match_expression(nome_cliente) else false())
   if data_abertura_inicio and data_abertura_fim:
     filtros.append(and_(OrdemServico.data_abertura >= data_abertura_inicio, OrdemServico.data_abertura <= data_abertura_fim))
+  return filtros
+
+@router.get("/", response_model=OrdemServicoPaginatedResponse)
+def list(
+  request: Request,
+  response: Response,
+  skip: int = Query(0, ge=0), 
+  limit: int = Query(5, le=100), 
+  cursor: str = Query(None, alias="cursor"),
+  filtros: list = Depends(get_filtros),
+  session: Session = Depends(get_read_session)
+):
+  ultima_ordem = None
+  if cursor:
+    data_abertura, ordem_servico_id = decode_cursor(cursor, str, int)
+    try:
+      ultima_ordem = (datetime.fromisoformat(data_abertura), ordem_servico_id)
+    except ValueError:
+      raise BadRequestException("Cursor inválido.")
   
-  ordens_servicos = ordem_servico_repository.list(session, skip, limit, filtros)
+  ordens_servicos = ordem_servico_repository.list(session, skip, limit, filtros, ultima_ordem)
   
-  resultado = []
-  for ordem in ordens_servicos:
-    resultado.append({
-      "id": ordem.id,
-      "data_abertura": ordem.data_abertura,
-      "data_conclusao": ordem.data_conclusao,
-      "valor": ordem.valor,
-      "situacao": ordem.situacao,
-      "cliente": {
-        "id": ordem.cliente.id,
-        "nome": ordem.cliente.nome,
-        "sobrenome": ordem.cliente.sobrenome,
-        "endereco": ordem.cliente.endereco,
-        "telefone": ordem.cliente.telefone
-      },
-      "mecanico": {
-        "id": ordem.mecanico.id,
-        "nome": ordem.mecanico.nome,
-        "sobrenome": ordem.mecanico.sobrenome,
-        "telefone": ordem.mecanico.telefone,
-        "email": ordem.mecanico.email
-      }
-    })
-
-  return {
-    "ordens_servicos": resultado,
+  # A página também embute cliente e mecânico, então as versões deles entram no ETag
+  etag = make_etag("ordens_servicos", str(request.query_params), [
+    (ordem.id, ordem.versao, ordem.cliente.versao, ordem.mecanico.versao) for ordem in ordens_servicos
+  ])
+  # As ordens (com cliente e mecânico já carregados) são validadas direto dos objetos ORM, uma única vez
+  return conditional(request, response, etag) or render(OrdemServicoPaginatedResponse, {
+    "ordens_servicos": ordens_servicos,
     "pagination": {
       "skip": skip,
       "limit": limit,
+      "cursor": cursor,
+      "next_cursor": encode_cursor(ordens_servicos[-1].data_abertura.isoformat(), ordens_servicos[-1].id) if ordens_servicos and len(ordens_servicos) == limit else None,
     }
-  } 
+  }, response)
+
+@router.get("/export")
+def export(
+  formato: Literal["ndjson", "csv"] = Query("ndjson"),
+  filtros: list = Depends(get_filtros),
+):
+  def stream():
+    # A sessão pertence ao gerador: a dependência já teria fechado a sua quando o corpo começa a ser enviado
+    with ReadSessionLocal() as session:
+      ordens = ordem_servico_repository.export(session, filtros)
+      if formato == "csv":
+        yield from export_csv(ordens)
+      else:
+        for ordem in ordens:
+          yield json.dumps(ordem, ensure_ascii=False) + "\n"
+
+  media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+  return StreamingResponse(stream(), media_type=media_type, headers={
+    "Content-Disposition": f"attachment; filename=ordens_servicos.{formato}",
+  })
+
+EXPORT_CSV_COLUNAS = [
+  "id", "data_abertura", "data_conclusao", "situacao", "valor",
+  "cliente_id", "cliente_nome", "cliente_sobrenome", "mecanico_id", "mecanico_nome", "mecanico_sobrenome",
+  "servicos", "pecas", "valor_servicos", "valor_pecas", "valor_total",
+]
+
+def export_csv(ordens):
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  writer.writerow(EXPORT_CSV_COLUNAS)
+  for ordem in ordens:
+    writer.writerow([
+      ordem["id"], ordem["data_abertura"], ordem["data_conclusao"], ordem["situacao"], ordem["valor"],
+      ordem["cliente"]["id"], ordem["cliente"]["nome"], ordem["cliente"]["sobrenome"],
+      ordem["mecanico"]["id"], ordem["mecanico"]["nome"], ordem["mecanico"]["sobrenome"],
+      ";".join(str(servico["id"]) for servico in ordem["servicos"]),
+      ";".join(f"{peca['id']}x{peca['quantidade']}" for peca in ordem["pecas"]),
+      ordem["totais"]["servicos"], ordem["totais"]["pecas"], ordem["totais"]["total"],
+    ])
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+@router.get("/count", response_model=dict)
+def count(request: Request, response: Response, session: Session = Depends(get_read_session)):
+  resultado = ordem_servico_repository.count(session)
+  return conditional(request, response, make_etag("ordens_servicos/count", resultado)) or resultado
 
 @router.get("/{ordem_servico_id}", response_model=OrdemServicoFullResponse)
-def get(ordem_servico_id: int, session: Session = Depends(get_session)):
-  return ordem_servico_repository.get(session, ordem_servico_id)
+def get(ordem_servico_id: int, request: Request, response: Response, session: Session = Depends(get_read_session)):
+  # Consulta só as versões antes de carregar e montar a ordem completa
+  versao = ordem_servico_repository.versao(session, ordem_servico_id)
+  if versao:
+    nao_modificado = conditional(request, response, make_etag("ordem_servico", ordem_servico_id, *versao[:-1]), versao.atualizado_em)
+    if nao_modificado:
+      return nao_modificado
+  return render(OrdemServicoFullResponse, ordem_servico_repository.get(session, ordem_servico_id), response)
   
 @router.put("/{ordem_servico_id}", response_model=OrdemServicoResponse)
-async def update(ordem_servico_id: int, ordem_servico: OrdemServicoUpdate, session: Session = Depends(get_session)):
-  return ordem_servico_repository.update(session, ordem_servico_id, ordem_servico)
+async def update(ordem_servico_id: int, ordem_servico: OrdemServicoUpdate, session = Depends(get_write_session)):
+  return await run(session, ordem_servico_repository.update, ordem_servico_id, ordem_servico)
 
 @router.delete("/{ordem_servico_id}", response_model=OrdemServicoResponse)
-async def delete(ordem_servico_id: int, session: Session = Depends(get_session)):
-  return ordem_servico_repository.delete(session, ordem_servico_id)
+async def delete(ordem_servico_id: int, session = Depends(get_write_session)):
+  return await run(session, ordem_servico_repository.delete, ordem_servico_id)
   
 @router.patch("/{ordem_servico_id}/concluir", response_model=OrdemServicoResponse)
-async def conclude(ordem_servico_id: int, session: Session = Depends(get_session)):
-  return ordem_servico_repository.concluir(session, ordem_servico_id)
+async def conclude(ordem_servico_id: int, session = Depends(get_write_session)):
+  return await run(session, ordem_servico_repository.concluir, ordem_servico_id)
 
 @router.delete("/{ordem_servico_id}/pecas/{peca_id}", response_model=dict)
-async def remove_peca(ordem_servico_id: int, peca_id: int, session: Session = Depends(get_session)):
-  return ordem_servico_repository.remove_peca(session, ordem_servico_id, peca_id)
+async def remove_peca(ordem_servico_id: int, peca_id: int, session = Depends(get_write_session)):
+  return await run(session, ordem_servico_repository.remove_peca, ordem_servico_id, peca_id)
 
 @router.delete("/{ordem_servico_id}/servicos/{servico_id}", response_model=dict)
-async def remove_servico(ordem_servico_id: int, servico_id: int, session: Session = Depends(get_session)):
-  return ordem_servico_repository.remove_servico(session, ordem_servico_id, servico_id)
+async def remove_servico(ordem_servico_id: int, servico_id: int, session = Depends(get_write_session)):
+  return await run(session, ordem_servico_repository.remove_servico, ordem_servico_id, servico_id)
 
 @router.post("/{ordem_servico_id}/pecas", response_model=dict)
-async def add_peca(ordem_servico_id: int, peca: OrdemServicoPecaCreate, session: Session = Depends(get_session)):
-  return ordem_servico_repository.add_peca(session, ordem_servico_id, peca)
+async def add_peca(ordem_servico_id: int, peca: OrdemServicoPecaCreate, session = Depends(get_write_session)):
+  return await run(session, ordem_servico_repository.add_peca, ordem_servico_id, peca)
 
 @router.post("/{ordem_servico_id}/servicos", response_model=dict)
-async def add_servico(ordem_servico_id: int, servico_id: int, session: Session = Depends(get_session)):
-  return ordem_servico_repository.add_servico(session, ordem_servico_id, servico_id)
\ No newline at end of file
+async def add_servico(ordem_servico_id: int, servico_id: int, session = Depends(get_write_session)):
+  return await run(session, ordem_servico_repository.add_servico, ordem_servico_id, servico_id)
+
+@router.post("/{ordem_servico_id}/itens", response_model=dict)
+async def apply_itens(ordem_servico_id: int, operacoes: List[OrdemServicoItemOperacao], session = Depends(get_write_session)):
+  return await run(session, ordem_servico_repository.apply_itens, ordem_servico_id, operacoes)
@@ -1,50 +1,81 @@
-from fastapi import APIRouter, Depends, Query
+import io
+import tempfile
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
-from db.database import SessionLocal
-from schemas.peca_schema import PecaCreate, PecaPaginatedResponse, PecaResponse, PecaUpdate
+from db.session import get_read_session, get_write_session, run
+from exceptions.exceptions import BadRequestException
+from schemas.peca_schema import PecaCreate, PecaImportResponse, PecaPaginatedResponse, PecaResponse, PecaUpdate
+from schemas.bulk import BulkCreateResponse, parse_bulk_items
+from schemas.util import decode_cursor, encode_cursor
+from controllers.conditional import conditional, make_etag
+from controllers.responses import render
 import repositories.peca_repository as peca_repository
 
 router = APIRouter(prefix="/pecas", tags=["Pecas"])
 
-def get_session():
-  session = SessionLocal()
-  try:
-    yield session
-    session.commit()
-  except Exception:
-    session.rollback()
-    raise
-  finally:
-    session.close()
-    
 @router.post("/", response_model=PecaResponse)
-async def create(peca: PecaCreate, session: Session = Depends(get_session)):
-  return peca_repository.create(session, peca.dict())
+async def create(peca: PecaCreate, session = Depends(get_write_session)):
+  return await run(session, peca_repository.create, peca.model_dump())
 
-@router.get("/", response_model=PecaPaginatedResponse)
-def list(skip: int = Query(0, ge=0), limit: int = Query(5, le=100), session: Session = Depends(get_session)):
-  pecas = peca_repository.list(session, skip, limit)
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def create_bulk(request: Request, atomico: bool = Query(False), session = Depends(get_write_session)):
+  itens, erros, total = parse_bulk_items(await request.body(), request.headers.get("content-type"), PecaCreate)
+  if erros and atomico:
+    raise BadRequestException(f"Item {erros[0].indice} inválido: {erros[0].detalhe}")
 
+  ids, erros_insercao = await run(session, peca_repository.create_many, itens, atomico)
   return {
+    "ids": [ids.get(indice) for indice in range(total)],
+    "erros": sorted(erros + erros_insercao, key=lambda erro: erro.indice),
+  }
+
+@router.post("/import", response_model=PecaImportResponse)
+async def import_csv(request: Request, delimitador: str = Query(",", max_length=1), session = Depends(get_write_session)):
+  # O upload é copiado em blocos para um arquivo temporário e lido linha a linha pelo repositório
+  with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as arquivo:
+    async for bloco in request.stream():
+      arquivo.write(bloco)
+    
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    try:
+      return await run(session, peca_repository.import_csv, texto, delimitador)
+    finally:
+      texto.detach()
+
+@router.get("/", response_model=PecaPaginatedResponse)
+def list(request: Request, response: Response, skip: int = Query(0, ge=0), limit: int = Query(5, le=100), cursor: str = Query(None), session: Session = Depends(get_read_session)):
+  ultimo_id = decode_cursor(cursor, int)[0] if cursor else None
+  pecas = peca_repository.list(session, skip, limit, ultimo_id)
+
+  etag = make_etag("pecas", skip, limit, cursor, [(peca.id, peca.versao) for peca in pecas])
+  return conditional(request, response, etag) or render(PecaPaginatedResponse, {
     "pecas": pecas,
     "pagination": {
       "skip": skip,
       "limit": limit,
+      "cursor": cursor,
+      "next_cursor": encode_cursor(pecas[-1].id) if pecas and len(pecas) == limit else None,
     }
-  } 
+  }, response)
+
+@router.get("/cache", response_model=dict)
+def cache_stats():
+  return peca_repository.cache_stats()
 
 @router.get("/count", response_model=dict)
-def count(session: Session = Depends(get_session)):
-  return peca_repository.count(session)
+def count(request: Request, response: Response, session: Session = Depends(get_read_session)):
+  resultado = peca_repository.count(session)
+  return conditional(request, response, make_etag("pecas/count", resultado)) or resultado
 
 @router.get("/{peca_id}", response_model=PecaResponse)
-def get(peca_id: int, session: Session = Depends(get_session)):
-  return peca_repository.get(session, peca_id)
+def get(peca_id: int, request: Request, response: Response, session: Session = Depends(get_read_session)):
+  peca = peca_repository.get(session, peca_id)
+  return conditional(request, response, make_etag("peca", peca.id, peca.versao), peca.atualizado_em) or render(PecaResponse, peca, response)
   
 @router.put("/{peca_id}", response_model=PecaResponse)
-async def update(peca_id: int, peca: PecaUpdate, session: Session = Depends(get_session)):
-  return peca_repository.update(session, peca_id, peca.dict())
+async def update(peca_id: int, peca: PecaUpdate, session = Depends(get_write_session)):
+  return await run(session, peca_repository.update, peca_id, peca.model_dump())
 
 @router.delete("/{peca_id}", response_model=PecaResponse)
-async def delete(peca_id: int, session: Session = Depends(get_session)):
-  return peca_repository.delete(session, peca_id)
\ No newline at end of file
+async def delete(peca_id: int, session = Depends(get_write_session)):
+  return await run(session, peca_repository.delete, peca_id)
\ No newline at end of file
@@ -0,0 +1,30 @@
+from datetime import date
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from db.session import get_read_session
+from exceptions.exceptions import BadRequestException
+from schemas.relatorio_schema import RelatorioCategoriasResponse, RelatorioMecanicosResponse, RelatorioMensalResponse, RelatorioSituacoesResponse
+import repositories.relatorio_repository as relatorio_repository
+
+router = APIRouter(prefix="/relatorios", tags=["Relatórios"])
+
+def get_periodo(inicio: date = Query(None), fim: date = Query(None)):
+  if inicio and fim and inicio > fim:
+    raise BadRequestException("A data de início deve ser anterior à data de fim.")
+  return inicio, fim
+
+@router.get("/receita/mecanicos", response_model=RelatorioMecanicosResponse)
+def receita_por_mecanico(periodo = Depends(get_periodo), session: Session = Depends(get_read_session)):
+  return { "mecanicos": relatorio_repository.receita_por_mecanico(session, *periodo) }
+
+@router.get("/receita/categorias", response_model=RelatorioCategoriasResponse)
+def receita_por_categoria(periodo = Depends(get_periodo), mecanico_id: int = Query(None), session: Session = Depends(get_read_session)):
+  return { "categorias": relatorio_repository.receita_por_categoria(session, *periodo, mecanico_id) }
+
+@router.get("/receita/mensal", response_model=RelatorioMensalResponse)
+def receita_mensal(periodo = Depends(get_periodo), mecanico_id: int = Query(None), session: Session = Depends(get_read_session)):
+  return { "meses": relatorio_repository.receita_mensal(session, *periodo, mecanico_id) }
+
+@router.get("/ordens/situacoes", response_model=RelatorioSituacoesResponse)
+def ordens_por_situacao(periodo = Depends(get_periodo), mecanico_id: int = Query(None), session: Session = Depends(get_read_session)):
+  return { "situacoes": relatorio_repository.ordens_por_situacao(session, *periodo, mecanico_id) }
@@ -0,0 +1,16 @@
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+try:
+  import orjson  # noqa: F401
+  DefaultResponse = ORJSONResponse
+except ImportError:
+  DefaultResponse = JSONResponse
+
+def render(schema, conteudo, response: Response = None) -> Response:
+  # Valida uma única vez (from_attributes aceita objetos ORM e dicts) e serializa direto para JSON no pydantic-core.
+  # Como a rota devolve a Response pronta, o FastAPI não valida de novo contra o response_model.
+  if not isinstance(conteudo, schema):
+    conteudo = schema.model_validate(conteudo)
+  headers = { chave: valor for chave, valor in response.headers.items() if chave != "content-length" } if response else None
+  return Response(conteudo.model_dump_json(), media_type="application/json", headers=headers)
@@ -1,50 +1,66 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
-from db.database import SessionLocal
+from db.session import get_read_session, get_write_session, run
+from exceptions.exceptions import BadRequestException
 from schemas.servico_schema import ServicoCreate, ServicoPaginatedResponse, ServicoResponse, ServicoUpdate
+from schemas.bulk import BulkCreateResponse, parse_bulk_items
+from schemas.util import decode_cursor, encode_cursor
+from controllers.conditional import conditional, make_etag
+from controllers.responses import render
 import repositories.servico_repository as servico_repository
 
 router = APIRouter(prefix="/servicos", tags=["Servicos"])
 
-def get_session():
-  session = SessionLocal()
-  try:
-    yield session
-    session.commit()
-  except Exception:
-    session.rollback()
-    raise
-  finally:
-    session.close()
-    
 @router.post("/", response_model=ServicoResponse)
-async def create(servico: ServicoCreate, session: Session = Depends(get_session)):
-  return servico_repository.create(session, servico.dict())
+async def create(servico: ServicoCreate, session = Depends(get_write_session)):
+  return await run(session, servico_repository.create, servico.model_dump())
 
-@router.get("/", response_model=ServicoPaginatedResponse)
-def list(skip: int = Query(0, ge=0), limit: int = Query(5, le=100), session: Session = Depends(get_session)):
-  servicos = servico_repository.list(session, skip, limit)
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def create_bulk(request: Request, atomico: bool = Query(False), session = Depends(get_write_session)):
+  itens, erros, total = parse_bulk_items(await request.body(), request.headers.get("content-type"), ServicoCreate)
+  if erros and atomico:
+    raise BadRequestException(f"Item {erros[0].indice} inválido: {erros[0].detalhe}")
 
+  ids, erros_insercao = await run(session, servico_repository.create_many, itens, atomico)
   return {
+    "ids": [ids.get(indice) for indice in range(total)],
+    "erros": sorted(erros + erros_insercao, key=lambda erro: erro.indice),
+  }
+
+@router.get("/", response_model=ServicoPaginatedResponse)
+def list(request: Request, response: Response, skip: int = Query(0, ge=0), limit: int = Query(5, le=100), cursor: str = Query(None), session: Session = Depends(get_read_session)):
+  ultimo_id = decode_cursor(cursor, int)[0] if cursor else None
+  servicos = servico_repository.list(session, skip, limit, ultimo_id)
+
+  etag = make_etag("servicos", skip, limit, cursor, [(servico.id, servico.versao) for servico in servicos])
+  return conditional(request, response, etag) or render(ServicoPaginatedResponse, {
     "servicos": servicos,
     "pagination": {
       "skip": skip,
       "limit": limit,
+      "cursor": cursor,
+      "next_cursor": encode_cursor(servicos[-1].id) if servicos and len(servicos) == limit else None,
     }
-  } 
+  }, response)
   
+@router.get("/cache", response_model=dict)
+def cache_stats():
+  return servico_repository.cache_stats()
+
 @router.get("/count", response_model=dict)
-def count(session: Session = Depends(get_session)):
-  return servico_repository.count(session)
+def count(request: Request, response: Response, session: Session = Depends(get_read_session)):
+  resultado = servico_repository.count(session)
+  return conditional(request, response, make_etag("servicos/count", resultado)) or resultado
 
 @router.get("/{servico_id}", response_model=ServicoResponse)
-def get(servico_id: int, session: Session = Depends(get_session)):
-  return servico_repository.get(session, servico_id)
+def get(servico_id: int, request: Request, response: Response, session: Session = Depends(get_read_session)):
+  servico = servico_repository.get(session, servico_id)
+  return conditional(request, response, make_etag("servico", servico.id, servico.versao), servico.atualizado_em) or render(ServicoResponse, servico, response)
   
 @router.put("/{servico_id}", response_model=ServicoResponse)
-async def update(servico_id: int, servico: ServicoUpdate, session: Session = Depends(get_session)):
-  return servico_repository.update(session, servico_id, servico.dict())
+async def update(servico_id: int, servico: ServicoUpdate, session = Depends(get_write_session)):
+  return await run(session, servico_repository.update, servico_id, servico.model_dump())
 
 @router.delete("/{servico_id}", response_model=ServicoResponse)
-async def delete(servico_id: int, session: Session = Depends(get_session)):
-  return servico_repository.delete(session, servico_id)
\ No newline at end of file
+async def delete(servico_id: int, session = Depends(get_write_session)):
+  return await run(session, servico_repository.delete, servico_id)
\ No newline at end of file
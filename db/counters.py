@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+from sqlalchemy import DDL, event, text
+from sqlalchemy.orm import Session
+
+# Contadores por tabela mantidos por triggers na mesma transação do INSERT/DELETE (inclusive lotes e importações);
+# ordem_servico também conta por situação ("ordem_servico:pendente")
+COUNTER_TABLES = {"cliente": None, "mecanico": None, "peca": None, "servico": None, "ordem_servico": "situacao"}
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "2"))
+
+CREATE_COUNTER_TABLE = "CREATE TABLE IF NOT EXISTS contador (chave TEXT PRIMARY KEY, quantidade INTEGER NOT NULL) WITHOUT ROWID"
+
+def _increment(chave: str, delta: int) -> str:
+  return (
+    f"INSERT INTO contador (chave, quantidade) VALUES ({chave}, {delta}) "
+    f"ON CONFLICT(chave) DO UPDATE SET quantidade = quantidade + excluded.quantidade;"
+  )
+
+def counter_ddl(tabela: str, coluna: str = None) -> list:
+  grupo = lambda linha: f"'{tabela}:' || {linha}.{coluna}"
+  ao_inserir = [_increment(f"'{tabela}'", 1)] + ([_increment(grupo("new"), 1)] if coluna else [])
+  ao_remover = [_increment(f"'{tabela}'", -1)] + ([_increment(grupo("old"), -1)] if coluna else [])
+
+  statements = [
+    CREATE_COUNTER_TABLE,
+    f"CREATE TRIGGER IF NOT EXISTS {tabela}_contador_ai AFTER INSERT ON {tabela} BEGIN {' '.join(ao_inserir)} END",
+    f"CREATE TRIGGER IF NOT EXISTS {tabela}_contador_ad AFTER DELETE ON {tabela} BEGIN {' '.join(ao_remover)} END",
+  ]
+  if coluna:
+    statements.append(
+      f"CREATE TRIGGER IF NOT EXISTS {tabela}_contador_au AFTER UPDATE OF {coluna} ON {tabela} "
+      f"WHEN old.{coluna} IS NOT new.{coluna} BEGIN {_increment(grupo('old'), -1)} {_increment(grupo('new'), 1)} END"
+    )
+  return statements + rebuild_ddl(tabela, coluna)
+
+def rebuild_ddl(tabela: str, coluna: str = None) -> list:
+  statements = [
+    f"DELETE FROM contador WHERE chave = '{tabela}' OR chave LIKE '{tabela}:%'",
+    f"INSERT INTO contador (chave, quantidade) SELECT '{tabela}', count(*) FROM {tabela}",
+  ]
+  if coluna:
+    statements.append(
+      f"INSERT INTO contador (chave, quantidade) SELECT '{tabela}:' || {coluna}, count(*) FROM {tabela} GROUP BY {coluna}"
+    )
+  return statements
+
+def register_counter_ddl(model):
+  # Para bancos criados com Base.metadata.create_all (as migrações criam os triggers por conta própria)
+  tabela = model.__tablename__
+  for statement in counter_ddl(tabela, COUNTER_TABLES[tabela]):
+    event.listen(model.__table__, "after_create", DDL(statement.replace("%", "%%")).execute_if(dialect="sqlite"))
+
+def rebuild_counters(session: Session):
+  session.execute(text(CREATE_COUNTER_TABLE))
+  for tabela, coluna in COUNTER_TABLES.items():
+    for statement in rebuild_ddl(tabela, coluna):
+      session.execute(text(statement))
+
+class CounterCache:
+  # Leitura de todos os contadores de uma vez, reaproveitada por COUNT_CACHE_TTL segundos; commits deste processo
+  # invalidam o cache, e os de outros processos aparecem em até COUNT_CACHE_TTL
+  def __init__(self, ttl: float = COUNT_CACHE_TTL):
+    self.ttl = ttl
+    self.valores = None
+    self.expira = 0.0
+    self.lock = threading.Lock()
+
+  def get(self, session: Session) -> dict:
+    with self.lock:
+      if self.valores is None or time.monotonic() >= self.expira:
+        self.valores = dict(session.execute(text("SELECT chave, quantidade FROM contador")).all())
+        self.expira = time.monotonic() + self.ttl
+      return self.valores
+
+  def invalidate(self, *args):
+    self.valores = None
+
+counter_cache = CounterCache()
+event.listen(Session, "after_commit", counter_cache.invalidate)
+
+def count(session: Session, tabela: str) -> int:
+  return counter_cache.get(session).get(tabela, 0)
+
+def count_by(session: Session, tabela: str) -> dict:
+  prefixo = f"{tabela}:"
+  return {
+    chave[len(prefixo):]: quantidade for chave, quantidade in counter_cache.get(session).items()
+    if chave.startswith(prefixo) and quantidade
+  }
@@ -1,9 +1,36 @@
-from sqlalchemy import create_engine
+import os
 from sqlalchemy.orm import sessionmaker, declarative_base
+from db.profile import DatabaseProfile, apply_profile, create_profiled_engine
+from db.writer import WriteQueue
 
-DATABASE_URL = "sqlite:///./oficina-t2.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./oficina-t2.db")
 
-engine = create_engine(DATABASE_URL, echo=True)
+# "sync" mantém as rotas chamando o SessionLocal diretamente, "async" usa o engine aiosqlite
+DATABASE_MODE = os.getenv("DATABASE_MODE", "sync")
+
+profile = DatabaseProfile.from_env()
+
+engine = create_profiled_engine(DATABASE_URL, profile)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Pool separado e somente leitura (query_only) para as rotas GET; bancos em memória não podem ser compartilhados
+read_engine = engine if ":memory:" in DATABASE_URL else create_profiled_engine(DATABASE_URL, profile, read_only=True)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Com DB_WRITE_QUEUE=on as rotas de escrita enfileiram as funções do repositório para uma única thread de escrita
+writer = WriteQueue(SessionLocal, profile) if profile.write_queue else None
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DATABASE_MODE == "async":
+  from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+  from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+  ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+  # O dialeto aiosqlite usa NullPool por padrão; o pool explícito evita reabrir conexões e reaplicar os pragmas
+  async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool, **profile.engine_options(ASYNC_DATABASE_URL))
+  apply_profile(async_engine, profile)
+  AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base() 
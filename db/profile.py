@@ -0,0 +1,111 @@
+import os
+import random
+import time
+from dataclasses import dataclass, fields
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+from telemetry.metrics import observe_pool_wait
+
+@dataclass
+class DatabaseProfile:
+  echo: bool = False
+  journal_mode: str = "WAL"
+  synchronous: str = "NORMAL"
+  mmap_size: int = 256 * 1024 * 1024
+  cache_size: int = -64000  # Negativo = KiB, ou seja ~64 MB por conexão
+  busy_timeout: int = 5000  # ms
+  foreign_keys: bool = True
+  pool_size: int = 5
+  max_overflow: int = 10
+  pool_timeout: float = 30
+  read_pool_size: int = 10
+  read_max_overflow: int = 20
+  busy_retries: int = 5
+  busy_backoff: float = 0.05  # s, dobra a cada tentativa
+  busy_backoff_max: float = 1.0
+  write_queue: bool = False  # Escritas por uma única thread com commit em grupo (db/writer.py)
+  group_commit_size: int = 64
+  group_commit_wait: float = 0.0  # s de espera por mais escritas antes de gravar o grupo
+  group_commit_pause: float = 0.003  # s entre grupos seguidos, para não monopolizar o lock entre processos
+
+  @classmethod
+  def from_env(cls, prefix: str = "DB_"):
+    # Cada campo pode ser sobrescrito por uma variável de ambiente, ex.: DB_JOURNAL_MODE=DELETE
+    valores = {}
+    for campo in fields(cls):
+      valor = os.getenv(prefix + campo.name.upper())
+      if valor is None:
+        continue
+      if campo.type is bool:
+        valores[campo.name] = valor.lower() in ("1", "true", "on", "yes")
+      else:
+        valores[campo.name] = campo.type(valor)
+    return cls(**valores)
+
+  def engine_options(self, url: str, read_only: bool = False) -> dict:
+    opcoes = {"echo": self.echo}
+    if ":memory:" not in url:
+      opcoes.update(
+        pool_size=self.read_pool_size if read_only else self.pool_size,
+        max_overflow=self.read_max_overflow if read_only else self.max_overflow,
+        pool_timeout=self.pool_timeout,
+      )
+    return opcoes
+
+  def pragmas(self, read_only: bool = False) -> list:
+    pragmas = [
+      f"PRAGMA synchronous={self.synchronous}",
+      f"PRAGMA mmap_size={self.mmap_size}",
+      f"PRAGMA cache_size={self.cache_size}",
+      f"PRAGMA busy_timeout={self.busy_timeout}",
+      f"PRAGMA foreign_keys={'ON' if self.foreign_keys else 'OFF'}",
+    ]
+    # O journal_mode só pode ser trocado por uma conexão de escrita
+    if read_only:
+      pragmas.append("PRAGMA query_only=ON")
+    else:
+      pragmas.insert(0, f"PRAGMA journal_mode={self.journal_mode}")
+    return pragmas
+
+  def backoff(self, tentativa: int) -> float:
+    atraso = min(self.busy_backoff * (2 ** tentativa), self.busy_backoff_max)
+    return atraso * random.uniform(0.5, 1.0)
+
+def apply_profile(engine, profile: DatabaseProfile, read_only: bool = False):
+  # Para engines assíncronos os eventos de conexão ficam no sync_engine
+  sync_engine = getattr(engine, "sync_engine", engine)
+
+  @event.listens_for(sync_engine, "connect")
+  def set_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in profile.pragmas(read_only):
+      cursor.execute(pragma)
+    cursor.close()
+
+  return engine
+
+class TimedQueuePool(QueuePool):
+  # Mede quanto cada checkout esperou por uma conexão livre (o nome do pool vira o label da métrica)
+  def _do_get(self):
+    inicio = time.perf_counter()
+    try:
+      return super()._do_get()
+    finally:
+      observe_pool_wait(self._orig_logging_name, time.perf_counter() - inicio)
+
+def create_profiled_engine(url: str, profile: DatabaseProfile, read_only: bool = False, **kwargs):
+  opcoes = profile.engine_options(url, read_only)
+  opcoes.update(kwargs)
+  if "poolclass" in kwargs:
+    for opcao in ("pool_size", "max_overflow", "pool_timeout"):
+      opcoes.pop(opcao, None)
+  elif ":memory:" not in url:
+    opcoes.update(poolclass=TimedQueuePool, pool_logging_name="leitura" if read_only else "escrita")
+  return apply_profile(create_engine(url, **opcoes), profile, read_only)
+
+def is_busy_error(exc: Exception) -> bool:
+  if not isinstance(exc, OperationalError):
+    return False
+  mensagem = str(exc.orig).lower()
+  return "database is locked" in mensagem or "database is busy" in mensagem
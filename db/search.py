@@ -0,0 +1,37 @@
+import re
+from sqlalchemy import DDL, column, event, select, table, text
+
+# Tabelas FTS5 de conteúdo externo sobre nome/sobrenome; remove_diacritics torna a busca insensível a acentos
+SEARCH_TABLES = ("cliente", "mecanico")
+
+def search_ddl(tabela: str) -> list:
+  fts = f"{tabela}_fts"
+  return [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+    f"nome, sobrenome, content='{tabela}', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabela} BEGIN "
+    f"INSERT INTO {fts}(rowid, nome, sobrenome) VALUES (new.id, new.nome, new.sobrenome); END",
+    f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabela} BEGIN "
+    f"INSERT INTO {fts}({fts}, rowid, nome, sobrenome) VALUES ('delete', old.id, old.nome, old.sobrenome); END",
+    f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF nome, sobrenome ON {tabela} BEGIN "
+    f"INSERT INTO {fts}({fts}, rowid, nome, sobrenome) VALUES ('delete', old.id, old.nome, old.sobrenome); "
+    f"INSERT INTO {fts}(rowid, nome, sobrenome) VALUES (new.id, new.nome, new.sobrenome); END",
+    f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+  ]
+
+def register_search_ddl(model):
+  # Para bancos criados com Base.metadata.create_all (as migrações criam o índice por conta própria)
+  for statement in search_ddl(model.__tablename__):
+    event.listen(model.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+def match_expression(termo: str):
+  # Cada palavra vira um prefixo entre aspas: "joao"* "silv"* (todas precisam casar em nome ou sobrenome)
+  palavras = re.findall(r"\w+", termo or "")
+  if not palavras:
+    return None
+  return " ".join(f'"{palavra}"*' for palavra in palavras)
+
+def matching_ids(tabela: str, termo: str):
+  fts = table(f"{tabela}_fts", column("rowid"))
+  return select(fts.c.rowid).where(text(f"{tabela}_fts MATCH :termo").bindparams(termo=match_expression(termo)))
@@ -0,0 +1,61 @@
+import asyncio
+from sqlalchemy.exc import OperationalError
+from db.database import DATABASE_MODE, AsyncSessionLocal, ReadSessionLocal, SessionLocal, profile, writer
+from db.profile import is_busy_error
+
+def get_read_session():
+  # Sem commit nem flush: a conexão é somente leitura e a transação é descartada ao fechar
+  session = ReadSessionLocal()
+  try:
+    yield session
+  finally:
+    session.close()
+
+async def get_write_session():
+  if writer is not None:
+    # A transação é aberta e gravada pela thread de escrita, em grupo com as das outras requisições
+    yield writer
+    return
+
+  if DATABASE_MODE != "async":
+    session = SessionLocal()
+    try:
+      yield session
+      session.commit()
+    except Exception:
+      session.rollback()
+      raise
+    finally:
+      session.close()
+    return
+
+  async with AsyncSessionLocal() as session:
+    try:
+      yield session
+      await session.commit()
+    except Exception:
+      await session.rollback()
+      raise
+
+async def run(session, fn, *args, **kwargs):
+  # Executa uma função síncrona do repositório; no modo async ela roda no greenlet do AsyncSession.
+  # Se o SQLite continuar ocupado depois do busy_timeout, a transação é desfeita e repetida com backoff.
+  # Com a fila de escrita ela é enviada para a thread de escrita, que faz os retries do grupo.
+  if writer is not None and session is writer:
+    return await asyncio.wrap_future(writer.submit(fn, *args, **kwargs))
+
+  tentativa = 0
+  while True:
+    try:
+      if DATABASE_MODE == "async":
+        return await session.run_sync(fn, *args, **kwargs)
+      return fn(session, *args, **kwargs)
+    except OperationalError as exc:
+      if not is_busy_error(exc) or tentativa >= profile.busy_retries:
+        raise
+      if DATABASE_MODE == "async":
+        await session.rollback()
+      else:
+        session.rollback()
+      await asyncio.sleep(profile.backoff(tentativa))
+      tentativa += 1
@@ -0,0 +1,32 @@
+from sqlalchemy import DDL, event
+
+# versao/atualizado_em mantidos por triggers: qualquer UPDATE (ORM, upsert ou SQL direto) incrementa a versão da linha,
+# e alterações nos itens incrementam a versão da ordem de serviço
+VERSIONED_TABLES = ("cliente", "mecanico", "peca", "servico", "ordem_servico")
+ITEM_TABLES = ("ordem_servico_peca", "ordem_servico_servico")
+
+def _bump(tabela: str, id: str) -> str:
+  return f"UPDATE {tabela} SET versao = versao + 1, atualizado_em = CURRENT_TIMESTAMP WHERE id = {id};"
+
+def version_ddl(tabela: str) -> list:
+  # O WHEN evita incrementar de novo quando a própria instrução já alterou a versão
+  return [
+    f"CREATE TRIGGER IF NOT EXISTS {tabela}_versao_au AFTER UPDATE ON {tabela} "
+    f"WHEN new.versao = old.versao BEGIN {_bump(tabela, 'new.id')} END",
+  ]
+
+def item_version_ddl(tabela: str) -> list:
+  return [
+    f"CREATE TRIGGER IF NOT EXISTS {tabela}_versao_ai AFTER INSERT ON {tabela} "
+    f"BEGIN {_bump('ordem_servico', 'new.ordem_servico_id')} END",
+    f"CREATE TRIGGER IF NOT EXISTS {tabela}_versao_au AFTER UPDATE ON {tabela} "
+    f"BEGIN {_bump('ordem_servico', 'new.ordem_servico_id')} END",
+    f"CREATE TRIGGER IF NOT EXISTS {tabela}_versao_ad AFTER DELETE ON {tabela} "
+    f"BEGIN {_bump('ordem_servico', 'old.ordem_servico_id')} END",
+  ]
+
+def register_version_ddl(model):
+  # Para bancos criados com Base.metadata.create_all (as migrações criam os triggers por conta própria)
+  tabela = model.__tablename__
+  for statement in (item_version_ddl(tabela) if tabela in ITEM_TABLES else version_ddl(tabela)):
+    event.listen(model.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
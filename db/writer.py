@@ -0,0 +1,150 @@
+import atexit
+import contextvars
+import functools
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from sqlalchemy.exc import OperationalError
+from db.profile import DatabaseProfile, is_busy_error
+
+class WriteQueue:
+  # Uma única thread de escrita executa as funções do repositório enfileiradas pelas requisições e faz o commit
+  # delas em grupos: cada função roda em um SAVEPOINT próprio (um erro desfaz só a sua parte e volta só para quem
+  # a enviou) e o resultado só é entregue depois que o grupo inteiro foi gravado
+  def __init__(self, session_factory, profile: DatabaseProfile):
+    self.session_factory = session_factory
+    self.profile = profile
+    self.fila = queue.Queue()
+    self.thread = None
+    self.lock = threading.Lock()
+    self.grupos = 0
+    self.operacoes = 0
+    self.maior_grupo = 0
+
+  def submit(self, fn, *args, **kwargs) -> Future:
+    if self.thread is None:
+      self.start()
+    future = Future()
+    # A função roda no contexto de quem a enviou (ex.: o contador de instruções SQL da requisição)
+    self.fila.put((functools.partial(contextvars.copy_context().run, fn), args, kwargs, future))
+    return future
+
+  def start(self):
+    with self.lock:
+      if self.thread is None:
+        self.thread = threading.Thread(target=self.loop, name="write-queue", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+  def stop(self):
+    # Processa o que já está na fila e encerra a thread
+    with self.lock:
+      thread, self.thread = self.thread, None
+    if thread is not None:
+      self.fila.put(None)
+      thread.join()
+
+  def loop(self):
+    while True:
+      item = self.fila.get()
+      if item is None:
+        return
+      grupo = self.collect(item)
+      ativos = [operacao for operacao in grupo if operacao is not None and operacao[3].set_running_or_notify_cancel()]
+      if ativos:
+        self.commit_group(ativos)
+        # Uma pausa curta entre grupos seguidos deixa processos que esperam pelo lock gravarem também
+        if not self.fila.empty():
+          time.sleep(self.profile.group_commit_pause)
+      if None in grupo:
+        return
+
+  def collect(self, primeiro) -> list:
+    # Junta o que chegou enquanto o grupo anterior era gravado; group_commit_wait espera um pouco mais por novas escritas
+    grupo = [primeiro]
+    limite = time.monotonic() + self.profile.group_commit_wait
+    while len(grupo) < self.profile.group_commit_size:
+      try:
+        espera = limite - time.monotonic()
+        grupo.append(self.fila.get(timeout=espera) if espera > 0 else self.fila.get_nowait())
+      except queue.Empty:
+        break
+      if grupo[-1] is None:
+        break
+    return grupo
+
+  def commit_group(self, grupo: list):
+    tentativa = 0
+    while True:
+      try:
+        resultados = self.execute(grupo)
+        break
+      except Exception as exc:
+        if is_busy_error(exc) and tentativa < self.profile.busy_retries:
+          time.sleep(self.profile.backoff(tentativa))
+          tentativa += 1
+          continue
+        for _, _, _, future in grupo:
+          future.set_exception(exc)
+        return
+
+    with self.lock:
+      self.grupos += 1
+      self.operacoes += len(grupo)
+      self.maior_grupo = max(self.maior_grupo, len(grupo))
+
+    for (_, _, _, future), (resultado, erro) in zip(grupo, resultados):
+      if erro is not None:
+        future.set_exception(erro)
+      else:
+        future.set_result(resultado)
+
+  def begin(self, session):
+    # Espera pelo lock em intervalos curtos em vez do busy handler do SQLite, cujas esperas crescem até 100 ms e
+    # deixam um processo que acabou de gravar pegar o lock de novo antes dos outros
+    conexao = session.connection()
+    conexao.exec_driver_sql("PRAGMA busy_timeout=0")
+    limite = time.monotonic() + self.profile.busy_timeout / 1000
+    try:
+      while True:
+        try:
+          conexao.exec_driver_sql("BEGIN IMMEDIATE")
+          return
+        except OperationalError as exc:
+          if not is_busy_error(exc) or time.monotonic() >= limite:
+            raise
+          time.sleep(random.uniform(0.0005, 0.002))
+    finally:
+      conexao.exec_driver_sql(f"PRAGMA busy_timeout={self.profile.busy_timeout}")
+
+  def execute(self, grupo: list) -> list:
+    resultados = []
+    with self.session_factory(expire_on_commit=False) as session:
+      # BEGIN IMMEDIATE explícito: o pysqlite não abre a transação antes de um SAVEPOINT (o RELEASE faria o commit
+      # de cada operação) e o lock de escrita é obtido uma vez, aqui, para o grupo todo
+      self.begin(session)
+      for fn, args, kwargs, _ in grupo:
+        try:
+          with session.begin_nested():
+            resultado = fn(session, *args, **kwargs)
+          resultados.append((resultado, None))
+        except Exception as exc:
+          if is_busy_error(exc):
+            raise
+          resultados.append((None, exc))
+        # Cada operação começa com o identity map vazio, como em uma sessão por requisição
+        session.expunge_all()
+      session.commit()
+    return resultados
+
+  def stats(self) -> dict:
+    with self.lock:
+      return {
+        "grupos": self.grupos,
+        "operacoes": self.operacoes,
+        "media_por_grupo": round(self.operacoes / self.grupos, 2) if self.grupos else 0.0,
+        "maior_grupo": self.maior_grupo,
+        "pendentes": self.fila.qsize(),
+      }
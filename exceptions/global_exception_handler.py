@@ -9,9 +9,12 @@ logger = logging.getLogger(__name__)
 
 async def global_exception_handler(request: Request, exc: Exception):
   logger.error(f"Erro inesperado: {exc}")
+  # O middleware de log guarda o id da requisição no state antes de a exceção sair dele
+  request_id = getattr(request.state, "request_id", None)
   return JSONResponse(
     status_code=500,
     content={"message": "Ocorreu um erro interno no servidor"},
+    headers={"X-Request-ID": request_id} if request_id else None,
   )
 
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -1,11 +1,16 @@
 from fastapi import FastAPI, HTTPException, Request, Response
-from controllers import mecanico_controller, cliente_controller, servico_controller, peca_controller, ordem_servico_controller
+from controllers.responses import DefaultResponse
+from controllers import mecanico_controller, cliente_controller, servico_controller, peca_controller, ordem_servico_controller, relatorio_controller
 from exceptions.exceptions import BadRequestException, InternalServerErrorException, NotFoundException
 from exceptions.global_exception_handler import bad_request_exception_handler, global_exception_handler, http_exception_handler, internal_server_error_exception_handler, not_found_exception_handler
 import logging
-from datetime import datetime
+import time
+import uuid
+from db.database import async_engine, engine, read_engine
+from telemetry import metrics, profiling, sql
+from telemetry.log import ACCESS_LOGGER, setup_logging
 
-app = FastAPI(title="Oficina Mecânica")
+app = FastAPI(title="Oficina Mecânica", default_response_class=DefaultResponse)
 
 app.add_exception_handler(NotFoundException, not_found_exception_handler)
 app.add_exception_handler(BadRequestException, bad_request_exception_handler)
@@ -18,12 +23,15 @@ app.include_router(cliente_controller.router)
 app.include_router(servico_controller.router)
 app.include_router(peca_controller.router)
 app.include_router(ordem_servico_controller.router)
+app.include_router(relatorio_controller.router)
 
-logging.basicConfig(
-  filename="logs.log",
-  level=logging.DEBUG, # Todos os níveis
-  format="%(asctime)s - %(levelname)s - %(message)s",
-)
+setup_logging()
+access_logger = logging.getLogger(ACCESS_LOGGER)
+
+metrics.setup_metrics()
+app.add_event_handler("shutdown", metrics.shutdown)
+for motor in {engine, read_engine, async_engine} - {None}:
+  sql.instrument_engine(motor)
 
 def get_log_level(status_code):
   log_levels = {
@@ -36,18 +44,58 @@ def get_log_level(status_code):
 
 @app.middleware("http")
 async def log(request: Request, call_next):
-  start_time = datetime.now()
-  method = request.method
-  path = request.url.path
+  start_time = time.perf_counter()
+  request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+  in_flight = metrics.in_flight(request.method)
+  in_flight.inc()
+  perfil = profiling.start(request_id, request.method, request.url.path, request.headers) if profiling.enabled else None
+  consultas, token = sql.start_request(request_id, request.method, request.scope, perfil)
+  # O handler de Exception (global_exception_handler) roda fora deste middleware e devolve o id no cabeçalho da resposta 500
+  request.state.request_id = request_id
+  status_code = 500
+  response = None
+  erro = None
+
+  try:
+    response: Response = await call_next(request)
+    status_code = response.status_code
+  except Exception as exc:
+    # Registrada abaixo com status 500 e relançada para o ServerErrorMiddleware montar a resposta
+    erro = exc
+    raise
+  finally:
+    in_flight.dec()
+    sql.finish_request(consultas, token)
+    route = request.scope.get("route")
+    route_path = route.path if route else None
+    metrics.observe_request(request.method, route_path or "desconhecida", status_code, time.perf_counter() - start_time, consultas.count)
+    if perfil is not None and response is None:
+      await profiling.finish(perfil, route_path, status_code)
 
-  response: Response = await call_next(request)
-  status_code = response.status_code
+    log_level = get_log_level(status_code)
+    if access_logger.isEnabledFor(log_level):
+      access_logger.log(log_level, "request", extra={
+        "request_id": request_id,
+        "method": request.method,
+        "path": request.url.path,
+        "route": route_path,
+        "status": status_code,
+        "latency_ms": round((time.perf_counter() - start_time) * 1000, 3),
+        "error": f"{type(erro).__name__}: {erro}" if erro else None,
+        **consultas.summary(),
+      })
 
-  log_level = get_log_level(status_code)
-  logging.log(log_level, f"Metodo: {method} | Caminho: {path} | Status: {status_code} | Data/Hora: {start_time}")
+  response.headers["X-Request-ID"] = request_id
+  if perfil is not None:
+    response.headers["X-Profile-Id"] = profiling.attach(perfil, response, route_path, status_code)
 
   return response
 
 @app.get("/")
 def root():
   return {"message": "API funcionando corretamente!"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+  conteudo, media_type = metrics.render()
+  return Response(conteudo, media_type=media_type)
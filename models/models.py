@@ -1,11 +1,19 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Date, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from db.database import Base
+from db.counters import register_counter_ddl
+from db.search import register_search_ddl
+from db.versions import register_version_ddl
 
-class Cliente(Base):
+class Versionado:
+  # Incrementados pelos triggers de db/versions.py a cada alteração; usados nos ETags
+  versao = Column(Integer, nullable=False, default=1, server_default="1")
+  atualizado_em = Column(DateTime, nullable=True, default=func.current_timestamp())
+
+class Cliente(Versionado, Base):
   __tablename__ = "cliente"
 
-  id = Column(Integer, primary_key=True, index=True)
+  id = Column(Integer, primary_key=True)
   nome = Column(String, nullable=False)
   sobrenome = Column(String, nullable=False)
   endereco = Column(String, nullable=False)
@@ -13,10 +21,10 @@ class Cliente(Base):
 
   ordens = relationship("OrdemServico", back_populates="cliente")
 
-class Mecanico(Base):
+class Mecanico(Versionado, Base):
   __tablename__ = "mecanico"
 
-  id = Column(Integer, primary_key=True, index=True)
+  id = Column(Integer, primary_key=True)
   nome = Column(String, nullable=False)
   sobrenome = Column(String, nullable=False)
   telefone = Column(String, nullable=False)
@@ -24,34 +32,40 @@ class Mecanico(Base):
 
   ordens = relationship("OrdemServico", back_populates="mecanico")
 
-class Servico(Base):
+class Servico(Versionado, Base):
   __tablename__ = "servico"
 
-  id = Column(Integer, primary_key=True, index=True)
+  id = Column(Integer, primary_key=True)
   nome = Column(String, nullable=False)
   valor = Column(Float, nullable=False)
   ativo = Column(Boolean, nullable=False)
   categoria = Column(String, nullable=False)
 
-class Peca(Base):
+class Peca(Versionado, Base):
   __tablename__ = "peca"
 
-  id = Column(Integer, primary_key=True, index=True)
+  id = Column(Integer, primary_key=True)
   nome = Column(String, nullable=False)
   marca = Column(String, nullable=False)
   modelo = Column(String, nullable=False)
   valor = Column(Float, nullable=False)
 
-class OrdemServico(Base):
+  __table_args__ = (
+    Index("uq_peca_marca_modelo", "marca", "modelo", unique=True),
+  )
+
+class OrdemServico(Versionado, Base):
   __tablename__ = "ordem_servico"
 
-  id = Column(Integer, primary_key=True, index=True)
+  id = Column(Integer, primary_key=True)
   cliente_id = Column(Integer, ForeignKey("cliente.id"))
   mecanico_id = Column(Integer, ForeignKey("mecanico.id"))
   data_abertura = Column(DateTime, nullable=False)
   data_conclusao = Column(DateTime, nullable=True)
   situacao = Column(String, nullable=False)
   valor = Column(Float, nullable=True)
+  valor_servicos = Column(Float, nullable=False, default=0, server_default="0")
+  valor_pecas = Column(Float, nullable=False, default=0, server_default="0")
 
   cliente = relationship("Cliente", back_populates="ordens")
   mecanico = relationship("Mecanico", back_populates="ordens")
@@ -59,13 +73,27 @@ class OrdemServico(Base):
   pecas = relationship("OrdemServicoPeca", cascade="all, delete-orphan", back_populates="ordem_servico")
   servicos = relationship("OrdemServicoServico", cascade="all, delete-orphan", back_populates="ordem_servico")
 
+  __table_args__ = (
+    Index("ix_ordem_servico_data_abertura_id", "data_abertura", "id"),
+    Index("ix_ordem_servico_cliente_id_data_abertura", "cliente_id", "data_abertura", "id"),
+    Index("ix_ordem_servico_mecanico_id_data_abertura", "mecanico_id", "data_abertura", "id"),
+  )
+
 class OrdemServicoServico(Base):
   __tablename__ = "ordem_servico_servico"
 
   ordem_servico_id = Column(Integer, ForeignKey("ordem_servico.id"), primary_key=True)
   servico_id = Column(Integer, ForeignKey("servico.id"), primary_key=True)
+  # Preço e categoria do serviço quando foi incluído; os subtotais da ordem e os resumos por categoria partem deles
+  valor = Column(Float, nullable=False, default=0, server_default="0")
+  categoria = Column(String, nullable=False, default="", server_default="")
   
   ordem_servico = relationship("OrdemServico", back_populates="servicos")
+  servico = relationship("Servico")
+
+  __table_args__ = (
+    Index("ix_ordem_servico_servico_servico_id", "servico_id"),
+  )
 
 class OrdemServicoPeca(Base):
   __tablename__ = "ordem_servico_peca"
@@ -73,5 +101,42 @@ class OrdemServicoPeca(Base):
   ordem_servico_id = Column(Integer, ForeignKey("ordem_servico.id"), primary_key=True)
   peca_id = Column(Integer, ForeignKey("peca.id"), primary_key=True)
   quantidade = Column(Integer, nullable=False)
+  # Valor da linha (soma de preço × quantidade de cada inclusão, no preço da época)
+  valor_total = Column(Float, nullable=False, default=0, server_default="0")
   
   ordem_servico = relationship("OrdemServico", back_populates="pecas")
+  peca = relationship("Peca")
+
+  __table_args__ = (
+    Index("ix_ordem_servico_peca_peca_id", "peca_id"),
+  )
+
+class RelatorioOrdem(Base):
+  __tablename__ = "relatorio_ordem"
+
+  # Ordens concluídas contam no dia da conclusão; as pendentes, no dia da abertura
+  dia = Column(Date, primary_key=True)
+  mecanico_id = Column(Integer, primary_key=True)
+  situacao = Column(String, primary_key=True)
+  ordens = Column(Integer, nullable=False, default=0)
+  valor_servicos = Column(Float, nullable=False, default=0)
+  valor_pecas = Column(Float, nullable=False, default=0)
+
+class RelatorioCategoria(Base):
+  __tablename__ = "relatorio_categoria"
+
+  dia = Column(Date, primary_key=True)
+  mecanico_id = Column(Integer, primary_key=True)
+  categoria = Column(String, primary_key=True)
+  situacao = Column(String, primary_key=True)
+  servicos = Column(Integer, nullable=False, default=0)
+  valor = Column(Float, nullable=False, default=0)
+
+register_search_ddl(Cliente)
+register_search_ddl(Mecanico)
+
+for model in (Cliente, Mecanico, Peca, Servico, OrdemServico):
+  register_counter_ddl(model)
+
+for model in (Cliente, Mecanico, Peca, Servico, OrdemServico, OrdemServicoPeca, OrdemServicoServico):
+  register_version_ddl(model)
@@ -0,0 +1,46 @@
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from exceptions.exceptions import BadRequestException
+from schemas.bulk import BulkItemError
+
+CHUNK_SIZE = 1000
+
+def insert_many(session: Session, model, itens: list, atomico: bool = False, chunk_size: int = CHUNK_SIZE):
+  # itens: [(indice, dict)]; retorna {indice: id} e a lista de erros por item
+  ids = {}
+  erros = []
+
+  for inicio in range(0, len(itens), chunk_size):
+    chunk = itens[inicio:inicio + chunk_size]
+    if atomico:
+      # Qualquer falha desfaz a transação inteira da requisição
+      try:
+        novos_ids = inserir(session, model, chunk)
+      except IntegrityError as exc:
+        raise BadRequestException(f"Falha ao inserir o lote: {exc.orig}")
+      ids.update(zip((indice for indice, _ in chunk), novos_ids))
+      continue
+
+    try:
+      with session.begin_nested():
+        novos_ids = inserir(session, model, chunk)
+      ids.update(zip((indice for indice, _ in chunk), novos_ids))
+    except IntegrityError:
+      # Isola os itens inválidos repetindo o chunk linha a linha
+      for indice, dados in chunk:
+        try:
+          with session.begin_nested():
+            ids[indice] = inserir(session, model, [(indice, dados)])[0]
+        except IntegrityError as exc_item:
+          erros.append(BulkItemError(indice=indice, detalhe=str(exc_item.orig)))
+
+  return ids, erros
+
+def inserir(session: Session, model, chunk: list):
+  # Um executemany de verdade: com RETURNING o SQLite não tem sentinela para ordenar os ids e o SQLAlchemy faria um
+  # INSERT por linha. Com o lock de escrita da transação, as linhas sem id explícito recebem ids consecutivos a partir
+  # do maior existente, então os ids saem, na ordem do chunk, do max(id) lido logo depois
+  session.connection().execute(insert(model), [dados for _, dados in chunk])
+  ultimo = session.execute(select(func.max(model.id))).scalar()
+  return range(ultimo - len(chunk) + 1, ultimo + 1)
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from models.models import Peca, Servico
+
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "1024"))
+# Limita por quanto tempo uma alteração feita em outro processo pode ficar invisível aqui
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+
+class CatalogCache:
+  # Cache LRU dos ids existentes no catálogo, para as verificações de existência das alterações de itens.
+  # Guarda só o id: preços e categorias são lidos do banco pelos próprios comandos de escrita, nunca daqui.
+  # Ids inexistentes não são guardados
+  def __init__(self, model, capacidade: int = CATALOG_CACHE_SIZE, ttl: float = CATALOG_CACHE_TTL):
+    self.model = model
+    self.capacidade = capacidade
+    self.ttl = ttl
+    self.itens = OrderedDict()
+    self.lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def get(self, session: Session, id: int):
+    return self.get_many(session, [id]).get(id)
+
+  def get_many(self, session: Session, ids) -> dict:
+    encontrados = {}
+    faltando = []
+    agora = time.monotonic()
+    with self.lock:
+      for id in dict.fromkeys(ids):
+        item = self.itens.get(id)
+        if item and item[1] > agora:
+          self.itens.move_to_end(id)
+          encontrados[id] = item[0]
+          self.hits += 1
+        else:
+          faltando.append(id)
+          self.misses += 1
+
+    if faltando:
+      # Os ids ausentes são buscados em uma única consulta
+      linhas = session.execute(select(self.model.id).where(self.model.id.in_(faltando))).all()
+      with self.lock:
+        for linha in linhas:
+          encontrados[linha.id] = linha
+          self.itens[linha.id] = (linha, agora + self.ttl)
+          self.itens.move_to_end(linha.id)
+        while len(self.itens) > self.capacidade:
+          self.itens.popitem(last=False)
+          self.evictions += 1
+
+    return encontrados
+
+  def invalidate(self, session: Session, id: int = None):
+    # Remove já e de novo após o commit, para descartar o que outra requisição tenha lido antes dele
+    self.discard(id)
+    session.info.setdefault("catalog_invalidate", []).append((self, id))
+
+  def discard(self, id: int = None):
+    with self.lock:
+      if id is None:
+        self.itens.clear()
+      else:
+        self.itens.pop(id, None)
+
+  def stats(self) -> dict:
+    with self.lock:
+      consultas = self.hits + self.misses
+      return {
+        "tamanho": len(self.itens),
+        "capacidade": self.capacidade,
+        "hits": self.hits,
+        "misses": self.misses,
+        "evictions": self.evictions,
+        "hit_ratio": round(self.hits / consultas, 4) if consultas else 0.0,
+      }
+
+pecas = CatalogCache(Peca)
+servicos = CatalogCache(Servico)
+
+@event.listens_for(Session, "after_commit")
+def discard_after_commit(session: Session):
+  for cache, id in session.info.pop("catalog_invalidate", []):
+    cache.discard(id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def forget_after_rollback(session: Session, previous_transaction):
+  # O rollback de um SAVEPOINT (fila de escrita, lotes) não descarta as invalidações do resto da transação
+  if not previous_transaction.nested:
+    session.info.pop("catalog_invalidate", None)
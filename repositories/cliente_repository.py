@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
+import db.counters as counters
 from exceptions.exceptions import BadRequestException, NotFoundException
 from models.models import Cliente, OrdemServico
+from repositories.bulk import insert_many
 
 def create(session: Session, cliente_data: dict):
   cliente = Cliente(**cliente_data)
@@ -9,8 +11,17 @@ def create(session: Session, cliente_data: dict):
   session.refresh(cliente)
   return cliente
  
-def list(session: Session, skip: int = 0, limit: int = 5):
-  return session.query(Cliente).offset(skip).limit(limit).all()
+def create_many(session: Session, clientes_data: list, atomico: bool = False):
+  return insert_many(session, Cliente, clientes_data, atomico)
+ 
+def list(session: Session, skip: int = 0, limit: int = 5, cursor: int = None):
+  query = session.query(Cliente).order_by(Cliente.id)
+  if cursor is not None:
+    query = query.filter(Cliente.id > cursor)
+  else:
+    query = query.offset(skip)
+
+  return query.limit(limit).all()
 
 def get(session: Session, cliente_id: int):
   cliente = session.query(Cliente).filter(Cliente.id == cliente_id).first()
@@ -19,6 +30,9 @@ def get(session: Session, cliente_id: int):
       
   return cliente
 
+def count(session: Session):
+  return { "quantidade": counters.count(session, "cliente") }
+
 def update(session: Session, cliente_id: int, cliente_data: dict):
   cliente = session.query(Cliente).filter(Cliente.id == cliente_id).first()
   if cliente:
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
+import db.counters as counters
 from exceptions.exceptions import BadRequestException, NotFoundException
 from models.models import Mecanico, OrdemServico
+from repositories.bulk import insert_many
 
 def create(session: Session, mecanico_data: dict):
   mecanico = Mecanico(**mecanico_data)
@@ -9,8 +11,17 @@ def create(session: Session, mecanico_data: dict):
   session.refresh(mecanico)
   return mecanico
  
-def list(session: Session, skip: int = 0, limit: int = 5):
-  return session.query(Mecanico).offset(skip).limit(limit).all()
+def create_many(session: Session, mecanicos_data: list, atomico: bool = False):
+  return insert_many(session, Mecanico, mecanicos_data, atomico)
+ 
+def list(session: Session, skip: int = 0, limit: int = 5, cursor: int = None):
+  query = session.query(Mecanico).order_by(Mecanico.id)
+  if cursor is not None:
+    query = query.filter(Mecanico.id > cursor)
+  else:
+    query = query.offset(skip)
+
+  return query.limit(limit).all()
 
 def get(session: Session, mecanico_id: int):
   mecanico = session.query(Mecanico).filter(Mecanico.id == mecanico_id).first()
@@ -19,6 +30,9 @@ def get(session: Session, mecanico_id: int):
     
   return mecanico
 
+def count(session: Session):
+  return { "quantidade": counters.count(session, "mecanico") }
+
 def update(session: Session, mecanico_id: int, mecanico_data: dict):
   mecanico = session.query(Mecanico).filter(Mecanico.id == mecanico_id).first()
   if mecanico:
@@ -1,8 +1,14 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, contains_eager, joinedload, selectinload
+from sqlalchemy import DateTime, and_, bindparam, case, func, literal, select, tuple_, union_all
+from sqlalchemy import delete as delete_statement
+from sqlalchemy import update as update_statement
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import db.counters as counters
 from exceptions.exceptions import BadRequestException, NotFoundException
 from models.models import Cliente, Mecanico, OrdemServico, OrdemServicoPeca, OrdemServicoServico, Peca, Servico
 from datetime import datetime, timezone
+import repositories.catalog_cache as catalog_cache
+import repositories.relatorio_repository as relatorio_repository
 
 from schemas.cliente_schema import ClienteResponse
 from schemas.mecanico_schema import MecanicoResponse
@@ -25,47 +31,109 @@ def create(session: Session, data: OrdemServicoCreate):
     data_abertura = datetime.now(timezone.utc),
     situacao = "pendente",
     data_conclusao = None,
-    valor = None
+    valor = None,
+    valor_servicos = 0,
+    valor_pecas = 0
   )
   
   session.add(ordem_servico)
   session.flush()
   session.refresh(ordem_servico)
+  relatorio_repository.acumular(session, *relatorio_repository.chave(ordem_servico), ordens=1)
 
   return ordem_servico
 
-def list(session: Session, skip: int = 0, limit: int = 5, filtros = []):
-  return session.query(OrdemServico)\
-    .join(Cliente)\
-    .join(Mecanico)\
+def list(session: Session, skip: int = 0, limit: int = 5, filtros = [], cursor: tuple = None):
+  query = session.query(OrdemServico)\
+    .join(OrdemServico.cliente)\
+    .join(OrdemServico.mecanico)\
+    .options(contains_eager(OrdemServico.cliente), contains_eager(OrdemServico.mecanico))\
     .filter(*filtros)\
-    .order_by(OrdemServico.data_abertura.desc())\
-    .offset(skip).limit(limit).all()
+    .order_by(OrdemServico.data_abertura.desc(), OrdemServico.id.desc())
+
+  if cursor is not None:
+    # Paginação por chave: continua a partir da última (data_abertura, id) retornada
+    query = query.filter(tuple_(OrdemServico.data_abertura, OrdemServico.id) < tuple_(*cursor))
+  else:
+    query = query.offset(skip)
+
+  return query.limit(limit).all()
+
+def export(session: Session, filtros = [], batch_size: int = 1000):
+  # Percorre as ordens com um cursor no servidor (yield_per) e busca os itens de cada lote em duas consultas,
+  # então a memória fica limitada ao tamanho do lote qualquer que seja o resultado
+  ordens = session.execute(
+    select(
+      OrdemServico.id, OrdemServico.data_abertura, OrdemServico.data_conclusao, OrdemServico.situacao, OrdemServico.valor,
+      Cliente.id, Cliente.nome, Cliente.sobrenome, Cliente.endereco, Cliente.telefone,
+      Mecanico.id, Mecanico.nome, Mecanico.sobrenome, Mecanico.telefone, Mecanico.email,
+      OrdemServico.valor_servicos, OrdemServico.valor_pecas,
+    )
+    .join(Cliente, Cliente.id == OrdemServico.cliente_id)
+    .join(Mecanico, Mecanico.id == OrdemServico.mecanico_id)
+    .filter(*filtros)
+    .order_by(OrdemServico.data_abertura.desc(), OrdemServico.id.desc())
+    .execution_options(yield_per=batch_size)
+  )
+  
+  for lote in ordens.partitions():
+    ids = [linha[0] for linha in lote]
+    servicos = {}
+    for ordem_servico_id, id, nome, valor, categoria in session.execute(
+      select(OrdemServicoServico.ordem_servico_id, Servico.id, Servico.nome, Servico.valor, Servico.categoria)
+      .join(Servico, Servico.id == OrdemServicoServico.servico_id)
+      .filter(OrdemServicoServico.ordem_servico_id.in_(ids))
+    ):
+      servicos.setdefault(ordem_servico_id, []).append({"id": id, "nome": nome, "valor": valor, "categoria": categoria})
+      
+    pecas = {}
+    for ordem_servico_id, id, nome, marca, modelo, valor, quantidade in session.execute(
+      select(OrdemServicoPeca.ordem_servico_id, Peca.id, Peca.nome, Peca.marca, Peca.modelo, Peca.valor, OrdemServicoPeca.quantidade)
+      .join(Peca, Peca.id == OrdemServicoPeca.peca_id)
+      .filter(OrdemServicoPeca.ordem_servico_id.in_(ids))
+    ):
+      pecas.setdefault(ordem_servico_id, []).append({"id": id, "nome": nome, "marca": marca, "modelo": modelo, "valor": valor, "quantidade": quantidade})
+    
+    for linha in lote:
+      yield {
+        "id": linha[0],
+        "data_abertura": linha[1].isoformat(),
+        "data_conclusao": linha[2].isoformat() if linha[2] else None,
+        "situacao": linha[3],
+        "valor": linha[4],
+        "cliente": {"id": linha[5], "nome": linha[6], "sobrenome": linha[7], "endereco": linha[8], "telefone": linha[9]},
+        "mecanico": {"id": linha[10], "nome": linha[11], "sobrenome": linha[12], "telefone": linha[13], "email": linha[14]},
+        "servicos": servicos.get(linha[0], []),
+        "pecas": pecas.get(linha[0], []),
+        "totais": {"servicos": linha[15], "pecas": linha[16], "total": round(linha[15] + linha[16], 2)},
+      }
 
 def get(session: Session, ordem_servico_id: int):
-  ordem_servico_data = session.query(OrdemServico, Cliente, Mecanico)\
-    .join(Cliente, Cliente.id == OrdemServico.cliente_id)\
-    .join(Mecanico, Mecanico.id == OrdemServico.mecanico_id)\
-    .filter(OrdemServico.id == ordem_servico_id).first()
+  # Carrega a ordem com cliente, mecânico e serviços em uma consulta e as peças em outra. Peças e serviços vêm do banco,
+  # não do cache do catálogo: o ETag do get cobre as versões deles, e o cache de outro processo pode estar desatualizado
+  ordem_servico = session.query(OrdemServico)\
+    .options(
+      joinedload(OrdemServico.cliente, innerjoin=True),
+      joinedload(OrdemServico.mecanico, innerjoin=True),
+      joinedload(OrdemServico.servicos).joinedload(OrdemServicoServico.servico),
+      selectinload(OrdemServico.pecas).joinedload(OrdemServicoPeca.peca, innerjoin=True),
+    )\
+    .filter(OrdemServico.id == ordem_servico_id).one_or_none()
     
-  if not ordem_servico_data:
+  if not ordem_servico:
     raise NotFoundException("Ordem de serviço não encontrada.")
     
-  ordem_servico, cliente, mecanico = ordem_servico_data
+  cliente = ordem_servico.cliente
+  mecanico = ordem_servico.mecanico
   
-  servicos = session.query(Servico).join(OrdemServicoServico)\
-    .filter(OrdemServicoServico.ordem_servico_id == ordem_servico.id).all()
-    
-  pecas = session.query(Peca, OrdemServicoPeca.quantidade)\
-    .join(OrdemServicoPeca).filter(OrdemServicoPeca.ordem_servico_id == ordem_servico.id).all()
-    
-      
   return OrdemServicoFullResponse(
     id=ordem_servico.id,
     data_abertura=ordem_servico.data_abertura,
     data_conclusao=ordem_servico.data_conclusao,
     situacao=ordem_servico.situacao,
     valor=ordem_servico.valor,
+    valor_servicos=ordem_servico.valor_servicos,
+    valor_pecas=ordem_servico.valor_pecas,
     cliente=ClienteResponse(
       id=cliente.id,
       nome=cliente.nome,
@@ -85,17 +153,47 @@ def get(session: Session, ordem_servico_id: int):
       nome=servico.nome,
       valor=servico.valor,
       categoria=servico.categoria,
-    ) for servico in servicos],
+    ) for servico in (item.servico for item in ordem_servico.servicos)],
     pecas=[OrdemServicoPecaResponse(
       id=peca.id,
       nome=peca.nome,
       marca=peca.marca,
       modelo=peca.modelo,
       valor=peca.valor,
-      quantidade=quantidade,
-    ) for peca, quantidade in pecas]
+      quantidade=item.quantidade,
+    ) for item, peca in ((item, item.peca) for item in ordem_servico.pecas)]
   )
 
+def count(session: Session):
+  return { "quantidade": counters.count(session, "ordem_servico"), "situacoes": counters.count_by(session, "ordem_servico") }
+
+def versao(session: Session, ordem_servico_id: int):
+  # Versões da ordem e de tudo que aparece no get (cliente, mecânico, peças e serviços); como as versões só crescem,
+  # a soma muda sempre que um dos itens muda. atualizado_em é a alteração mais recente entre eles.
+  servicos = select(Servico.versao, Servico.atualizado_em)\
+    .join(OrdemServicoServico, OrdemServicoServico.servico_id == Servico.id)\
+    .where(OrdemServicoServico.ordem_servico_id == ordem_servico_id).subquery()
+  pecas = select(Peca.versao, Peca.atualizado_em)\
+    .join(OrdemServicoPeca, OrdemServicoPeca.peca_id == Peca.id)\
+    .where(OrdemServicoPeca.ordem_servico_id == ordem_servico_id).subquery()
+  
+  return session.execute(
+    select(
+      OrdemServico.versao, Cliente.versao, Mecanico.versao,
+      select(func.coalesce(func.sum(servicos.c.versao), 0)).scalar_subquery(),
+      select(func.coalesce(func.sum(pecas.c.versao), 0)).scalar_subquery(),
+      func.max(
+        OrdemServico.atualizado_em, Cliente.atualizado_em, Mecanico.atualizado_em,
+        select(func.coalesce(func.max(servicos.c.atualizado_em), "")).scalar_subquery(),
+        select(func.coalesce(func.max(pecas.c.atualizado_em), "")).scalar_subquery(),
+        type_=DateTime,
+      ).label("atualizado_em"),
+    )
+    .join(Cliente, Cliente.id == OrdemServico.cliente_id)
+    .join(Mecanico, Mecanico.id == OrdemServico.mecanico_id)
+    .where(OrdemServico.id == ordem_servico_id)
+  ).one_or_none()
+
 def update(session: Session, ordem_servico_id: int, data: OrdemServicoUpdate):
   ordem_servico = session.query(OrdemServico).filter(OrdemServico.id == ordem_servico_id).first()
   if not ordem_servico:
@@ -112,8 +210,10 @@ def update(session: Session, ordem_servico_id: int, data: OrdemServicoUpdate):
   if not mecanico:
     raise NotFoundException("Mecânico não encontrado.")
   
+  chave_anterior = relatorio_repository.chave(ordem_servico)
   ordem_servico.cliente_id = data.cliente_id
   ordem_servico.mecanico_id = data.mecanico_id
+  relatorio_repository.mover(session, ordem_servico, chave_anterior)
   
   session.flush()
   session.refresh(ordem_servico)
@@ -122,6 +222,7 @@ def update(session: Session, ordem_servico_id: int, data: OrdemServicoUpdate):
 def delete(session: Session, ordem_servico_id: int):
   ordem_servico = session.query(OrdemServico).filter(OrdemServico.id == ordem_servico_id).first()
   if ordem_servico:
+    relatorio_repository.remover(session, ordem_servico)
     session.delete(ordem_servico)
     session.flush()
     
@@ -138,27 +239,12 @@ def concluir(session: Session, ordem_servico_id: int):
   if ordem_servico.situacao == "concluida":
     raise BadRequestException("Ordem de serviço já foi concluida.")
   
-  # Calcular o valor total dos serviços
-  valor_total_servicos = session.query(func.sum(Servico.valor))\
-    .join(OrdemServicoServico)\
-    .filter(OrdemServicoServico.ordem_servico_id == ordem_servico_id)\
-    .scalar()
-    
-  # Calcular o valor total das peças
-  valor_total_pecas = session.query(func.sum(Peca.valor * OrdemServicoPeca.quantidade))\
-    .join(OrdemServicoPeca)\
-    .filter(OrdemServicoPeca.ordem_servico_id == ordem_servico_id)\
-    .scalar()
-      
-  # Caso não haja serviços ou peças, o valor será 0
-  valor_total_servicos = valor_total_servicos if valor_total_servicos is not None else 0
-  valor_total_pecas = valor_total_pecas if valor_total_pecas is not None else 0
-  
-  valor_total = valor_total_servicos + valor_total_pecas
-  
-  ordem_servico.valor = valor_total
+  # Congela a soma dos subtotais mantidos; divergências entre eles e os itens ficam com scripts/repair_totais.py
+  chave_anterior = relatorio_repository.chave(ordem_servico)
+  ordem_servico.valor = round(ordem_servico.valor_servicos + ordem_servico.valor_pecas, 2)
   ordem_servico.situacao = "concluida"
   ordem_servico.data_conclusao = datetime.now(timezone.utc)
+  relatorio_repository.mover(session, ordem_servico, chave_anterior)
   
   session.flush()
   session.refresh(ordem_servico)
@@ -172,17 +258,21 @@ def remove_servico(session: Session, ordem_servico_id: int, servico_id: int):
   if ordem_servico.situacao == "concluida":
     raise BadRequestException("Ordem de serviço já foi concluida.")
   
-  servico = session.query(Servico).filter(Servico.id == servico_id).first()
+  servico = catalog_cache.servicos.get(session, servico_id)
   if not servico:
     raise NotFoundException("Serviço não encontrado.")
   
-  ordem_servico_servico = session.query(OrdemServicoServico)\
-    .filter(OrdemServicoServico.ordem_servico_id == ordem_servico_id, OrdemServicoServico.servico_id == servico_id).first()
-    
-  if not ordem_servico_servico:
+  # Um único DELETE ... RETURNING: desconta o preço e a categoria guardados na inclusão exatamente da linha removida,
+  # mesmo que outra requisição a remova ou a inclua de novo ao mesmo tempo
+  removido = session.connection().execute(
+    delete_statement(OrdemServicoServico)
+    .where(OrdemServicoServico.ordem_servico_id == ordem_servico_id, OrdemServicoServico.servico_id == servico_id)
+    .returning(OrdemServicoServico.valor, OrdemServicoServico.categoria)
+  ).one_or_none()
+  if not removido:
     raise BadRequestException("Serviço não está relacionado com essa ordem de serviço.")
   
-  session.delete(ordem_servico_servico)
+  ajustar_totais(session, ordem_servico, valor_servicos=-removido.valor, categorias={ removido.categoria: (-1, -removido.valor) })
   session.flush()
   
   return { "message": "Serviço removido da ordem de serviço." }
@@ -195,12 +285,22 @@ def add_servico(session: Session, ordem_servico_id: int, servico_id):
   if ordem_servico.situacao == "concluida":
     raise BadRequestException("Ordem de serviço já foi concluida.")
   
-  servico = session.query(Servico).filter(Servico.id == servico_id).first()
+  # Um único INSERT ... SELECT ... ON CONFLICT DO NOTHING: o preço e a categoria saem da linha do catálogo no mesmo comando,
+  # e um serviço repetido (inclusive por requisições simultâneas) não insere nada
+  servico = session.connection().execute(
+    sqlite_insert(OrdemServicoServico).from_select(
+      ["ordem_servico_id", "servico_id", "valor", "categoria"],
+      select(literal(ordem_servico_id), Servico.id, Servico.valor, Servico.categoria).where(Servico.id == servico_id),
+    )
+    .on_conflict_do_nothing(index_elements=[OrdemServicoServico.ordem_servico_id, OrdemServicoServico.servico_id])
+    .returning(OrdemServicoServico.valor, OrdemServicoServico.categoria)
+  ).one_or_none()
   if not servico:
-    raise NotFoundException("Serviço não encontrado.")
+    if not catalog_cache.servicos.get(session, servico_id):
+      raise NotFoundException("Serviço não encontrado.")
+    raise BadRequestException("Serviço já está relacionado com essa ordem de serviço.")
   
-  ordem_servico_servico = OrdemServicoServico(ordem_servico_id=ordem_servico_id, servico_id=servico_id)
-  session.add(ordem_servico_servico)
+  ajustar_totais(session, ordem_servico, valor_servicos=servico.valor, categorias={ servico.categoria: (1, servico.valor) })
   session.flush()
   
   return { "message": "Serviço adicionado na ordem de serviço." }
@@ -213,25 +313,26 @@ def add_peca(session: Session, ordem_servico_id: int, data: any):
   if ordem_servico.situacao == "concluida":
     raise BadRequestException("Ordem de serviço já foi concluida.")
   
-  peca = session.query(Peca).filter(Peca.id == data.peca_id).first()
-  if not peca:
+  # Adiciona a peça ou soma a quantidade e o valor da linha em um único INSERT ... SELECT ... ON CONFLICT DO UPDATE, sem ler
+  # a linha antes; o preço sai da linha do catálogo no mesmo comando
+  stmt = sqlite_insert(OrdemServicoPeca).from_select(
+    ["ordem_servico_id", "peca_id", "quantidade", "valor_total"],
+    select(literal(ordem_servico_id), Peca.id, literal(data.quantidade), func.round(Peca.valor * data.quantidade, 2))
+    .where(Peca.id == data.peca_id),
+  )
+  resultado = session.connection().execute(stmt.on_conflict_do_update(
+    index_elements=[OrdemServicoPeca.ordem_servico_id, OrdemServicoPeca.peca_id],
+    set_={
+      "quantidade": OrdemServicoPeca.quantidade + stmt.excluded.quantidade,
+      "valor_total": func.round(OrdemServicoPeca.valor_total + stmt.excluded.valor_total, 2),
+    },
+  ))
+  if not resultado.rowcount:
     raise NotFoundException("Peça não encontrada.")
-  
-  ordem_servico_peca = session.query(OrdemServicoPeca)\
-    .filter(OrdemServicoPeca.ordem_servico_id == ordem_servico_id, OrdemServicoPeca.peca_id == data.peca_id).first()
-
-  if ordem_servico_peca:
-    # Atualiza a quantidade se a peça já estiver associada
-    ordem_servico_peca.quantidade += data.quantidade
-  else:
-    # Adiciona nova peça à ordem
-    nova_peca = OrdemServicoPeca(
-      ordem_servico_id=ordem_servico_id,
-      peca_id=data.peca_id,
-      quantidade=data.quantidade
-    )
-    session.add(nova_peca)
 
+  # Com a transação de escrita aberta pelo INSERT, o preço lido aqui é o mesmo que ele gravou
+  valor, _ = valores_catalogo(session, { data.peca_id: data.quantidade }, [])[("peca", data.peca_id)]
+  ajustar_totais(session, ordem_servico, valor_pecas=valor)
   session.flush()
   
   return { "message": "Peça adicionada na ordem de serviço." }
@@ -244,16 +345,216 @@ def remove_peca(session: Session, ordem_servico_id: int, peca_id: int):
   if ordem_servico.situacao == "concluida":
     raise BadRequestException("Ordem de serviço já foi concluida.")
   
-  peca = session.query(Peca).filter(Peca.id == peca_id).first()
+  peca = catalog_cache.pecas.get(session, peca_id)
   if not peca:
     raise NotFoundException("Peça não encontrada.")
   
-  ordem_servico_peca = session.query(OrdemServicoPeca)\
-    .filter(OrdemServicoPeca.ordem_servico_id == ordem_servico_id, OrdemServicoPeca.peca_id == peca_id).first()
-  if not ordem_servico_peca:
+  # Remove e lê o valor da linha no mesmo comando, então uma inclusão simultânea não fica fora do desconto
+  removido = session.connection().execute(
+    delete_statement(OrdemServicoPeca)
+    .where(OrdemServicoPeca.ordem_servico_id == ordem_servico_id, OrdemServicoPeca.peca_id == peca_id)
+    .returning(OrdemServicoPeca.valor_total)
+  ).one_or_none()
+  if not removido:
     raise BadRequestException("Peça não está relacionada com essa ordem de serviço.")
   
-  session.delete(ordem_servico_peca)
+  ajustar_totais(session, ordem_servico, valor_pecas=-removido.valor_total)
+  session.flush()
+  
+  return { "message": "Peça removida da ordem de serviço." }
+
+def apply_itens(session: Session, ordem_servico_id: int, operacoes: list):
+  ordem_servico = session.query(OrdemServico).filter(OrdemServico.id == ordem_servico_id).first()
+  if not ordem_servico:
+    raise NotFoundException("Ordem de serviço não encontrada.")
+  
+  if ordem_servico.situacao == "concluida":
+    raise BadRequestException("Ordem de serviço já foi concluida.")
+  
+  # Uma única consulta valida as peças e serviços referenciados e diz quais já estão na ordem
+  peca_ids = {operacao.id for operacao in operacoes if operacao.tipo == "peca"}
+  servico_ids = {operacao.id for operacao in operacoes if operacao.tipo == "servico"}
+  relacionados = itens_relacionados(session, ordem_servico_id, peca_ids, servico_ids)
+  
+  pecas_faltando = peca_ids - {id for tipo, id in relacionados if tipo == "peca"}
+  if pecas_faltando:
+    raise NotFoundException(f"Peça não encontrada: {sorted(pecas_faltando)}.")
+  
+  servicos_faltando = servico_ids - {id for tipo, id in relacionados if tipo == "servico"}
+  if servicos_faltando:
+    raise NotFoundException(f"Serviço não encontrado: {sorted(servicos_faltando)}.")
+  
+  # Reduz as operações, na ordem recebida, às linhas a remover (as que já estavam na ordem) e às inclusões
+  # que sobram depois da última remoção de cada item
+  presentes = {chave for chave, relacionado in relacionados.items() if relacionado}
+  remover = {"peca": set(), "servico": set()}
+  incluir = {"peca": {}, "servico": {}}
+  for operacao in operacoes:
+    chave = (operacao.tipo, operacao.id)
+    if operacao.acao == "adicionar":
+      if operacao.tipo == "servico" and chave in presentes:
+        raise BadRequestException("Serviço já está relacionado com essa ordem de serviço.")
+      incluir[operacao.tipo][operacao.id] = incluir[operacao.tipo].get(operacao.id, 0) + operacao.quantidade
+      presentes.add(chave)
+    else:
+      if chave not in presentes:
+        if operacao.tipo == "peca":
+          raise BadRequestException("Peça não está relacionada com essa ordem de serviço.")
+        raise BadRequestException("Serviço não está relacionado com essa ordem de serviço.")
+      if relacionados[chave]:
+        remover[operacao.tipo].add(operacao.id)
+      incluir[operacao.tipo].pop(operacao.id, None)
+      presentes.discard(chave)
+  
+  valor_servicos = 0
+  valor_pecas = 0
+  categorias = {}
+  
+  def somar_categoria(categoria, sinal, valor):
+    quantidade, total = categorias.get(categoria, (0, 0))
+    categorias[categoria] = (quantidade + sinal, total + sinal * valor)
+  
+  # Remoções em um DELETE ... RETURNING por tipo, descontando os valores guardados nas linhas removidas
+  if remover["peca"]:
+    removidas = session.connection().execute(
+      delete_statement(OrdemServicoPeca)
+      .where(OrdemServicoPeca.ordem_servico_id == ordem_servico_id, OrdemServicoPeca.peca_id.in_(remover["peca"]))
+      .returning(OrdemServicoPeca.valor_total)
+    ).all()
+    if len(removidas) != len(remover["peca"]):
+      raise BadRequestException("Peça não está relacionada com essa ordem de serviço.")
+    valor_pecas -= sum(linha.valor_total for linha in removidas)
+  
+  if remover["servico"]:
+    removidos = session.connection().execute(
+      delete_statement(OrdemServicoServico)
+      .where(OrdemServicoServico.ordem_servico_id == ordem_servico_id, OrdemServicoServico.servico_id.in_(remover["servico"]))
+      .returning(OrdemServicoServico.valor, OrdemServicoServico.categoria)
+    ).all()
+    if len(removidos) != len(remover["servico"]):
+      raise BadRequestException("Serviço não está relacionado com essa ordem de serviço.")
+    for linha in removidos:
+      valor_servicos -= linha.valor
+      somar_categoria(linha.categoria, -1, linha.valor)
+  
+  # Inclusões em um executemany por tipo, com o preço lido do catálogo pelo próprio INSERT ... SELECT
+  if incluir["peca"]:
+    stmt = sqlite_insert(OrdemServicoPeca).from_select(
+      ["ordem_servico_id", "peca_id", "quantidade", "valor_total"],
+      select(literal(ordem_servico_id), Peca.id, bindparam("quantidade"), func.round(Peca.valor * bindparam("quantidade"), 2))
+      .where(Peca.id == bindparam("peca_id")),
+    )
+    session.connection().execute(stmt.on_conflict_do_update(
+      index_elements=[OrdemServicoPeca.ordem_servico_id, OrdemServicoPeca.peca_id],
+      set_={
+        "quantidade": OrdemServicoPeca.quantidade + stmt.excluded.quantidade,
+        "valor_total": func.round(OrdemServicoPeca.valor_total + stmt.excluded.valor_total, 2),
+      },
+    ), [{ "peca_id": id, "quantidade": quantidade } for id, quantidade in incluir["peca"].items()])
+  
+  if incluir["servico"]:
+    resultado = session.connection().execute(
+      sqlite_insert(OrdemServicoServico).from_select(
+        ["ordem_servico_id", "servico_id", "valor", "categoria"],
+        select(literal(ordem_servico_id), Servico.id, Servico.valor, Servico.categoria).where(Servico.id == bindparam("servico_id")),
+      ).on_conflict_do_nothing(index_elements=[OrdemServicoServico.ordem_servico_id, OrdemServicoServico.servico_id]),
+      [{ "servico_id": id } for id in incluir["servico"]],
+    )
+    if resultado.rowcount != len(incluir["servico"]):
+      raise BadRequestException("Serviço já está relacionado com essa ordem de serviço.")
+  
+  if incluir["peca"] or incluir["servico"]:
+    # A transação de escrita já está aberta, então os preços lidos aqui são os mesmos que os INSERT gravaram
+    valores = valores_catalogo(session, incluir["peca"], incluir["servico"])
+    if len(valores) != len(incluir["peca"]) + len(incluir["servico"]):
+      raise NotFoundException("Peça ou serviço removido do catálogo durante a alteração.")
+    for (tipo, id), (valor, categoria) in valores.items():
+      if tipo == "peca":
+        valor_pecas += valor
+      else:
+        valor_servicos += valor
+        somar_categoria(categoria, 1, valor)
+  
+  ajustar_totais(session, ordem_servico, valor_servicos, valor_pecas, categorias)
   session.flush()
   
-  return { "message": "Peça removida da ordem de serviço." }
\ No newline at end of file
+  return { "message": "Itens atualizados na ordem de serviço." }
+
+def itens_relacionados(session: Session, ordem_servico_id: int, peca_ids, servico_ids):
+  # {(tipo, id): já está na ordem} para as peças e serviços que existem no catálogo
+  consultas = []
+  if peca_ids:
+    consultas.append(
+      select(literal("peca").label("tipo"), Peca.id, OrdemServicoPeca.peca_id.is_not(None).label("relacionado"))
+      .outerjoin(OrdemServicoPeca, and_(OrdemServicoPeca.ordem_servico_id == ordem_servico_id, OrdemServicoPeca.peca_id == Peca.id))
+      .where(Peca.id.in_(peca_ids))
+    )
+  if servico_ids:
+    consultas.append(
+      select(literal("servico").label("tipo"), Servico.id, OrdemServicoServico.servico_id.is_not(None).label("relacionado"))
+      .outerjoin(OrdemServicoServico, and_(OrdemServicoServico.ordem_servico_id == ordem_servico_id, OrdemServicoServico.servico_id == Servico.id))
+      .where(Servico.id.in_(servico_ids))
+    )
+  if not consultas:
+    return {}
+  
+  return { (tipo, id): bool(relacionado) for tipo, id, relacionado in session.execute(union_all(*consultas)) }
+
+def valores_catalogo(session: Session, pecas: dict, servico_ids):
+  # {(tipo, id): (valor, categoria)} lidos do banco. pecas é {id: quantidade} e o valor delas é preço × quantidade,
+  # arredondado pelo SQLite como nos INSERT das linhas (o round do Python difere nos casos de meio centavo)
+  consultas = []
+  if pecas:
+    consultas.append(
+      select(literal("peca").label("tipo"), Peca.id, func.round(Peca.valor * case(pecas, value=Peca.id), 2), literal(None).label("categoria"))
+      .where(Peca.id.in_(pecas))
+    )
+  if servico_ids:
+    consultas.append(select(literal("servico").label("tipo"), Servico.id, Servico.valor, Servico.categoria).where(Servico.id.in_(servico_ids)))
+  if not consultas:
+    return {}
+  
+  return { (tipo, id): (valor, categoria) for tipo, id, valor, categoria in session.execute(union_all(*consultas)) }
+
+def ajustar_totais(session: Session, ordem_servico: OrdemServico, valor_servicos: float = 0, valor_pecas: float = 0, categorias: dict = {}):
+  # O incremento é feito em SQL para que alterações concorrentes na mesma ordem não se percam
+  relatorio_repository.acumular(
+    session, *relatorio_repository.chave(ordem_servico),
+    valor_servicos=valor_servicos, valor_pecas=valor_pecas, categorias=categorias,
+  )
+  if valor_servicos:
+    ordem_servico.valor_servicos = func.round(OrdemServico.valor_servicos + valor_servicos, 2)
+  if valor_pecas:
+    ordem_servico.valor_pecas = func.round(OrdemServico.valor_pecas + valor_pecas, 2)
+
+def recalcular_totais(session: Session, corrigir: bool = False, tolerancia: float = 0.005):
+  # Compara os subtotais das ordens abertas com a soma dos valores guardados nos itens e, se pedido, corrige as divergências
+  servicos = select(OrdemServicoServico.ordem_servico_id, func.sum(OrdemServicoServico.valor).label("total"))\
+    .group_by(OrdemServicoServico.ordem_servico_id).subquery()
+  pecas = select(OrdemServicoPeca.ordem_servico_id, func.sum(OrdemServicoPeca.valor_total).label("total"))\
+    .group_by(OrdemServicoPeca.ordem_servico_id).subquery()
+  
+  linhas = session.execute(
+    select(
+      OrdemServico.id, OrdemServico.valor_servicos, OrdemServico.valor_pecas,
+      func.round(func.coalesce(servicos.c.total, 0), 2), func.round(func.coalesce(pecas.c.total, 0), 2),
+    )
+    .outerjoin(servicos, servicos.c.ordem_servico_id == OrdemServico.id)
+    .outerjoin(pecas, pecas.c.ordem_servico_id == OrdemServico.id)
+    .where(OrdemServico.situacao != "concluida")
+  )
+  
+  divergentes = [
+    { "id": id, "valor_servicos": servicos_real, "valor_pecas": pecas_real, "valor_servicos_anterior": servicos_atual, "valor_pecas_anterior": pecas_atual }
+    for id, servicos_atual, pecas_atual, servicos_real, pecas_real in linhas
+    if abs(servicos_atual - servicos_real) > tolerancia or abs(pecas_atual - pecas_real) > tolerancia
+  ]
+  
+  if corrigir and divergentes:
+    session.execute(update_statement(OrdemServico), [
+      { "id": item["id"], "valor_servicos": item["valor_servicos"], "valor_pecas": item["valor_pecas"] } for item in divergentes
+    ])
+    # Os resumos somaram os subtotais errados; são refeitos na mesma transação a partir das ordens corrigidas
+    relatorio_repository.reconstruir(session)
+  
+  return divergentes
\ No newline at end of file
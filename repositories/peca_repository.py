@@ -1,19 +1,40 @@
-from sqlalchemy import func
+import csv
+from pydantic import ValidationError
+from sqlalchemy import and_, or_, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+import db.counters as counters
+import repositories.catalog_cache as catalog_cache
 from exceptions.exceptions import BadRequestException, NotFoundException
 from models.models import OrdemServicoPeca, Peca
+from repositories.bulk import insert_many
+from schemas.bulk import format_validation_error
+from schemas.peca_schema import PecaCreate
+
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_MAX_ERROS = 100
 
 def create(session: Session, peca_data: dict):
   peca = Peca(**peca_data)
   peca.ativo = True
   
   session.add(peca)
-  session.flush()
+  flush_unique(session, peca)
   session.refresh(peca)
   return peca
  
-def list(session: Session, skip: int = 0, limit: int = 5):
-  return session.query(Peca).offset(skip).limit(limit).all()
+def create_many(session: Session, pecas_data: list, atomico: bool = False):
+  return insert_many(session, Peca, pecas_data, atomico)
+ 
+def list(session: Session, skip: int = 0, limit: int = 5, cursor: int = None):
+  query = session.query(Peca).order_by(Peca.id)
+  if cursor is not None:
+    query = query.filter(Peca.id > cursor)
+  else:
+    query = query.offset(skip)
+
+  return query.limit(limit).all()
 
 def get(session: Session, peca_id: int):
   peca =  session.query(Peca).filter(Peca.id == peca_id).first()
@@ -22,16 +43,19 @@ def get(session: Session, peca_id: int):
       
   return peca
 
+def cache_stats():
+  return catalog_cache.pecas.stats()
+
 def count(session: Session):
-  result = session.query(func.count(Peca.id)).scalar() or 0
-  return { "quantidade": result }
+  return { "quantidade": counters.count(session, "peca") }
 
 def update(session: Session, peca_id: int, peca_data: dict):
   peca = session.query(Peca).filter(Peca.id == peca_id).first()
   if peca:
     for key, value in peca_data.items():
       setattr(peca, key, value)
-    session.flush()
+    flush_unique(session, peca)
+    catalog_cache.pecas.invalidate(session, peca_id)
     session.refresh(peca)
     return peca
   else:
@@ -48,4 +72,75 @@ def delete(session: Session, peca_id: int):
   
   session.delete(peca)
   session.flush()
-  return peca
\ No newline at end of file
+  catalog_cache.pecas.invalidate(session, peca_id)
+  return peca
+
+def flush_unique(session: Session, peca: Peca):
+  try:
+    session.flush()
+  except IntegrityError:
+    raise BadRequestException(f"Peça com marca {peca.marca} e modelo {peca.modelo} já existe.")
+
+def upsert_many(session: Session, pecas_data: list):
+  # Insere ou atualiza pela chave única (marca, modelo) em um único executemany; retorna (inseridos, atualizados).
+  # Inseridas são as chaves do lote que não existiam antes do upsert. Diferente de comparar com o max(id), isso
+  # não conta linhas que outras requisições incluam ao mesmo tempo nem depende da ordem dos ids.
+  chaves = {(peca["marca"], peca["modelo"]) for peca in pecas_data}
+  existentes = chaves_existentes(session, chaves)
+  
+  statement = insert(Peca)
+  statement = statement.on_conflict_do_update(
+    index_elements=[Peca.marca, Peca.modelo],
+    set_={"nome": statement.excluded.nome, "valor": statement.excluded.valor},
+  )
+  session.connection().execute(statement, pecas_data)
+  catalog_cache.pecas.invalidate(session)
+  
+  # Uma chave repetida no lote é inserida na primeira vez e atualizada nas seguintes
+  inseridos = len(chaves - existentes)
+  return inseridos, len(pecas_data) - inseridos
+
+def chaves_existentes(session: Session, chaves: set, lote: int = 200):
+  # Um OR de (marca, modelo) vira uma busca por chave no índice único; o IN de tuplas percorreria o índice inteiro.
+  # Em lotes, para ficar abaixo dos limites de parâmetros e de profundidade de expressão do SQLite
+  chaves = [*chaves]
+  existentes = set()
+  for inicio in range(0, len(chaves), lote):
+    existentes.update(session.execute(
+      select(Peca.marca, Peca.modelo)
+      .where(or_(*(and_(Peca.marca == marca, Peca.modelo == modelo) for marca, modelo in chaves[inicio:inicio + lote])))
+    ).tuples())
+  return existentes
+
+def import_csv(session: Session, arquivo, delimitador: str = ",", chunk_size: int = IMPORT_CHUNK_SIZE):
+  # Lê o CSV linha a linha (colunas nome, marca, modelo, valor) e grava em lotes de chunk_size
+  arquivo.seek(0)
+  resumo = { "inseridos": 0, "atualizados": 0, "rejeitados": 0, "erros": [] }
+  lote = []
+  
+  def gravar():
+    inseridos, atualizados = upsert_many(session, lote)
+    resumo["inseridos"] += inseridos
+    resumo["atualizados"] += atualizados
+    lote.clear()
+  
+  for linha, registro in enumerate(csv.DictReader(arquivo, delimiter=delimitador), start=2):
+    valor = (registro.get("valor") or "").strip()
+    if "," in valor:
+      # Aceita o formato brasileiro: 1.234,56
+      registro["valor"] = valor.replace(".", "").replace(",", ".")
+    try:
+      lote.append(PecaCreate.model_validate(registro).model_dump())
+    except ValidationError as exc:
+      resumo["rejeitados"] += 1
+      if len(resumo["erros"]) < IMPORT_MAX_ERROS:
+        resumo["erros"].append({ "linha": linha, "detalhe": format_validation_error(exc) })
+      continue
+    
+    if len(lote) >= chunk_size:
+      gravar()
+  
+  if lote:
+    gravar()
+  
+  return resumo
@@ -0,0 +1,162 @@
+from datetime import date
+from sqlalchemy.orm import Session
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models.models import Mecanico, OrdemServico, OrdemServicoServico, RelatorioCategoria, RelatorioOrdem
+
+def chave(ordem_servico: OrdemServico):
+  data = ordem_servico.data_conclusao if ordem_servico.situacao == "concluida" else ordem_servico.data_abertura
+  return data.date(), ordem_servico.mecanico_id, ordem_servico.situacao
+
+def acumular(session: Session, dia: date, mecanico_id: int, situacao: str, ordens: int = 0,
+             valor_servicos: float = 0, valor_pecas: float = 0, categorias: dict = {}):
+  # Soma os deltas nas linhas de resumo (upsert), na mesma transação da alteração da ordem
+  if ordens or valor_servicos or valor_pecas:
+    stmt = sqlite_insert(RelatorioOrdem).values(
+      dia=dia, mecanico_id=mecanico_id, situacao=situacao, ordens=ordens, valor_servicos=valor_servicos, valor_pecas=valor_pecas
+    )
+    session.connection().execute(stmt.on_conflict_do_update(
+      index_elements=[RelatorioOrdem.dia, RelatorioOrdem.mecanico_id, RelatorioOrdem.situacao],
+      set_={
+        "ordens": RelatorioOrdem.ordens + stmt.excluded.ordens,
+        "valor_servicos": func.round(RelatorioOrdem.valor_servicos + stmt.excluded.valor_servicos, 2),
+        "valor_pecas": func.round(RelatorioOrdem.valor_pecas + stmt.excluded.valor_pecas, 2),
+      },
+    ))
+
+  linhas = [
+    { "dia": dia, "mecanico_id": mecanico_id, "categoria": categoria, "situacao": situacao, "servicos": servicos, "valor": valor }
+    for categoria, (servicos, valor) in categorias.items() if servicos or valor
+  ]
+  if linhas:
+    stmt = sqlite_insert(RelatorioCategoria)
+    session.connection().execute(stmt.on_conflict_do_update(
+      index_elements=[RelatorioCategoria.dia, RelatorioCategoria.mecanico_id, RelatorioCategoria.categoria, RelatorioCategoria.situacao],
+      set_={
+        "servicos": RelatorioCategoria.servicos + stmt.excluded.servicos,
+        "valor": func.round(RelatorioCategoria.valor + stmt.excluded.valor, 2),
+      },
+    ), linhas)
+
+def categorias(session: Session, ordem_servico_id: int):
+  # Pelo preço e categoria guardados nos itens, os mesmos valores que formam valor_servicos
+  return {
+    categoria: (servicos, valor) for categoria, servicos, valor in session.execute(
+      select(OrdemServicoServico.categoria, func.count(), func.sum(OrdemServicoServico.valor))
+      .where(OrdemServicoServico.ordem_servico_id == ordem_servico_id)
+      .group_by(OrdemServicoServico.categoria)
+    )
+  }
+
+def registrar(session: Session, ordem_servico: OrdemServico, chave: tuple, sinal: int, categorias: dict):
+  acumular(
+    session, *chave, ordens=sinal,
+    valor_servicos=sinal * ordem_servico.valor_servicos, valor_pecas=sinal * ordem_servico.valor_pecas,
+    categorias={ categoria: (sinal * servicos, sinal * valor) for categoria, (servicos, valor) in categorias.items() },
+  )
+
+def mover(session: Session, ordem_servico: OrdemServico, chave_anterior: tuple):
+  # Transfere a contribuição inteira da ordem quando muda o dia, o mecânico ou a situação
+  chave_atual = chave(ordem_servico)
+  if chave_atual == chave_anterior:
+    return
+
+  itens = categorias(session, ordem_servico.id)
+  registrar(session, ordem_servico, chave_anterior, -1, itens)
+  registrar(session, ordem_servico, chave_atual, 1, itens)
+
+def remover(session: Session, ordem_servico: OrdemServico):
+  registrar(session, ordem_servico, chave(ordem_servico), -1, categorias(session, ordem_servico.id))
+
+def reconstruir(session: Session):
+  # Recalcula os resumos a partir de ordem_servico; usado para corrigir divergências
+  dia = func.date(case((OrdemServico.situacao == "concluida", OrdemServico.data_conclusao), else_=OrdemServico.data_abertura))
+
+  session.execute(delete(RelatorioOrdem))
+  session.execute(delete(RelatorioCategoria))
+  session.execute(insert(RelatorioOrdem).from_select(
+    ["dia", "mecanico_id", "situacao", "ordens", "valor_servicos", "valor_pecas"],
+    select(
+      dia, OrdemServico.mecanico_id, OrdemServico.situacao, func.count(),
+      func.round(func.sum(OrdemServico.valor_servicos), 2), func.round(func.sum(OrdemServico.valor_pecas), 2),
+    ).group_by(dia, OrdemServico.mecanico_id, OrdemServico.situacao)
+  ))
+  session.execute(insert(RelatorioCategoria).from_select(
+    ["dia", "mecanico_id", "categoria", "situacao", "servicos", "valor"],
+    select(
+      dia, OrdemServico.mecanico_id, OrdemServicoServico.categoria, OrdemServico.situacao,
+      func.count(), func.round(func.sum(OrdemServicoServico.valor), 2),
+    )
+    .join(OrdemServicoServico, OrdemServicoServico.ordem_servico_id == OrdemServico.id)
+    .group_by(dia, OrdemServico.mecanico_id, OrdemServicoServico.categoria, OrdemServico.situacao)
+  ))
+
+def periodo(coluna, inicio: date = None, fim: date = None):
+  filtros = []
+  if inicio:
+    filtros.append(coluna >= inicio)
+  if fim:
+    filtros.append(coluna <= fim)
+  return filtros
+
+def receita_por_mecanico(session: Session, inicio: date = None, fim: date = None):
+  return session.execute(
+    select(
+      RelatorioOrdem.mecanico_id, Mecanico.nome, Mecanico.sobrenome,
+      func.sum(RelatorioOrdem.ordens).label("ordens"),
+      func.round(func.sum(RelatorioOrdem.valor_servicos), 2).label("valor_servicos"),
+      func.round(func.sum(RelatorioOrdem.valor_pecas), 2).label("valor_pecas"),
+      func.round(func.sum(RelatorioOrdem.valor_servicos + RelatorioOrdem.valor_pecas), 2).label("valor_total"),
+    )
+    .join(Mecanico, Mecanico.id == RelatorioOrdem.mecanico_id)
+    .where(RelatorioOrdem.situacao == "concluida", *periodo(RelatorioOrdem.dia, inicio, fim))
+    .group_by(RelatorioOrdem.mecanico_id)
+    .order_by(RelatorioOrdem.mecanico_id)
+  ).mappings().all()
+
+def receita_por_categoria(session: Session, inicio: date = None, fim: date = None, mecanico_id: int = None):
+  filtros = periodo(RelatorioCategoria.dia, inicio, fim)
+  if mecanico_id:
+    filtros.append(RelatorioCategoria.mecanico_id == mecanico_id)
+
+  return session.execute(
+    select(
+      RelatorioCategoria.categoria,
+      func.sum(RelatorioCategoria.servicos).label("servicos"),
+      func.round(func.sum(RelatorioCategoria.valor), 2).label("valor"),
+    )
+    .where(RelatorioCategoria.situacao == "concluida", *filtros)
+    .group_by(RelatorioCategoria.categoria)
+    .order_by(RelatorioCategoria.categoria)
+  ).mappings().all()
+
+def receita_mensal(session: Session, inicio: date = None, fim: date = None, mecanico_id: int = None):
+  filtros = periodo(RelatorioOrdem.dia, inicio, fim)
+  if mecanico_id:
+    filtros.append(RelatorioOrdem.mecanico_id == mecanico_id)
+
+  mes = func.strftime("%Y-%m", RelatorioOrdem.dia)
+  return session.execute(
+    select(
+      mes.label("mes"),
+      func.sum(RelatorioOrdem.ordens).label("ordens"),
+      func.round(func.sum(RelatorioOrdem.valor_servicos), 2).label("valor_servicos"),
+      func.round(func.sum(RelatorioOrdem.valor_pecas), 2).label("valor_pecas"),
+      func.round(func.sum(RelatorioOrdem.valor_servicos + RelatorioOrdem.valor_pecas), 2).label("valor_total"),
+    )
+    .where(RelatorioOrdem.situacao == "concluida", *filtros)
+    .group_by(mes)
+    .order_by(mes)
+  ).mappings().all()
+
+def ordens_por_situacao(session: Session, inicio: date = None, fim: date = None, mecanico_id: int = None):
+  filtros = periodo(RelatorioOrdem.dia, inicio, fim)
+  if mecanico_id:
+    filtros.append(RelatorioOrdem.mecanico_id == mecanico_id)
+
+  return session.execute(
+    select(RelatorioOrdem.situacao, func.sum(RelatorioOrdem.ordens).label("ordens"))
+    .where(*filtros)
+    .group_by(RelatorioOrdem.situacao)
+    .order_by(RelatorioOrdem.situacao)
+  ).mappings().all()
@@ -1,7 +1,9 @@
-from sqlalchemy import func
 from sqlalchemy.orm import Session
+import db.counters as counters
+import repositories.catalog_cache as catalog_cache
 from exceptions.exceptions import BadRequestException, NotFoundException
 from models.models import OrdemServicoServico, Servico
+from repositories.bulk import insert_many
 
 def create(session: Session, servico_data: dict):
   servico = Servico(**servico_data)
@@ -12,8 +14,19 @@ def create(session: Session, servico_data: dict):
   session.refresh(servico)
   return servico
  
-def list(session: Session, skip: int = 0, limit: int = 5):
-  return session.query(Servico).offset(skip).limit(limit).all()
+def create_many(session: Session, servicos_data: list, atomico: bool = False):
+  for _, servico_data in servicos_data:
+    servico_data["ativo"] = True
+  return insert_many(session, Servico, servicos_data, atomico)
+ 
+def list(session: Session, skip: int = 0, limit: int = 5, cursor: int = None):
+  query = session.query(Servico).order_by(Servico.id)
+  if cursor is not None:
+    query = query.filter(Servico.id > cursor)
+  else:
+    query = query.offset(skip)
+
+  return query.limit(limit).all()
 
 def get(session: Session, servico_id: int):
   servico = session.query(Servico).filter(Servico.id == servico_id).first()
@@ -22,9 +35,11 @@ def get(session: Session, servico_id: int):
       
   return servico
 
+def cache_stats():
+  return catalog_cache.servicos.stats()
+
 def count(session: Session):
-  result = session.query(func.count(Servico.id)).scalar() or 0
-  return { "quantidade": result }
+  return { "quantidade": counters.count(session, "servico") }
 
 def update(session: Session, servico_id: int, servico_data: dict):
   servico = session.query(Servico).filter(Servico.id == servico_id).first()
@@ -33,6 +48,7 @@ def update(session: Session, servico_id: int, servico_data: dict):
     for key, value in servico_data.items():
       setattr(servico, key, value)
     session.flush()
+    catalog_cache.servicos.invalidate(session, servico_id)
     session.refresh(servico)
     return servico
   else:
@@ -49,4 +65,5 @@ def delete(session: Session, servico_id: int):
     
   session.delete(servico)
   session.flush()
+  catalog_cache.servicos.invalidate(session, servico_id)
   return servico
@@ -0,0 +1,46 @@
+import json
+from typing import List, Optional, Type
+from pydantic import BaseModel, ValidationError
+from exceptions.exceptions import BadRequestException
+
+class BulkItemError(BaseModel):
+  indice: int
+  detalhe: str
+
+class BulkCreateResponse(BaseModel):
+  ids: List[Optional[int]]
+  erros: List[BulkItemError]
+
+def format_validation_error(exc: ValidationError) -> str:
+  return "; ".join(f"{'.'.join(str(campo) for campo in erro['loc'])}: {erro['msg']}" for erro in exc.errors())
+
+def parse_bulk_items(body: bytes, content_type: str, schema: Type[BaseModel]):
+  # Aceita um array JSON ou NDJSON (um objeto por linha); retorna [(indice, dict)] válidos e os erros por item
+  if "ndjson" in (content_type or ""):
+    linhas = [linha for linha in body.decode("utf-8").splitlines() if linha.strip()]
+    brutos = []
+    for linha in linhas:
+      try:
+        brutos.append(json.loads(linha))
+      except ValueError as exc:
+        brutos.append(exc)
+  else:
+    try:
+      brutos = json.loads(body or b"[]")
+    except ValueError:
+      raise BadRequestException("Corpo da requisição não é um JSON válido.")
+    if not isinstance(brutos, list):
+      raise BadRequestException("O corpo deve ser um array JSON ou NDJSON.")
+
+  itens = []
+  erros = []
+  for indice, bruto in enumerate(brutos):
+    if isinstance(bruto, Exception):
+      erros.append(BulkItemError(indice=indice, detalhe=f"JSON inválido: {bruto}"))
+      continue
+    try:
+      itens.append((indice, schema.model_validate(bruto).model_dump()))
+    except ValidationError as exc:
+      erros.append(BulkItemError(indice=indice, detalhe=format_validation_error(exc)))
+
+  return itens, erros, len(brutos)
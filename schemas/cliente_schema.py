@@ -1,5 +1,5 @@
 from typing import List
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from schemas.util import Pagination
 
 class ClienteCreate(BaseModel):
@@ -17,12 +17,10 @@ class ClienteUpdate(BaseModel):
 class ClienteResponse(ClienteCreate):
   id: int
 
-  class Config:
-    orm_mode = True
+  model_config = ConfigDict(from_attributes=True)
     
 class ClientePaginatedResponse(BaseModel):
   pagination: Pagination
   clientes: List[ClienteResponse]
 
-  class Config:
-    orm_mode = True
+  model_config = ConfigDict(from_attributes=True)
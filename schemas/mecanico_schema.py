@@ -1,5 +1,5 @@
 from typing import List
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from schemas.util import Pagination
 
 class MecanicoCreate(BaseModel):
@@ -17,12 +17,10 @@ class MecanicoUpdate(BaseModel):
 class MecanicoResponse(MecanicoCreate):
   id: int
 
-  class Config:
-    orm_mode = True
+  model_config = ConfigDict(from_attributes=True)
     
 class MecanicoPaginatedResponse(BaseModel):
   pagination: Pagination
   mecanicos: List[MecanicoResponse]
 
-  class Config:
-    orm_mode = True
+  model_config = ConfigDict(from_attributes=True)
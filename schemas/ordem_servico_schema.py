@@ -1,5 +1,5 @@
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import BaseModel, ConfigDict
 from schemas.cliente_schema import ClienteResponse
 from schemas.mecanico_schema import MecanicoResponse
 from schemas.util import Pagination
@@ -9,6 +9,12 @@ class OrdemServicoPecaCreate(BaseModel):
   quantidade: int
   peca_id: int
   
+class OrdemServicoItemOperacao(BaseModel):
+  acao: Literal["adicionar", "remover"]
+  tipo: Literal["peca", "servico"]
+  id: int
+  quantidade: int = 1
+  
 class OrdemServicoCreate(BaseModel):
   cliente_id: int
   mecanico_id: int
@@ -25,9 +31,10 @@ class OrdemServicoResponse(BaseModel):
   data_conclusao: Optional[datetime] = None
   situacao: str
   valor: Optional[float] = None
+  valor_servicos: float = 0
+  valor_pecas: float = 0
 
-  class Config:
-    orm_mode = True
+  model_config = ConfigDict(from_attributes=True)
     
 class OrdemServicoPartialResponse(BaseModel):
   id: int
@@ -35,19 +42,19 @@ class OrdemServicoPartialResponse(BaseModel):
   data_conclusao: Optional[datetime] = None
   situacao: str
   valor: Optional[float] = None
+  valor_servicos: float = 0
+  valor_pecas: float = 0
   
   cliente: ClienteResponse
   mecanico: MecanicoResponse
 
-  class Config:
-    orm_mode = True
+  model_config = ConfigDict(from_attributes=True)
     
 class OrdemServicoPaginatedResponse(BaseModel):
   pagination: Pagination
   ordens_servicos: List[OrdemServicoPartialResponse]
 
-  class Config:
-    orm_mode = True
+  model_config = ConfigDict(from_attributes=True)
     
 class OrdemServicoServicoResponse(BaseModel):
   id: int
@@ -69,6 +76,8 @@ class OrdemServicoFullResponse(BaseModel):
   data_conclusao: Optional[datetime] = None
   situacao: str
   valor: Optional[float] = None
+  valor_servicos: float = 0
+  valor_pecas: float = 0
   
   cliente: ClienteResponse
   mecanico: MecanicoResponse
@@ -76,7 +85,6 @@ class OrdemServicoFullResponse(BaseModel):
   servicos: List[OrdemServicoServicoResponse]
   pecas: List[OrdemServicoPecaResponse]
 
-  class Config:
-    orm_mode = True
+  model_config = ConfigDict(from_attributes=True)
 
 
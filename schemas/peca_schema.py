@@ -1,5 +1,5 @@
 from typing import List
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from schemas.util import Pagination
 
 class PecaCreate(BaseModel):
@@ -17,12 +17,20 @@ class PecaUpdate(BaseModel):
 class PecaResponse(PecaCreate):
   id: int
 
-  class Config:
-    orm_mode = True
+  model_config = ConfigDict(from_attributes=True)
     
 class PecaPaginatedResponse(BaseModel):
   pagination: Pagination
   pecas: List[PecaResponse]
 
-  class Config:
-    orm_mode = True
+  model_config = ConfigDict(from_attributes=True)
+
+class PecaImportError(BaseModel):
+  linha: int
+  detalhe: str
+
+class PecaImportResponse(BaseModel):
+  inseridos: int
+  atualizados: int
+  rejeitados: int
+  erros: List[PecaImportError]
@@ -0,0 +1,39 @@
+from typing import List
+from pydantic import BaseModel
+
+class ReceitaMecanicoResponse(BaseModel):
+  mecanico_id: int
+  nome: str
+  sobrenome: str
+  ordens: int
+  valor_servicos: float
+  valor_pecas: float
+  valor_total: float
+
+class ReceitaCategoriaResponse(BaseModel):
+  categoria: str
+  servicos: int
+  valor: float
+
+class ReceitaMensalResponse(BaseModel):
+  mes: str
+  ordens: int
+  valor_servicos: float
+  valor_pecas: float
+  valor_total: float
+
+class OrdensSituacaoResponse(BaseModel):
+  situacao: str
+  ordens: int
+
+class RelatorioMecanicosResponse(BaseModel):
+  mecanicos: List[ReceitaMecanicoResponse]
+
+class RelatorioCategoriasResponse(BaseModel):
+  categorias: List[ReceitaCategoriaResponse]
+
+class RelatorioMensalResponse(BaseModel):
+  meses: List[ReceitaMensalResponse]
+
+class RelatorioSituacoesResponse(BaseModel):
+  situacoes: List[OrdensSituacaoResponse]
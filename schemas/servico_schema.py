@@ -1,5 +1,5 @@
 from typing import List
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from schemas.util import Pagination
 
 class ServicoCreate(BaseModel):
@@ -17,12 +17,10 @@ class ServicoResponse(ServicoCreate):
   id: int
   ativo: bool
 
-  class Config:
-    orm_mode = True
+  model_config = ConfigDict(from_attributes=True)
     
 class ServicoPaginatedResponse(BaseModel):
   pagination: Pagination
   servicos: List[ServicoResponse]
 
-  class Config:
-    orm_mode = True
+  model_config = ConfigDict(from_attributes=True)
@@ -1,5 +1,33 @@
+import base64
+import binascii
+import json
+from typing import Optional
 from pydantic import BaseModel
+from exceptions.exceptions import BadRequestException
 
 class Pagination(BaseModel):
   skip: int
   limit: int
+  cursor: Optional[str] = None
+  next_cursor: Optional[str] = None
+
+def encode_cursor(*values) -> str:
+  raw = json.dumps(values, separators=(",", ":"))
+  return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types: type) -> list:
+  # types é o tipo esperado de cada posição, ex.: (int,) para o id ou (str, int) para data ISO e id
+  try:
+    padding = "=" * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+  except (ValueError, binascii.Error):
+    raise BadRequestException("Cursor inválido.")
+
+  if not isinstance(values, list) or len(values) != len(types):
+    raise BadRequestException("Cursor inválido.")
+
+  # bool é subclasse de int, mas true/false não são ids
+  if any(isinstance(value, bool) or not isinstance(value, type_) for value, type_ in zip(values, types)):
+    raise BadRequestException("Cursor inválido.")
+
+  return values
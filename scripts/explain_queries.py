@@ -0,0 +1,174 @@
+"""Executa as consultas dos repositórios sob EXPLAIN QUERY PLAN e falha se alguma consulta quente varrer uma tabela inteira.
+
+Cria um banco descartável com o schema atual (models.models), roda cada função de repositório com um conjunto
+mínimo de dados, captura o SQL emitido e inspeciona o plano de cada instrução.
+
+Uso: python -m scripts.explain_queries [--verbose]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+def build_cases():
+  import repositories.cliente_repository as cliente_repository
+  import repositories.mecanico_repository as mecanico_repository
+  import repositories.ordem_servico_repository as ordem_servico_repository
+  import repositories.peca_repository as peca_repository
+  import repositories.relatorio_repository as relatorio_repository
+  import repositories.servico_repository as servico_repository
+  from controllers.ordem_servico_controller import get_filtros
+  from schemas.ordem_servico_schema import OrdemServicoCreate, OrdemServicoItemOperacao, OrdemServicoPecaCreate, OrdemServicoUpdate
+
+  def filtros(**kwargs):
+    valores = dict(mecanico_id=None, cliente_id=None, nome_mecanico=None, nome_cliente=None, data_abertura_inicio=None, data_abertura_fim=None)
+    valores.update(kwargs)
+    return get_filtros(**valores)
+
+  inicio, fim = datetime(2024, 1, 1), datetime(2030, 1, 1)
+
+  # (nome, função, tabelas em que uma varredura é esperada): a primeira página por offset percorre a tabela em ordem de id
+  return [
+    ("cliente.list", lambda s: cliente_repository.list(s, 0, 5), {"cliente"}),
+    ("cliente.list cursor", lambda s: cliente_repository.list(s, 0, 5, 1), set()),
+    ("cliente.get", lambda s: cliente_repository.get(s, 1), set()),
+    ("cliente.delete", lambda s: cliente_repository.delete(s, 1), set()),
+    ("mecanico.list cursor", lambda s: mecanico_repository.list(s, 0, 5, 1), set()),
+    ("mecanico.get", lambda s: mecanico_repository.get(s, 1), set()),
+    ("mecanico.delete", lambda s: mecanico_repository.delete(s, 1), set()),
+    ("peca.list cursor", lambda s: peca_repository.list(s, 0, 5, 1), set()),
+    ("peca.get", lambda s: peca_repository.get(s, 1), set()),
+    ("peca.delete", lambda s: peca_repository.delete(s, 1), set()),
+    ("peca.upsert_many", lambda s: peca_repository.upsert_many(s, [
+      dict(nome="Filtro", marca="Bosch", modelo="F1", valor=12), dict(nome="Vela", marca="NGK", modelo="V1", valor=20),
+    ]), set()),
+    ("cliente.create_many", lambda s: cliente_repository.create_many(s, [
+      (i, dict(nome="Ana", sobrenome="Lima", endereco="Rua B", telefone="1198888")) for i in range(3)
+    ], True), set()),
+    ("servico.list cursor", lambda s: servico_repository.list(s, 0, 5, 1), set()),
+    ("servico.get", lambda s: servico_repository.get(s, 1), set()),
+    ("servico.delete", lambda s: servico_repository.delete(s, 1), set()),
+    ("ordem_servico.list", lambda s: ordem_servico_repository.list(s, 0, 5, filtros()), set()),
+    ("ordem_servico.list cursor", lambda s: ordem_servico_repository.list(s, 0, 5, filtros(), (fim, 10)), set()),
+    ("ordem_servico.list mecanico_id", lambda s: ordem_servico_repository.list(s, 0, 5, filtros(mecanico_id=1)), set()),
+    ("ordem_servico.list cliente_id", lambda s: ordem_servico_repository.list(s, 0, 5, filtros(cliente_id=1)), set()),
+    ("ordem_servico.list nome_cliente", lambda s: ordem_servico_repository.list(s, 0, 5, filtros(nome_cliente="joao")), set()),
+    ("ordem_servico.list nome_mecanico", lambda s: ordem_servico_repository.list(s, 0, 5, filtros(nome_mecanico="jose")), set()),
+    ("ordem_servico.list data_abertura", lambda s: ordem_servico_repository.list(s, 0, 5, filtros(data_abertura_inicio=inicio, data_abertura_fim=fim)), set()),
+    ("ordem_servico.create", lambda s: ordem_servico_repository.create(s, OrdemServicoCreate(cliente_id=1, mecanico_id=1)), set()),
+    ("ordem_servico.update", lambda s: ordem_servico_repository.update(s, 1, OrdemServicoUpdate(cliente_id=1, mecanico_id=1)), set()),
+    ("ordem_servico.get", lambda s: ordem_servico_repository.get(s, 1), set()),
+    ("ordem_servico.versao", lambda s: ordem_servico_repository.versao(s, 1), set()),
+    ("ordem_servico.export", lambda s: [*ordem_servico_repository.export(s, filtros(cliente_id=1))], set()),
+    ("ordem_servico.add_peca", lambda s: ordem_servico_repository.add_peca(s, 1, OrdemServicoPecaCreate(peca_id=1, quantidade=1)), set()),
+    ("ordem_servico.add_servico", lambda s: ordem_servico_repository.add_servico(s, 1, 2), set()),
+    ("ordem_servico.remove_peca", lambda s: ordem_servico_repository.remove_peca(s, 1, 1), set()),
+    ("ordem_servico.remove_servico", lambda s: ordem_servico_repository.remove_servico(s, 1, 1), set()),
+    ("ordem_servico.apply_itens", lambda s: ordem_servico_repository.apply_itens(s, 1, [
+      OrdemServicoItemOperacao(acao="adicionar", tipo="peca", id=1, quantidade=2),
+      OrdemServicoItemOperacao(acao="remover", tipo="peca", id=1),
+      OrdemServicoItemOperacao(acao="adicionar", tipo="peca", id=1, quantidade=1),
+      OrdemServicoItemOperacao(acao="remover", tipo="servico", id=1),
+      OrdemServicoItemOperacao(acao="adicionar", tipo="servico", id=2),
+    ]), set()),
+    ("ordem_servico.concluir", lambda s: ordem_servico_repository.concluir(s, 1), set()),
+    ("relatorio.receita_por_mecanico", lambda s: relatorio_repository.receita_por_mecanico(s, inicio.date(), fim.date()), set()),
+    ("relatorio.receita_por_categoria", lambda s: relatorio_repository.receita_por_categoria(s, inicio.date(), fim.date()), set()),
+    ("relatorio.receita_mensal", lambda s: relatorio_repository.receita_mensal(s, inicio.date(), fim.date(), 1), set()),
+    ("relatorio.ordens_por_situacao", lambda s: relatorio_repository.ordens_por_situacao(s, inicio.date(), fim.date()), set()),
+  ]
+
+def seed(session):
+  from models.models import Cliente, Mecanico, OrdemServico, OrdemServicoPeca, OrdemServicoServico, Peca, Servico
+
+  session.add_all([
+    Cliente(id=1, nome="João", sobrenome="Silva", endereco="Rua A", telefone="1199999"),
+    Mecanico(id=1, nome="José", sobrenome="Souza", telefone="1199999", email="jose@oficina.com"),
+    Peca(id=1, nome="Filtro", marca="Bosch", modelo="F1", valor=10),
+    Servico(id=1, nome="Troca de óleo", valor=50, ativo=True, categoria="Manutenção"),
+    Servico(id=2, nome="Alinhamento", valor=80, ativo=True, categoria="Suspensão"),
+  ])
+  session.flush()
+  session.add(OrdemServico(id=1, cliente_id=1, mecanico_id=1, data_abertura=datetime(2025, 1, 1), situacao="pendente"))
+  session.flush()
+  session.add_all([
+    OrdemServicoPeca(ordem_servico_id=1, peca_id=1, quantidade=1),
+    OrdemServicoServico(ordem_servico_id=1, servico_id=1),
+  ])
+  session.commit()
+
+def full_scans(plano: list, permitidas: set) -> list:
+  # "SCAN tabela" sem índice é uma varredura completa; varreduras por índice e tabelas virtuais (FTS) são aceitas
+  varreduras = []
+  for linha in plano:
+    detalhe = linha[-1]
+    if not detalhe.startswith("SCAN ") or " USING " in detalhe or "VIRTUAL TABLE" in detalhe or detalhe == "SCAN CONSTANT ROW":
+      continue
+    tabela = detalhe.split()[1]
+    if tabela not in permitidas:
+      varreduras.append(detalhe)
+  return varreduras
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--verbose", action="store_true", help="mostra o plano de todas as instruções")
+  args = parser.parse_args()
+
+  diretorio = tempfile.mkdtemp()
+  os.environ["DATABASE_URL"] = f"sqlite:///{diretorio}/explain.db"
+
+  from sqlalchemy import event
+  from db.database import Base, SessionLocal, engine
+  import models.models  # noqa: F401
+
+  Base.metadata.create_all(engine)
+  with SessionLocal() as session:
+    seed(session)
+
+  capturadas = []
+
+  @event.listens_for(engine, "before_cursor_execute")
+  def capturar(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")):
+      capturadas.append((statement, parameters[0] if executemany else parameters))
+
+  falhas = 0
+  for nome, funcao, permitidas in build_cases():
+    capturadas.clear()
+    session = SessionLocal()
+    try:
+      funcao(session)
+    except Exception as exc:
+      # Erros de regra de negócio (ex.: delete bloqueado por relacionamento) não impedem a análise do SQL emitido
+      if args.verbose:
+        print(f"  ({nome}: {type(exc).__name__}: {exc})")
+    instrucoes = [*capturadas]
+
+    problemas = []
+    planos = []
+    connection = session.connection()
+    for statement, parameters in instrucoes:
+      plano = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+      planos.append((statement, plano))
+      problemas += full_scans(plano, permitidas)
+    session.rollback()
+    session.close()
+
+    status = "FALHA" if problemas else "ok"
+    print(f"{status:>5}  {nome} ({len(instrucoes)} instruções)")
+    for problema in problemas:
+      print(f"         {problema}")
+    if args.verbose:
+      for statement, plano in planos:
+        print("         " + " ".join(statement.split())[:120])
+        for linha in plano:
+          print(f"           {linha[-1]}")
+    falhas += bool(problemas)
+
+  if falhas:
+    print(f"\n{falhas} consulta(s) com varredura completa de tabela.")
+    sys.exit(1)
+
+if __name__ == "__main__":
+  main()
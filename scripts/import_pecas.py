@@ -0,0 +1,24 @@
+"""Importa um CSV de peças (nome, marca, modelo, valor), inserindo ou atualizando pela chave (marca, modelo).
+
+Uso: python -m scripts.import_pecas tabela.csv [--delimitador ";"]
+"""
+import argparse
+import json
+from db.database import SessionLocal
+import repositories.peca_repository as peca_repository
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("arquivo")
+  parser.add_argument("--delimitador", default=",")
+  parser.add_argument("--chunk-size", type=int, default=peca_repository.IMPORT_CHUNK_SIZE)
+  args = parser.parse_args()
+
+  with open(args.arquivo, encoding="utf-8-sig", newline="") as arquivo, SessionLocal() as session:
+    resumo = peca_repository.import_csv(session, arquivo, args.delimitador, args.chunk_size)
+    session.commit()
+
+  print(json.dumps(resumo, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,22 @@
+"""Recalcula a tabela contador (usada pelos endpoints /count) a partir das tabelas.
+
+Uso: python -m scripts.rebuild_contadores
+"""
+import argparse
+import json
+from sqlalchemy import text
+from db.counters import rebuild_counters
+from db.database import SessionLocal
+
+def main():
+  argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+
+  with SessionLocal() as session:
+    rebuild_counters(session)
+    session.commit()
+    contadores = dict(session.execute(text("SELECT chave, quantidade FROM contador ORDER BY chave")).all())
+
+  print(json.dumps(contadores, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,19 @@
+"""Reconstrói as tabelas de resumo dos relatórios (relatorio_ordem, relatorio_categoria) a partir das ordens de serviço.
+
+Uso: python -m scripts.rebuild_relatorios
+"""
+import argparse
+from db.database import SessionLocal
+import repositories.relatorio_repository as relatorio_repository
+
+def main():
+  argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+
+  with SessionLocal() as session:
+    relatorio_repository.reconstruir(session)
+    session.commit()
+
+  print("Relatórios reconstruídos.")
+
+if __name__ == "__main__":
+  main()
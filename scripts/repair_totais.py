@@ -0,0 +1,23 @@
+"""Confere os subtotais (valor_servicos, valor_pecas) das ordens abertas contra os itens e lista as divergências.
+Com --corrigir grava os subtotais recalculados e reconstrói os resumos dos relatórios.
+
+Uso: python -m scripts.repair_totais [--corrigir]
+"""
+import argparse
+import json
+from db.database import SessionLocal
+import repositories.ordem_servico_repository as ordem_servico_repository
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--corrigir", action="store_true", help="grava os subtotais recalculados e reconstrói os resumos")
+  args = parser.parse_args()
+
+  with SessionLocal() as session:
+    divergentes = ordem_servico_repository.recalcular_totais(session, args.corrigir)
+    session.commit()
+
+  print(json.dumps({ "divergentes": len(divergentes), "corrigidos": args.corrigir, "ordens": divergentes }, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+  main()
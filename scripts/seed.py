@@ -0,0 +1,397 @@
+"""Gera dados sintéticos realistas direto nas tabelas de models.models, para testes de escala.
+
+Clientes e mecânicos com nomes, telefones e endereços brasileiros, um catálogo de peças e serviços e o histórico de
+ordens com distribuições assimétricas: poucos mecânicos concentram boa parte das ordens, algumas peças e serviços
+aparecem em muitas delas e o movimento tem pico na segunda-feira de manhã. A mesma --seed (com o mesmo --ate)
+gera sempre os mesmos dados.
+
+As linhas são inseridas com executemany em transações de --lote ordens, com os triggers e os índices secundários
+das tabelas de ordens removidos durante a carga e recriados no fim. Subtotais, valor, situação e data de conclusão
+seguem as regras de concluir; os resumos dos relatórios e os contadores são reconstruídos no fim. Em um banco que
+já tem dados, as linhas novas entram depois dos maiores ids existentes.
+
+Uso:
+  DATABASE_URL=sqlite:///escala.db python -m scripts.seed --escala grande
+  python -m scripts.seed --ordens 2700000 --mecanicos 400 --seed 7 --verificar
+"""
+import argparse
+import json
+import random
+import time
+import unicodedata
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+ESCALAS = {
+  "pequena": {"clientes": 1000, "mecanicos": 50, "pecas": 200, "servicos": 60, "ordens": 20000},
+  "media": {"clientes": 5000, "mecanicos": 200, "pecas": 1000, "servicos": 150, "ordens": 200000},
+  "grande": {"clientes": 10000, "mecanicos": 500, "pecas": 2000, "servicos": 300, "ordens": 1000000},
+}
+
+NOMES = [
+  "Ana", "Maria", "Juliana", "Fernanda", "Patrícia", "Aline", "Camila", "Amanda", "Bruna", "Letícia", "Mariana",
+  "Beatriz", "Larissa", "Gabriela", "Vanessa", "Adriana", "Luciana", "Sandra", "Renata", "Cláudia", "Débora",
+  "José", "João", "Antônio", "Francisco", "Carlos", "Paulo", "Pedro", "Lucas", "Luiz", "Marcos", "Luís", "Gabriel",
+  "Rafael", "Daniel", "Marcelo", "Bruno", "Eduardo", "Felipe", "Rodrigo", "Gustavo", "André", "Fernando",
+  "Fábio", "Leonardo", "Ricardo", "Thiago", "Diego", "Vinícius", "Matheus", "Sérgio", "Jorge", "Roberto",
+]
+# (sobrenome, peso): Silva e Santos aparecem muito mais que os demais
+SOBRENOMES = [
+  ("Silva", 30), ("Santos", 20), ("Oliveira", 14), ("Souza", 13), ("Rodrigues", 9), ("Ferreira", 9), ("Alves", 9),
+  ("Pereira", 8), ("Lima", 8), ("Gomes", 7), ("Costa", 6), ("Ribeiro", 6), ("Martins", 6), ("Carvalho", 5),
+  ("Almeida", 5), ("Lopes", 5), ("Soares", 4), ("Fernandes", 4), ("Vieira", 4), ("Barbosa", 4), ("Rocha", 4),
+  ("Dias", 3), ("Nascimento", 3), ("Andrade", 3), ("Moreira", 3), ("Nunes", 3), ("Marques", 3), ("Machado", 3),
+  ("Mendes", 2), ("Freitas", 2), ("Cardoso", 2), ("Ramos", 2), ("Gonçalves", 2), ("Santana", 2), ("Teixeira", 2),
+  ("Araújo", 2), ("Batista", 1), ("Correia", 1), ("Cavalcanti", 1), ("Monteiro", 1), ("Moura", 1), ("Pinto", 1),
+]
+# (cidade, UF, DDD, peso): a oficina atende principalmente a Grande São Paulo
+CIDADES = [
+  ("São Paulo", "SP", "11", 45), ("Guarulhos", "SP", "11", 8), ("Osasco", "SP", "11", 6), ("Santo André", "SP", "11", 6),
+  ("São Bernardo do Campo", "SP", "11", 6), ("Barueri", "SP", "11", 3), ("Campinas", "SP", "19", 4),
+  ("Jundiaí", "SP", "11", 3), ("Santos", "SP", "13", 3), ("Sorocaba", "SP", "15", 2), ("Rio de Janeiro", "RJ", "21", 2),
+  ("Belo Horizonte", "MG", "31", 1), ("Curitiba", "PR", "41", 1),
+]
+LOGRADOUROS = [
+  "Rua das Flores", "Rua Sete de Setembro", "Rua XV de Novembro", "Avenida Paulista", "Rua Tiradentes",
+  "Avenida Brasil", "Rua Santos Dumont", "Avenida Getúlio Vargas", "Rua Dom Pedro II", "Rua Marechal Deodoro",
+  "Rua Rui Barbosa", "Avenida Independência", "Rua São João", "Rua das Palmeiras", "Travessa da Paz",
+  "Rua Bela Vista", "Avenida dos Bandeirantes", "Rua Amazonas", "Rua Bahia", "Alameda Santos",
+]
+BAIRROS = [
+  "Centro", "Jardim América", "Vila Mariana", "Mooca", "Tatuapé", "Santana", "Pinheiros", "Lapa", "Ipiranga",
+  "Vila Prudente", "Jardim Paulista", "Butantã", "Penha", "Saúde", "Casa Verde", "Vila Nova", "Jardim das Acácias",
+]
+VEICULOS = [
+  "Gol", "Onix", "HB20", "Corolla", "Civic", "Strada", "Hilux", "Kwid", "Argo", "Renegade", "Compass", "Polo",
+  "T-Cross", "Saveiro", "Palio", "Uno", "Fiesta", "Ka", "Sandero", "Logan", "Creta", "Tracker", "Cruze", "Toro",
+]
+# (tipo de peça, marcas, faixa de preço, quantidades usuais por ordem)
+PECAS = [
+  ("Filtro de óleo", ["Tecfil", "Mann", "Fram", "Bosch"], (18, 65), (1,)),
+  ("Óleo de motor 5W30 (litro)", ["Lubrax", "Mobil", "Shell", "Castrol"], (35, 70), (4, 4, 5)),
+  ("Filtro de ar", ["Tecfil", "Mann", "Fram"], (25, 90), (1,)),
+  ("Filtro de combustível", ["Tecfil", "Bosch", "Mann"], (20, 80), (1,)),
+  ("Pastilha de freio", ["Fras-le", "Cobreq", "Bosch", "TRW"], (70, 260), (1,)),
+  ("Disco de freio", ["Fremax", "Hipper Freios", "TRW"], (120, 480), (2,)),
+  ("Amortecedor", ["Cofap", "Monroe", "Nakata"], (180, 750), (2, 2, 4)),
+  ("Vela de ignição", ["NGK", "Bosch", "Denso"], (15, 70), (4, 4, 3)),
+  ("Correia dentada", ["Gates", "Continental", "Dayco"], (60, 280), (1,)),
+  ("Bateria 60Ah", ["Moura", "Heliar", "Zetta"], (380, 780), (1,)),
+  ("Lâmpada do farol", ["Osram", "Philips"], (20, 120), (1, 2)),
+  ("Bomba d'água", ["Urba", "Indisa", "SKF"], (110, 420), (1,)),
+  ("Kit de embreagem", ["LUK", "Sachs", "Valeo"], (450, 1600), (1,)),
+  ("Pneu aro 15", ["Pirelli", "Michelin", "Goodyear", "Bridgestone"], (320, 820), (1, 2, 2, 4)),
+  ("Junta do cabeçote", ["Sabó", "Taranto"], (60, 260), (1,)),
+  ("Radiador", ["Valeo", "Visconde", "Denso"], (380, 1300), (1,)),
+  ("Sensor de oxigênio", ["Bosch", "NGK", "Denso"], (160, 620), (1,)),
+  ("Terminal de direção", ["Nakata", "Viemar", "TRW"], (45, 180), (1, 2)),
+  ("Pivô de suspensão", ["Nakata", "Viemar", "Perfect"], (50, 200), (1, 2)),
+  ("Rolamento de roda", ["SKF", "NSK", "FAG"], (70, 310), (1, 2)),
+  ("Fluido de freio DOT 4", ["Bosch", "Varga", "TRW"], (25, 60), (1,)),
+  ("Palheta do limpador", ["Bosch", "Dyna"], (30, 110), (2,)),
+]
+# (serviço, categoria, faixa de preço)
+SERVICOS = [
+  ("Troca de óleo e filtro", "Manutenção", (60, 140)), ("Revisão completa", "Manutenção", (250, 900)),
+  ("Alinhamento", "Suspensão", (60, 140)), ("Balanceamento", "Suspensão", (50, 120)),
+  ("Troca de amortecedores", "Suspensão", (180, 450)), ("Troca de pastilhas", "Freios", (80, 200)),
+  ("Troca de discos de freio", "Freios", (120, 300)), ("Sangria do sistema de freio", "Freios", (70, 160)),
+  ("Troca de embreagem", "Transmissão", (350, 900)), ("Diagnóstico eletrônico", "Elétrica", (90, 250)),
+  ("Troca de bateria", "Elétrica", (30, 80)), ("Revisão do sistema elétrico", "Elétrica", (150, 420)),
+  ("Higienização do ar-condicionado", "Ar-condicionado", (90, 220)), ("Recarga de gás do ar-condicionado", "Ar-condicionado", (150, 380)),
+  ("Troca de correia dentada", "Motor", (220, 600)), ("Limpeza de bicos injetores", "Motor", (150, 380)),
+  ("Retífica de motor", "Motor", (2500, 7000)), ("Troca de velas", "Motor", (60, 160)),
+  ("Funilaria (por peça)", "Funilaria e pintura", (300, 1200)), ("Pintura (por peça)", "Funilaria e pintura", (350, 1400)),
+  ("Polimento", "Estética", (150, 450)), ("Cristalização de pintura", "Estética", (250, 700)),
+]
+PORTES = ["", " - hatch", " - sedã", " - SUV", " - picape"]
+
+# Segunda-feira concentra a entrada de carros; domingo a oficina não abre
+PESO_DIA_DA_SEMANA = [1.7, 1.2, 1.1, 1.1, 1.2, 0.6, 0.0]
+# Aberturas por hora, das 7h às 18h, com pico no início da manhã
+PESO_HORA = {7: 5, 8: 12, 9: 10, 10: 7, 11: 5, 12: 3, 13: 4, 14: 5, 15: 5, 16: 4, 17: 3, 18: 2}
+PECAS_POR_ORDEM = ([0, 1, 2, 3, 4, 5, 6], [18, 28, 22, 14, 9, 6, 3])
+SERVICOS_POR_ORDEM = ([1, 2, 3, 4], [50, 30, 15, 5])
+
+def formatar(data: datetime) -> str:
+  # Mesmo formato que o tipo DateTime do SQLAlchemy grava no SQLite (com microssegundos)
+  return data.strftime("%Y-%m-%d %H:%M:%S.%f") if data else None
+
+def sem_acentos(texto: str) -> str:
+  return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode().lower().replace(" ", "")
+
+def zipf(rng: random.Random, ids: list, expoente: float) -> tuple:
+  # Pesos acumulados 1/rank^s sobre os ids embaralhados: os mais populares não são sempre os primeiros ids
+  populares = list(ids)
+  rng.shuffle(populares)
+  return populares, list(accumulate(1 / (rank + 1) ** expoente for rank in range(len(populares))))
+
+@contextmanager
+def without_triggers_and_indexes(conexao, tabelas: list):
+  # Remove triggers e índices secundários das tabelas durante a carga e os recria com o mesmo SQL no fim
+  objetos = conexao.exec_driver_sql(
+    f"SELECT type, name, sql FROM sqlite_master WHERE type IN ('trigger', 'index') AND sql IS NOT NULL "
+    f"AND tbl_name IN ({', '.join('?' * len(tabelas))})",
+    tuple(tabelas),
+  ).all()
+  for tipo, nome, _ in objetos:
+    conexao.exec_driver_sql(f"DROP {tipo.upper()} {nome}")
+  try:
+    yield
+  finally:
+    # Os índices antes dos triggers, para que recriá-los não dispare nada
+    for tipo, _, sql in sorted(objetos, key=lambda objeto: objeto[0] != "index"):
+      conexao.exec_driver_sql(sql)
+    conexao.commit()
+
+def inserir(conexao, tabela: str, colunas: list, linhas: list):
+  if linhas:
+    conexao.exec_driver_sql(f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})", linhas)
+
+def proximo_id(conexao, tabela: str) -> int:
+  return (conexao.exec_driver_sql(f"SELECT max(id) FROM {tabela}").scalar() or 0) + 1
+
+def gerar_pessoas(rng: random.Random, quantidade: int) -> list:
+  sobrenomes, pesos = zip(*SOBRENOMES)
+  pesos_cidades = [cidade[3] for cidade in CIDADES]
+  pessoas = []
+  for _ in range(quantidade):
+    cidade, uf, ddd, _ = rng.choices(CIDADES, weights=pesos_cidades)[0]
+    sobrenome = " ".join(dict.fromkeys(rng.choices(sobrenomes, weights=pesos, k=rng.choice((1, 2, 2)))))
+    pessoas.append({
+      "nome": rng.choice(NOMES),
+      "sobrenome": sobrenome,
+      "telefone": f"({ddd}) 9{rng.randint(6000, 9999)}-{rng.randint(0, 9999):04d}",
+      "endereco": f"{rng.choice(LOGRADOUROS)}, {rng.randint(1, 3500)} - {rng.choice(BAIRROS)}, {cidade}/{uf}",
+    })
+  return pessoas
+
+def gerar_cadastros(conexao, rng: random.Random, quantidades: dict, criado_em: datetime) -> dict:
+  agora = formatar(criado_em)
+  ids = {}
+
+  inicio = proximo_id(conexao, "cliente")
+  clientes = gerar_pessoas(rng, quantidades["clientes"])
+  inserir(conexao, "cliente", ["id", "nome", "sobrenome", "endereco", "telefone", "versao", "atualizado_em"], [
+    (inicio + i, pessoa["nome"], pessoa["sobrenome"], pessoa["endereco"], pessoa["telefone"], 1, agora)
+    for i, pessoa in enumerate(clientes)
+  ])
+  ids["clientes"] = list(range(inicio, inicio + len(clientes)))
+
+  inicio = proximo_id(conexao, "mecanico")
+  mecanicos = gerar_pessoas(rng, quantidades["mecanicos"])
+  inserir(conexao, "mecanico", ["id", "nome", "sobrenome", "telefone", "email", "versao", "atualizado_em"], [
+    (
+      inicio + i, pessoa["nome"], pessoa["sobrenome"], pessoa["telefone"],
+      f"{sem_acentos(pessoa['nome'])}.{sem_acentos(pessoa['sobrenome'].split()[0])}{inicio + i}@oficina.com.br", 1, agora,
+    )
+    for i, pessoa in enumerate(mecanicos)
+  ])
+  ids["mecanicos"] = list(range(inicio, inicio + len(mecanicos)))
+
+  # Cada peça é um tipo aplicado a um veículo, de uma das marcas do tipo; o modelo leva o id e nunca se repete
+  inicio = proximo_id(conexao, "peca")
+  pecas = []
+  for i in range(quantidades["pecas"]):
+    tipo, marcas, (minimo, maximo), quantidades_usuais = PECAS[i % len(PECAS)]
+    marca = rng.choice(marcas)
+    pecas.append((
+      inicio + i, f"{tipo} {rng.choice(VEICULOS)}", marca, f"{sem_acentos(marca)[:3].upper()}-{inicio + i:06d}",
+      round(rng.uniform(minimo, maximo), 2), 1, agora,
+    ))
+  inserir(conexao, "peca", ["id", "nome", "marca", "modelo", "valor", "versao", "atualizado_em"], pecas)
+  ids["pecas"] = [peca[0] for peca in pecas]
+  precos_pecas = {peca[0]: peca[4] for peca in pecas}
+  quantidades_pecas = {inicio + i: PECAS[i % len(PECAS)][3] for i in range(len(pecas))}
+
+  inicio = proximo_id(conexao, "servico")
+  servicos = []
+  for i in range(quantidades["servicos"]):
+    nome, categoria, (minimo, maximo) = SERVICOS[i % len(SERVICOS)]
+    rodada = i // len(SERVICOS)
+    porte = PORTES[rodada % len(PORTES)] + (f" ({rodada // len(PORTES) + 1})" if rodada >= len(PORTES) else "")
+    fator = 1 + 0.15 * (rodada % len(PORTES))
+    servicos.append((inicio + i, nome + porte, round(rng.uniform(minimo, maximo) * fator, 2), rng.random() > 0.05, categoria, 1, agora))
+  inserir(conexao, "servico", ["id", "nome", "valor", "ativo", "categoria", "versao", "atualizado_em"], servicos)
+  ids["servicos"] = [servico[0] for servico in servicos]
+  # (preço, categoria), guardados também nos itens das ordens
+  precos_servicos = {servico[0]: (servico[2], servico[4]) for servico in servicos}
+
+  return ids, precos_pecas, quantidades_pecas, precos_servicos
+
+def distribuir_por_dia(total: int, inicio: date, dias: int) -> list:
+  # Divide o total pelos dias conforme o dia da semana e um crescimento de ~30% ao longo do período
+  pesos = [PESO_DIA_DA_SEMANA[(inicio + timedelta(d)).weekday()] * (0.85 + 0.3 * d / max(dias - 1, 1)) for d in range(dias)]
+  soma = sum(pesos)
+  acumulado, anterior, por_dia = 0.0, 0, []
+  for d, peso in enumerate(pesos):
+    acumulado += peso
+    atual = round(total * acumulado / soma)
+    por_dia.append((inicio + timedelta(d), atual - anterior))
+    anterior = atual
+  return por_dia
+
+def situacao(rng: random.Random, abertura: datetime, fim: datetime) -> tuple:
+  # Ordens antigas quase todas concluídas; as dos últimos dias ainda em andamento. Conclusão como em concluir:
+  # valor congelado e data_conclusao depois da abertura (nunca depois do fim do histórico)
+  idade = (fim - abertura).days
+  chance_pendente = 0.02 if idade > 7 else 0.5 if idade >= 2 else 0.9
+  if rng.random() < chance_pendente:
+    return "pendente", None
+  sorteio = rng.random()
+  if sorteio < 0.6:
+    duracao = timedelta(hours=rng.uniform(1, 8))
+  elif sorteio < 0.9:
+    duracao = timedelta(days=rng.uniform(1, 3))
+  else:
+    duracao = timedelta(days=rng.uniform(3, 10))
+  conclusao = abertura + duracao
+  return ("pendente", None) if conclusao > fim else ("concluida", conclusao)
+
+def gerar_ordens(conexao, rng: random.Random, quantidades: dict, ids: dict, precos_pecas: dict, quantidades_pecas: dict,
+                 precos_servicos: dict, fim: date, dias: int, lote: int) -> int:
+  clientes, pesos_clientes = zipf(rng, ids["clientes"], 0.6)
+  mecanicos, pesos_mecanicos = zipf(rng, ids["mecanicos"], 0.9)
+  pecas, pesos_pecas = zipf(rng, ids["pecas"], 1.2)
+  servicos, pesos_servicos = zipf(rng, ids["servicos"], 1.0)
+  horas, pesos_horas = zip(*PESO_HORA.items())
+  fim_historico = datetime.combine(fim, datetime.max.time())
+
+  ordem_id = proximo_id(conexao, "ordem_servico")
+  ordens, itens_pecas, itens_servicos = [], [], []
+  linhas = 0
+
+  def gravar():
+    inserir(conexao, "ordem_servico", [
+      "id", "cliente_id", "mecanico_id", "data_abertura", "data_conclusao", "situacao", "valor",
+      "valor_servicos", "valor_pecas", "versao", "atualizado_em",
+    ], ordens)
+    inserir(conexao, "ordem_servico_peca", ["ordem_servico_id", "peca_id", "quantidade", "valor_total"], itens_pecas)
+    inserir(conexao, "ordem_servico_servico", ["ordem_servico_id", "servico_id", "valor", "categoria"], itens_servicos)
+    conexao.commit()
+
+  for dia, quantidade in distribuir_por_dia(quantidades["ordens"], fim - timedelta(dias - 1), dias):
+    if not quantidade:
+      continue
+    aberturas = sorted(
+      datetime(dia.year, dia.month, dia.day, hora, rng.randrange(60), rng.randrange(60), rng.randrange(1000000))
+      for hora in rng.choices(horas, weights=pesos_horas, k=quantidade)
+    )
+    clientes_do_dia = rng.choices(clientes, cum_weights=pesos_clientes, k=quantidade)
+    mecanicos_do_dia = rng.choices(mecanicos, cum_weights=pesos_mecanicos, k=quantidade)
+    n_pecas = rng.choices(*PECAS_POR_ORDEM, k=quantidade)
+    n_servicos = rng.choices(*SERVICOS_POR_ORDEM, k=quantidade)
+    sorteio_pecas = iter(rng.choices(pecas, cum_weights=pesos_pecas, k=sum(n_pecas)))
+    sorteio_servicos = iter(rng.choices(servicos, cum_weights=pesos_servicos, k=sum(n_servicos)))
+
+    for i, abertura in enumerate(aberturas):
+      # A mesma peça sorteada duas vezes entra uma vez só (a chave é ordem + peça)
+      valor_pecas = 0.0
+      for peca_id in dict.fromkeys(next(sorteio_pecas) for _ in range(n_pecas[i])):
+        quantidade_peca = rng.choice(quantidades_pecas[peca_id])
+        valor_linha = round(precos_pecas[peca_id] * quantidade_peca, 2)
+        itens_pecas.append((ordem_id, peca_id, quantidade_peca, valor_linha))
+        valor_pecas += valor_linha
+      valor_servicos = 0.0
+      for servico_id in dict.fromkeys(next(sorteio_servicos) for _ in range(n_servicos[i])):
+        valor_servico, categoria = precos_servicos[servico_id]
+        itens_servicos.append((ordem_id, servico_id, valor_servico, categoria))
+        valor_servicos += valor_servico
+      valor_pecas, valor_servicos = round(valor_pecas, 2), round(valor_servicos, 2)
+
+      estado, conclusao = situacao(rng, abertura, fim_historico)
+      valor = round(valor_servicos + valor_pecas, 2) if estado == "concluida" else None
+      ordens.append((
+        ordem_id, clientes_do_dia[i], mecanicos_do_dia[i], formatar(abertura), formatar(conclusao), estado, valor,
+        valor_servicos, valor_pecas, 1, formatar(conclusao or abertura),
+      ))
+      ordem_id += 1
+
+      if len(ordens) >= lote:
+        linhas += len(itens_pecas) + len(itens_servicos)
+        gravar()
+        ordens, itens_pecas, itens_servicos = [], [], []
+
+  linhas += len(itens_pecas) + len(itens_servicos)
+  gravar()
+  return linhas
+
+def verificar(conexao, completo: bool = False) -> dict:
+  # Mesmas regras de concluir; com completo=True também confere os subtotais contra os itens (varre todas as linhas)
+  resultado = {
+    "situacao_invalida": conexao.exec_driver_sql(
+      "SELECT count(*) FROM ordem_servico WHERE "
+      "(situacao = 'concluida' AND (valor IS NULL OR data_conclusao IS NULL OR data_conclusao < data_abertura "
+      "OR abs(valor - round(valor_servicos + valor_pecas, 2)) > 0.005)) "
+      "OR (situacao = 'pendente' AND (valor IS NOT NULL OR data_conclusao IS NOT NULL)) "
+      "OR situacao NOT IN ('pendente', 'concluida')"
+    ).scalar(),
+  }
+  if completo:
+    resultado["subtotal_divergente"] = conexao.exec_driver_sql(
+      "SELECT count(*) FROM ordem_servico o "
+      "LEFT JOIN (SELECT ordem_servico_id, sum(valor_total) AS total FROM ordem_servico_peca "
+      "GROUP BY ordem_servico_id) p ON p.ordem_servico_id = o.id "
+      "LEFT JOIN (SELECT ordem_servico_id, sum(valor) AS total FROM ordem_servico_servico "
+      "GROUP BY ordem_servico_id) s ON s.ordem_servico_id = o.id "
+      "WHERE abs(o.valor_pecas - coalesce(p.total, 0)) > 0.005 OR abs(o.valor_servicos - coalesce(s.total, 0)) > 0.005"
+    ).scalar()
+  return resultado
+
+def seed(engine, quantidades: dict, seed: int = 42, fim: date = date(2025, 6, 30), dias: int = 730,
+         lote: int = 50000, completo: bool = False) -> dict:
+  from sqlalchemy.orm import Session
+  from db.counters import rebuild_counters
+  from db.database import Base
+  import models.models  # noqa: F401
+  import repositories.relatorio_repository as relatorio_repository
+
+  inicio = time.perf_counter()
+  rng = random.Random(seed)
+  Base.metadata.create_all(engine)
+
+  with engine.connect() as conexao:
+    conexao.exec_driver_sql("PRAGMA synchronous=OFF")
+    conexao.exec_driver_sql("PRAGMA cache_size=-262144")
+    with without_triggers_and_indexes(conexao, ["ordem_servico", "ordem_servico_peca", "ordem_servico_servico"]):
+      ids, precos_pecas, quantidades_pecas, precos_servicos = gerar_cadastros(
+        conexao, rng, quantidades, datetime.combine(fim - timedelta(dias), datetime.min.time()),
+      )
+      conexao.commit()
+      linhas = gerar_ordens(conexao, rng, quantidades, ids, precos_pecas, quantidades_pecas, precos_servicos, fim, dias, lote)
+
+    with Session(bind=conexao) as session:
+      relatorio_repository.reconstruir(session)
+      rebuild_counters(session)
+      session.commit()
+    conexao.exec_driver_sql("ANALYZE")
+    conexao.commit()
+    inconsistencias = verificar(conexao, completo)
+
+  engine.dispose()
+  return dict(
+    quantidades, seed=seed, ate=fim.isoformat(), dias=dias, linhas_de_ordem=linhas,
+    inconsistencias=inconsistencias, segundos=round(time.perf_counter() - inicio, 1),
+  )
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--escala", choices=ESCALAS, default="pequena")
+  for campo in ESCALAS["pequena"]:
+    parser.add_argument(f"--{campo}", type=int)
+  parser.add_argument("--seed", type=int, default=42)
+  parser.add_argument("--ate", type=date.fromisoformat, default=date(2025, 6, 30), help="último dia do histórico (AAAA-MM-DD)")
+  parser.add_argument("--dias", type=int, default=730, help="dias de histórico")
+  parser.add_argument("--lote", type=int, default=50000, help="ordens por transação")
+  parser.add_argument("--verificar", action="store_true", help="confere também os subtotais contra os itens no fim")
+  args = parser.parse_args()
+
+  from db.database import engine
+
+  quantidades = {campo: getattr(args, campo) or padrao for campo, padrao in ESCALAS[args.escala].items()}
+  resumo = seed(engine, quantidades, args.seed, args.ate, args.dias, args.lote, args.verificar)
+  print(json.dumps(resumo, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,114 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+ACCESS_LOGGER = "oficina.access"
+
+SLOW_QUERY_LOGGER = "oficina.sql.slow"
+
+# Campos extras que o middleware e a instrumentação de SQL (telemetry/sql.py) anexam ao registro e que vão para a linha JSON
+ACCESS_FIELDS = (
+  "request_id", "method", "path", "route", "status", "latency_ms", "error", "db_queries", "db_ms", "db_slowest",
+  "duration_ms", "repeticoes", "sql", "params",
+)
+
+class JsonFormatter(logging.Formatter):
+  def format(self, record: logging.LogRecord) -> str:
+    linha = {
+      "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+      "level": record.levelname,
+      "logger": record.name,
+      "message": record.getMessage(),
+    }
+    for campo in ACCESS_FIELDS:
+      valor = getattr(record, campo, None)
+      if valor is not None:
+        linha[campo] = valor
+    if record.exc_info:
+      linha["exc_info"] = self.formatException(record.exc_info)
+    return json.dumps(linha, ensure_ascii=False, default=str)
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+  # Rotaciona quando o arquivo passa de max_bytes ou quando o intervalo (em segundos) expira
+  def __init__(self, filename, max_bytes: int, backup_count: int, interval: int, **kwargs):
+    super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, **kwargs)
+    self.interval = interval
+    self.rollover_at = time.time() + interval if interval else None
+
+  def shouldRollover(self, record) -> bool:
+    if self.rollover_at is not None and time.time() >= self.rollover_at:
+      return True
+    return bool(super().shouldRollover(record))
+
+  def doRollover(self):
+    super().doRollover()
+    if self.interval:
+      self.rollover_at = time.time() + self.interval
+
+class AccessSampler(logging.Filter):
+  # Mantém apenas uma fração dos logs de acesso 2xx por nível; erros sempre passam
+  def __init__(self, rates: dict):
+    super().__init__()
+    self.rates = rates
+
+  def filter(self, record: logging.LogRecord) -> bool:
+    status = getattr(record, "status", None)
+    if status is None or status // 100 != 2:
+      return True
+    rate = self.rates.get(record.levelno, 1.0)
+    return rate >= 1.0 or random.random() < rate
+
+def sample_rates_from_env(prefix: str = "LOG_SAMPLE_") -> dict:
+  rates = {}
+  for nome in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
+    valor = os.getenv(prefix + nome)
+    if valor is not None:
+      rates[logging.getLevelName(nome)] = float(valor)
+  return rates
+
+def setup_logging(
+  filename: str = None,
+  level: str = None,
+  max_bytes: int = None,
+  backup_count: int = None,
+  interval: int = None,
+):
+  filename = filename or os.getenv("LOG_FILE", "logs.log")
+  level = level or os.getenv("LOG_LEVEL", "INFO")
+  max_bytes = max_bytes if max_bytes is not None else int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+  backup_count = backup_count if backup_count is not None else int(os.getenv("LOG_BACKUP_COUNT", 5))
+  interval = interval if interval is not None else int(os.getenv("LOG_ROTATE_INTERVAL", 24 * 60 * 60))
+
+  file_handler = SizeAndTimeRotatingFileHandler(filename, max_bytes, backup_count, interval, encoding="utf-8")
+  file_handler.setFormatter(JsonFormatter())
+
+  # Consultas lentas vão para um arquivo próprio, pela mesma fila
+  slow_handler = SizeAndTimeRotatingFileHandler(
+    os.getenv("SQL_SLOW_LOG_FILE", "slow_queries.log"), max_bytes, backup_count, interval, encoding="utf-8",
+  )
+  slow_handler.setFormatter(JsonFormatter())
+  slow_handler.addFilter(lambda record: record.name == SLOW_QUERY_LOGGER)
+  file_handler.addFilter(lambda record: record.name != SLOW_QUERY_LOGGER)
+
+  # A requisição só enfileira o registro; a escrita em disco acontece na thread do QueueListener
+  log_queue = queue.SimpleQueue()
+  listener = QueueListener(log_queue, file_handler, slow_handler, respect_handler_level=True)
+  listener.start()
+  atexit.register(listener.stop)
+
+  root = logging.getLogger()
+  root.setLevel(level)
+  for handler in root.handlers[:]:
+    root.removeHandler(handler)
+  root.addHandler(QueueHandler(log_queue))
+
+  access_logger = logging.getLogger(ACCESS_LOGGER)
+  access_logger.addFilter(AccessSampler(sample_rates_from_env()))
+
+  return listener
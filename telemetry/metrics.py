@@ -0,0 +1,67 @@
+import os
+from prometheus_client import (
+  CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, disable_created_metrics, generate_latest, multiprocess,
+)
+
+# Com vários workers do uvicorn, PROMETHEUS_MULTIPROC_DIR aponta para um diretório compartilhado (vazio na subida):
+# cada processo grava seus valores em arquivos mmap ali e o /metrics de qualquer worker soma os de todos
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+REQUESTS = Counter("oficina_http_requests_total", "Requisições HTTP por rota e status", ["method", "route", "status"])
+LATENCY = Histogram(
+  "oficina_http_request_duration_seconds", "Duração das requisições HTTP por rota", ["method", "route"],
+  buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+IN_FLIGHT = Gauge("oficina_http_requests_in_flight", "Requisições HTTP em andamento", ["method"], multiprocess_mode="livesum")
+STATEMENTS = Histogram(
+  "oficina_db_statements_per_request", "Instruções SQL executadas por requisição", ["method", "route"],
+  buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+POOL_WAIT = Histogram(
+  "oficina_db_pool_wait_seconds", "Espera para obter uma conexão do pool", ["pool"],
+  buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+
+# Os filhos com labels ficam em cache: labels() custa um lock e uma busca a cada chamada
+_in_flight = {}
+_series = {}
+
+def in_flight(method: str):
+  serie = _in_flight.get(method)
+  if serie is None:
+    serie = _in_flight[method] = IN_FLIGHT.labels(method)
+  return serie
+
+def observe_request(method: str, route: str, status: int, latency: float, statements: int):
+  chave = (method, route)
+  series = _series.get(chave)
+  if series is None:
+    series = _series[chave] = (LATENCY.labels(method, route), STATEMENTS.labels(method, route), {})
+  latencia, instrucoes, por_status = series
+  latencia.observe(latency)
+  instrucoes.observe(statements)
+  contador = por_status.get(status)
+  if contador is None:
+    contador = por_status[status] = REQUESTS.labels(method, route, str(status))
+  contador.inc()
+
+def observe_pool_wait(pool: str, seconds: float):
+  POOL_WAIT.labels(pool).observe(seconds)
+
+def render() -> tuple:
+  if MULTIPROC_DIR:
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, MULTIPROC_DIR)
+  else:
+    registry = REGISTRY
+  return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def setup_metrics():
+  # As séries *_created só dobram o tamanho da resposta
+  disable_created_metrics()
+
+def shutdown():
+  # Um worker que sai tira seus gauges da soma (contadores e histogramas continuam valendo). Fica no shutdown da
+  # aplicação: os workers do uvicorn terminam com os._exit e não rodam os handlers do atexit
+  if MULTIPROC_DIR:
+    multiprocess.mark_process_dead(os.getpid(), MULTIPROC_DIR)
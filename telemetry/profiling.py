@@ -0,0 +1,207 @@
+import glob
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from starlette.concurrency import run_in_threadpool
+
+# Perfil de uma requisição sob demanda: com o cabeçalho X-Profile igual a PROFILE_TOKEN ou sorteada por
+# PROFILE_SAMPLE_RATE. Sem nenhum dos dois o middleware nem chega a olhar a requisição
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", 1)) / 1000
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Perfis mantidos em PROFILE_DIR; ao gravar um novo, os mais antigos além deste número são apagados
+MAX_PROFILES = int(os.getenv("PROFILE_MAX_FILES", 200))
+HEADER = "x-profile"
+
+enabled = bool(PROFILE_TOKEN) or SAMPLE_RATE > 0
+
+logger = logging.getLogger(__name__)
+
+# Enquanto houver perfil ativo o intervalo de troca do GIL cai para INTERVAL: com o padrão (5 ms) a thread de
+# amostragem só conseguiria rodar a cada 5 ms enquanto a requisição ocupa a CPU. O intervalo vale para o processo
+# inteiro, então durante o perfil todas as requisições do worker pagam pelas trocas extras de thread
+_lock = threading.Lock()
+_ativos = 0
+_switch_interval = None
+
+def requested(headers) -> bool:
+  if PROFILE_TOKEN:
+    valor = headers.get(HEADER)
+    if valor is not None and hmac.compare_digest(valor.encode(), PROFILE_TOKEN.encode()):
+      return True
+  return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+def stack(frame) -> tuple:
+  pilha = []
+  while frame is not None:
+    codigo = frame.f_code
+    pilha.append((codigo.co_qualname, codigo.co_filename, codigo.co_firstlineno))
+    frame = frame.f_back
+  pilha.reverse()
+  return tuple(pilha)
+
+class RequestProfile:
+  # Uma thread amostra, a cada INTERVAL, a pilha das threads que trabalham para a requisição: a do event loop
+  # (middleware e rotas async) e as que executaram SQL no contexto dela (o threadpool das rotas síncronas e a fila
+  # de escrita), que se registram pela instrumentação de SQL
+  def __init__(self, request_id: str, method: str, path: str):
+    self.request_id = request_id
+    self.id = profile_id(request_id)
+    self.method = method
+    self.path = path
+    self.loop_thread = threading.get_ident()
+    self.threads = {self.loop_thread}
+    self.samples = []
+    self.statements = []
+    self.stopped = threading.Event()
+    self.end = None
+    self.sampler = threading.Thread(target=self.loop, name="profiler", daemon=True)
+    global _ativos, _switch_interval
+    with _lock:
+      if _ativos == 0:
+        _switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(_switch_interval, INTERVAL))
+      _ativos += 1
+    self.start = time.perf_counter()
+    self.sampler.start()
+
+  def enter_thread(self):
+    self.threads.add(threading.get_ident())
+
+  def statement(self, inicio: float, segundos: float, statement: str, parameters = None):
+    # parameters é None quando os parâmetros não podem ir para o perfil; o texto da instrução só tem placeholders
+    self.statements.append((inicio - self.start, segundos, statement, parameters))
+
+  def loop(self):
+    while not self.stopped.wait(INTERVAL):
+      agora = time.perf_counter() - self.start
+      frames = sys._current_frames()
+      self.samples.append((agora, [(ident, stack(frames[ident])) for ident in tuple(self.threads) if ident in frames]))
+
+  def stop(self):
+    # Só sinaliza a thread de amostragem; ela é aguardada em close, fora do event loop
+    self.end = time.perf_counter()
+    self.stopped.set()
+
+  def close(self):
+    self.sampler.join()
+    global _ativos
+    with _lock:
+      _ativos -= 1
+      if _ativos == 0:
+        sys.setswitchinterval(_switch_interval)
+
+  def thread_names(self) -> dict:
+    nomes = {thread.ident: thread.name for thread in threading.enumerate()}
+    return {ident: "event-loop" if ident == self.loop_thread else nomes.get(ident, str(ident)) for ident in self.threads}
+
+  def collapsed(self) -> str:
+    # Formato "thread;quadro;quadro N" do flamegraph.pl / speedscope / inferno
+    nomes = self.thread_names()
+    contagem = Counter()
+    for _, pilhas in self.samples:
+      for ident, pilha in pilhas:
+        contagem[";".join([nomes[ident], *(f"{nome} ({os.path.basename(arquivo)}:{linha})" for nome, arquivo, linha in pilha)])] += 1
+    return "".join(f"{linha} {vezes}\n" for linha, vezes in contagem.most_common())
+
+  def speedscope(self, route: str, status: int) -> dict:
+    # Um perfil amostrado por thread e a linha do tempo das instruções SQL como perfil de eventos, no mesmo arquivo
+    quadros, indices = [], {}
+    def indice(quadro):
+      if quadro not in indices:
+        indices[quadro] = len(quadros)
+        nome, arquivo, linha = quadro
+        quadros.append({"name": nome, "file": arquivo, "line": linha})
+      return indices[quadro]
+
+    duracao = (self.end - self.start) * 1000
+    nomes = self.thread_names()
+    perfis = []
+    for ident, nome in nomes.items():
+      amostras, pesos, anterior = [], [], 0.0
+      for instante, pilhas in self.samples:
+        for thread, pilha in pilhas:
+          if thread == ident:
+            amostras.append([indice(quadro) for quadro in pilha])
+            pesos.append(round((instante * 1000) - anterior, 3))
+        anterior = instante * 1000
+      if amostras:
+        perfis.append({
+          "type": "sampled", "name": nome, "unit": "milliseconds", "startValue": 0, "endValue": round(duracao, 3),
+          "samples": amostras, "weights": pesos,
+        })
+
+    eventos = []
+    for ordem, (inicio, segundos, statement, parameters) in enumerate(self.statements):
+      origem = f"sql #{ordem + 1}" if parameters is None else f"sql #{ordem + 1} {str(parameters)[:200]}"
+      quadro = indice((" ".join(statement.split())[:200], origem, 0))
+      eventos.append({"type": "O", "frame": quadro, "at": round(inicio * 1000, 3)})
+      eventos.append({"type": "C", "frame": quadro, "at": round((inicio + segundos) * 1000, 3)})
+    perfis.append({"type": "evented", "name": "SQL", "unit": "milliseconds", "startValue": 0, "endValue": round(duracao, 3), "events": eventos})
+
+    return {
+      "$schema": "https://www.speedscope.app/file-format-schema.json",
+      "name": f"{self.method} {route or self.path} -> {status} ({self.request_id})",
+      "exporter": "oficina",
+      "shared": {"frames": quadros},
+      "profiles": perfis,
+    }
+
+def start(request_id: str, method: str, path: str, headers) -> RequestProfile:
+  return RequestProfile(request_id, method, path) if requested(headers) else None
+
+def profile_id(request_id: str) -> str:
+  # Gerado pelo servidor (instante + aleatório, ordenável pelo nome); o request_id, que pode vir do cliente
+  # (X-Request-ID), entra só como sufixo e com letras, dígitos, _ e -
+  sufixo = re.sub(r"[^A-Za-z0-9_-]", "_", request_id)[:64]
+  return f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}-{sufixo}"
+
+def prune(limite: int = MAX_PROFILES):
+  # Os nomes começam pelo instante, então a ordem alfabética é a cronológica
+  perfis = sorted(glob.glob(os.path.join(PROFILE_DIR, "*.speedscope.json")))
+  for caminho in perfis[:max(len(perfis) - limite, 0)]:
+    base = caminho[:-len(".speedscope.json")]
+    for arquivo in (base + ".speedscope.json", base + ".collapsed.txt"):
+      try:
+        os.remove(arquivo)
+      except FileNotFoundError:
+        pass  # apagado por outra requisição ao mesmo tempo
+
+def write(perfil: RequestProfile, route: str, status: int):
+  # Bloqueante (join da thread de amostragem e escrita dos arquivos): chamado pelo threadpool, fora do event loop
+  perfil.close()
+  os.makedirs(PROFILE_DIR, exist_ok=True)
+  base = os.path.join(PROFILE_DIR, perfil.id)
+  with open(base + ".speedscope.json", "w", encoding="utf-8") as arquivo:
+    json.dump(perfil.speedscope(route, status), arquivo, ensure_ascii=False)
+  with open(base + ".collapsed.txt", "w", encoding="utf-8") as arquivo:
+    arquivo.write(perfil.collapsed())
+  prune()
+  logger.info("perfil gravado", extra={"request_id": perfil.request_id, "route": route, "path": base + ".speedscope.json"})
+
+async def finish(perfil: RequestProfile, route: str, status: int) -> str:
+  perfil.stop()
+  await run_in_threadpool(write, perfil, route, status)
+  return perfil.id
+
+def attach(perfil: RequestProfile, response, route: str, status: int) -> str:
+  # O perfil só termina depois do corpo: nas respostas em streaming (exportações) o trabalho acontece durante o envio
+  iterador = response.body_iterator
+  async def corpo():
+    try:
+      async for parte in iterador:
+        yield parte
+    finally:
+      await finish(perfil, route, status)
+  response.body_iterator = corpo()
+  return perfil.id
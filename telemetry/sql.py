@@ -0,0 +1,150 @@
+import heapq
+import logging
+import os
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from telemetry.log import SLOW_QUERY_LOGGER
+
+SQL_LOGGER = "oficina.sql"
+
+# Instruções acima deste tempo vão para o log de consultas lentas (SQL_SLOW_LOG_FILE)
+SLOW_MS = float(os.getenv("SQL_SLOW_MS", 100))
+# Quantas das instruções mais lentas de cada requisição vão para o log de acesso (0 desliga)
+TOP_STATEMENTS = int(os.getenv("SQL_TOP_STATEMENTS", 3))
+# O log de acesso leva só a duração dessas instruções; o texto e os parâmetros (que trazem nomes, telefones e endereços
+# dos clientes) só entram com SQL_LOG_STATEMENTS=on. O log de consultas lentas sempre os tem.
+LOG_STATEMENTS = os.getenv("SQL_LOG_STATEMENTS", "off").lower() in ("1", "true", "on", "yes")
+# A mesma instrução repetida este número de vezes em uma requisição é sinalizada como N+1
+N_PLUS_ONE = int(os.getenv("SQL_N_PLUS_ONE", 5))
+# Com SQL_BUDGET_RAISE=on a instrução que estoura o orçamento da rota levanta QueryBudgetExceeded (para os testes);
+# sem ele o estouro só é registrado no log
+BUDGET_RAISE = os.getenv("SQL_BUDGET_RAISE", "off").lower() in ("1", "true", "on", "yes")
+
+logger = logging.getLogger(SQL_LOGGER)
+slow_logger = logging.getLogger(SLOW_QUERY_LOGGER)
+
+class QueryBudgetExceeded(Exception):
+  pass
+
+def parse_budgets(valor: str) -> dict:
+  # "GET /ordens_servicos/=2,GET /ordens_servicos/{ordem_servico_id}=2" -> {("GET", "/ordens_servicos/"): 2, ...}
+  orcamentos = {}
+  for item in filter(None, (parte.strip() for parte in valor.split(","))):
+    rota, _, limite = item.rpartition("=")
+    metodo, _, caminho = rota.strip().partition(" ")
+    orcamentos[(metodo.upper(), caminho.strip())] = int(limite)
+  return orcamentos
+
+budgets = parse_budgets(os.getenv("SQL_QUERY_BUDGETS", ""))
+
+def set_query_budget(method: str, route: str, limite: int = None):
+  if limite is None:
+    budgets.pop((method.upper(), route), None)
+  else:
+    budgets[(method.upper(), route)] = limite
+
+def short(valor, tamanho: int = 300) -> str:
+  texto = " ".join(str(valor).split())
+  return texto if len(texto) <= tamanho else texto[:tamanho] + "..."
+
+class RequestQueries:
+  # Instruções de uma requisição. As rotas síncronas e a fila de escrita rodam em outras threads com uma cópia do
+  # contexto, e todas escrevem no mesmo objeto
+  __slots__ = ("request_id", "method", "scope", "count", "seconds", "slowest", "shapes", "budget", "profile")
+
+  def __init__(self, request_id: str, method: str, scope: dict, profile=None):
+    self.request_id = request_id
+    self.method = method
+    self.scope = scope
+    self.count = 0
+    self.seconds = 0.0
+    self.slowest = []  # heap (duração, ordem[, sql, parâmetros]) com as TOP_STATEMENTS mais lentas
+    self.shapes = {}
+    self.budget = None if budgets else False
+    self.profile = profile  # telemetry.profiling.RequestProfile quando a requisição está sendo perfilada
+
+  @property
+  def route(self) -> str:
+    route = self.scope.get("route")
+    return route.path if route else None
+
+  def check_budget(self, statement: str):
+    # O orçamento é resolvido na primeira instrução, quando o roteamento já aconteceu
+    if self.budget is None:
+      self.budget = budgets.get((self.method, self.route), False)
+    if self.budget is not False and self.count >= self.budget:
+      mensagem = f"{self.method} {self.route} passou do orçamento de {self.budget} instruções SQL: {short(statement, 120)}"
+      if BUDGET_RAISE:
+        raise QueryBudgetExceeded(mensagem)
+      if self.count == self.budget:
+        logger.warning(mensagem, extra={"request_id": self.request_id, "route": self.route})
+
+  def record(self, statement: str, parameters, seconds: float):
+    self.count += 1
+    self.seconds += seconds
+    self.shapes[statement] = self.shapes.get(statement, 0) + 1
+    item = (seconds, self.count, statement, parameters) if LOG_STATEMENTS else (seconds, self.count)
+    if len(self.slowest) < TOP_STATEMENTS:
+      heapq.heappush(self.slowest, item)
+    elif TOP_STATEMENTS and seconds > self.slowest[0][0]:
+      heapq.heapreplace(self.slowest, item)
+
+  def summary(self) -> dict:
+    return {
+      "db_queries": self.count,
+      "db_ms": round(self.seconds * 1000, 3),
+      "db_slowest": [
+        {"ms": round(item[0] * 1000, 3), "sql": short(item[2]), "params": short(item[3], 200)} if LOG_STATEMENTS
+        else {"ms": round(item[0] * 1000, 3)}
+        for item in sorted(self.slowest, reverse=True)
+      ] or None,
+    }
+
+  def flag_repeated(self):
+    for statement, vezes in self.shapes.items():
+      if vezes >= N_PLUS_ONE:
+        logger.warning("possível N+1", extra={
+          "request_id": self.request_id, "route": self.route, "repeticoes": vezes, "sql": short(statement),
+        })
+
+current = ContextVar("sql_request", default=None)
+
+def start_request(request_id: str, method: str, scope: dict, profile=None) -> tuple:
+  consultas = RequestQueries(request_id, method, scope, profile)
+  return consultas, current.set(consultas)
+
+def finish_request(consultas: RequestQueries, token):
+  current.reset(token)
+  consultas.flag_repeated()
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  consultas = current.get()
+  if consultas is not None:
+    if consultas.budget is not False:
+      consultas.check_budget(statement)
+    if consultas.profile is not None:
+      consultas.profile.enter_thread()
+  context._inicio_consulta = time.perf_counter()
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  segundos = time.perf_counter() - context._inicio_consulta
+  consultas = current.get()
+  if consultas is not None:
+    consultas.record(statement, parameters, segundos)
+    if consultas.profile is not None:
+      # Os perfis seguem a mesma regra do log de acesso: parâmetros só com SQL_LOG_STATEMENTS=on
+      consultas.profile.statement(context._inicio_consulta, segundos, statement, parameters if LOG_STATEMENTS else None)
+  if segundos * 1000 >= SLOW_MS:
+    slow_logger.warning("consulta lenta", extra={
+      "request_id": consultas.request_id if consultas else None,
+      "route": consultas.route if consultas else None,
+      "duration_ms": round(segundos * 1000, 3),
+      "sql": statement,
+      "params": short(parameters, 1000),
+    })
+
+def instrument_engine(engine):
+  sync_engine = getattr(engine, "sync_engine", engine)
+  event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+  event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+# Os testes usam um banco descartável; a variável precisa estar definida antes de db.database ser importado
+DIRETORIO = tempfile.mkdtemp(prefix="oficina-testes-")
+BANCO = os.path.join(DIRETORIO, "teste.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{BANCO}"
+
+import pytest
+from db.database import Base, SessionLocal, engine, read_engine
+import models.models  # noqa: F401
+import repositories.catalog_cache as catalog_cache
+
+@pytest.fixture
+def banco():
+  # Cada teste começa com um banco vazio e os caches do processo limpos
+  engine.dispose()
+  read_engine.dispose()
+  for sufixo in ("", "-wal", "-shm"):
+    if os.path.exists(BANCO + sufixo):
+      os.remove(BANCO + sufixo)
+  Base.metadata.create_all(engine)
+  catalog_cache.pecas.discard()
+  catalog_cache.servicos.discard()
+  yield SessionLocal
+  engine.dispose()
+  read_engine.dispose()
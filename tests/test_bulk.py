@@ -0,0 +1,40 @@
+from db.database import engine
+from models.models import Cliente, Peca
+import repositories.cliente_repository as cliente_repository
+import repositories.peca_repository as peca_repository
+from tests.test_ordem_servico_consultas import instrucoes
+
+def clientes(quantidade: int):
+  return [(i, {"nome": f"Cliente {i}", "sobrenome": "Silva", "endereco": "Rua A", "telefone": "119999"}) for i in range(quantidade)]
+
+def test_lote_insere_em_um_executemany_e_devolve_os_ids_na_ordem(banco):
+  with banco() as session:
+    session.add(Cliente(nome="Existente", sobrenome="Silva", endereco="Rua A", telefone="119999"))
+    session.commit()
+
+  with banco() as session, instrucoes(engine) as executadas:
+    ids, erros = cliente_repository.create_many(session, clientes(100), atomico=True)
+    session.commit()
+
+  with banco() as session:
+    nomes = dict(session.query(Cliente.id, Cliente.nome))
+
+  # Um executemany e a leitura do max(id), não um INSERT por linha
+  assert len([instrucao for instrucao in executadas if instrucao.startswith("INSERT INTO cliente ")]) == 1
+  assert len(executadas) <= 3
+  assert erros == []
+  assert {indice: nomes[id] for indice, id in ids.items()} == {i: f"Cliente {i}" for i in range(100)}
+
+def test_lote_nao_atomico_isola_os_itens_invalidos(banco):
+  pecas = [(i, {"nome": f"Peça {i}", "marca": "Bosch", "modelo": f"M{i % 8}", "valor": 10.0 + i}) for i in range(10)]
+
+  with banco() as session:
+    ids, erros = peca_repository.create_many(session, pecas)
+    session.commit()
+
+  with banco() as session:
+    modelos = dict(session.query(Peca.id, Peca.modelo))
+
+  # Os modelos M0 e M1 se repetem nos índices 8 e 9
+  assert [erro.indice for erro in erros] == [8, 9]
+  assert {indice: modelos[id] for indice, id in ids.items()} == {i: f"M{i}" for i in range(8)}
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import Request, Response
+from controllers.conditional import conditional, http_date
+
+def requisicao(**headers):
+  return Request({"type": "http", "headers": [(nome.replace("_", "-").encode(), valor.encode()) for nome, valor in headers.items()]})
+
+def agora():
+  return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def test_last_modified_so_depois_do_segundo_da_alteracao():
+  recente = Response()
+  antiga = Response()
+  conditional(requisicao(), recente, '"a"', agora())
+  conditional(requisicao(), antiga, '"a"', agora() - timedelta(seconds=2))
+
+  assert "last-modified" not in recente.headers
+  assert "last-modified" in antiga.headers
+
+def test_if_modified_since_nao_vale_no_segundo_da_alteracao():
+  # O cliente tem a cópia do segundo atual; outra alteração nesse segundo não pode responder 304
+  atualizado_em = agora()
+  resposta = conditional(requisicao(if_modified_since=http_date(atualizado_em)), Response(), '"b"', atualizado_em)
+
+  assert resposta is None
+
+def test_etag_prevalece_sobre_if_modified_since():
+  atualizado_em = agora() - timedelta(minutes=5)
+  data = http_date(atualizado_em + timedelta(minutes=1))
+
+  diferente = conditional(requisicao(if_none_match='"velho"', if_modified_since=data), Response(), '"novo"', atualizado_em)
+  igual = conditional(requisicao(if_none_match='W/"novo"'), Response(), '"novo"', atualizado_em)
+  so_data = conditional(requisicao(if_modified_since=data), Response(), '"novo"', atualizado_em)
+
+  assert diferente is None
+  assert igual.status_code == 304
+  assert so_data.status_code == 304
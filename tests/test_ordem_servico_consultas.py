@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from db.database import ReadSessionLocal, read_engine
+from models.models import Cliente, Mecanico, OrdemServico, OrdemServicoPeca, OrdemServicoServico, Peca, Servico
+import repositories.ordem_servico_repository as ordem_servico_repository
+
+@contextmanager
+def instrucoes(engine):
+  executadas = []
+  registrar = lambda conn, cursor, statement, *args: executadas.append(statement)
+  event.listen(engine, "before_cursor_execute", registrar)
+  try:
+    yield executadas
+  finally:
+    event.remove(engine, "before_cursor_execute", registrar)
+
+def popular(SessionLocal, ordens: int = 12, itens: int = 4):
+  with SessionLocal() as session:
+    session.add_all([Cliente(nome=f"Cliente {i}", sobrenome="Silva", endereco="Rua A", telefone="119999") for i in range(3)])
+    session.add_all([Mecanico(nome=f"Mecânico {i}", sobrenome="Souza", telefone="119999", email="m@oficina.com") for i in range(3)])
+    session.add_all([Peca(nome=f"Peça {i}", marca="Bosch", modelo=f"M{i}", valor=10 + i) for i in range(itens)])
+    session.add_all([Servico(nome=f"Serviço {i}", valor=50 + i, ativo=True, categoria="Manutenção") for i in range(itens)])
+    session.flush()
+    for i in range(ordens):
+      ordem = OrdemServico(
+        cliente_id=i % 3 + 1, mecanico_id=i % 3 + 1, data_abertura=datetime(2025, 1, 1) + timedelta(hours=i),
+        situacao="pendente", valor_servicos=0, valor_pecas=0,
+      )
+      ordem.pecas = [OrdemServicoPeca(peca_id=j + 1, quantidade=2, valor_total=2 * (10 + j)) for j in range(itens)]
+      ordem.servicos = [OrdemServicoServico(servico_id=j + 1, valor=50 + j, categoria="Manutenção") for j in range(itens)]
+      session.add(ordem)
+    session.commit()
+
+def test_list_carrega_cliente_e_mecanico_em_uma_instrucao(banco):
+  popular(banco)
+  with ReadSessionLocal() as session, instrucoes(read_engine) as executadas:
+    ordens = ordem_servico_repository.list(session, limit=10)
+    nomes = [(ordem.cliente.nome, ordem.mecanico.nome) for ordem in ordens]
+    
+    ultima = ordens[-1]
+    seguintes = ordem_servico_repository.list(session, limit=10, cursor=(ultima.data_abertura, ultima.id))
+    nomes += [(ordem.cliente.nome, ordem.mecanico.nome) for ordem in seguintes]
+
+  assert len(ordens) == 10 and len(seguintes) == 2 and len(nomes) == 12
+  assert len(executadas) == 2
+
+def test_get_usa_duas_instrucoes_qualquer_que_seja_o_numero_de_itens(banco):
+  popular(banco, ordens=1, itens=6)
+  with ReadSessionLocal() as session, instrucoes(read_engine) as executadas:
+    ordem = ordem_servico_repository.get(session, 1)
+
+  assert len(ordem.pecas) == 6 and len(ordem.servicos) == 6
+  assert len(executadas) == 2
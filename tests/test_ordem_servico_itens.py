@@ -0,0 +1,223 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pytest
+from db.session import run
+from exceptions.exceptions import BadRequestException
+from models.models import Cliente, Mecanico, OrdemServico, OrdemServicoPeca, OrdemServicoServico, Peca, RelatorioOrdem, Servico
+from schemas.ordem_servico_schema import OrdemServicoItemOperacao, OrdemServicoPecaCreate
+import repositories.catalog_cache as catalog_cache
+import repositories.ordem_servico_repository as ordem_servico_repository
+import repositories.peca_repository as peca_repository
+import repositories.relatorio_repository as relatorio_repository
+import repositories.servico_repository as servico_repository
+
+PRECOS_PECAS = {1: 10.5, 2: 11.25, 3: 12.1}
+PRECOS_SERVICOS = {1: 50.25, 2: 51.5, 3: 52.75}
+
+def preparar(SessionLocal):
+  with SessionLocal() as session:
+    session.add(Cliente(nome="Cliente", sobrenome="Silva", endereco="Rua A", telefone="119999"))
+    session.add(Mecanico(nome="Mecânico", sobrenome="Souza", telefone="119999", email="m@oficina.com"))
+    session.add_all([Peca(id=id, nome=f"Peça {id}", marca="Bosch", modelo=f"M{id}", valor=valor) for id, valor in PRECOS_PECAS.items()])
+    session.add_all([
+      Servico(id=id, nome=f"Serviço {id}", valor=valor, ativo=True, categoria="Manutenção") for id, valor in PRECOS_SERVICOS.items()
+    ])
+    session.flush()
+    session.add(OrdemServico(cliente_id=1, mecanico_id=1, data_abertura=datetime(2025, 1, 1), situacao="pendente", valor_servicos=0, valor_pecas=0))
+    session.commit()
+
+def executar(SessionLocal, fn, *args):
+  # Como uma rota de escrita: uma sessão por chamada, com os retries de db.session.run e o commit no fim
+  with SessionLocal() as session:
+    try:
+      asyncio.run(run(session, fn, *args))
+    except BadRequestException:
+      session.rollback()
+      return False
+    session.commit()
+    return True
+
+def test_inclusoes_simultaneas_nao_perdem_quantidade(banco):
+  preparar(banco)
+  pecas = [(i % 3 + 1, i % 4 + 1) for i in range(120)]
+  servicos = [i % 3 + 1 for i in range(30)]
+
+  with ThreadPoolExecutor(max_workers=8) as executor:
+    resultados_pecas = list(executor.map(
+      lambda item: executar(banco, ordem_servico_repository.add_peca, 1, OrdemServicoPecaCreate(peca_id=item[0], quantidade=item[1])),
+      pecas,
+    ))
+    resultados_servicos = list(executor.map(
+      lambda servico_id: executar(banco, ordem_servico_repository.add_servico, 1, servico_id),
+      servicos,
+    ))
+
+  esperado = {}
+  for peca_id, quantidade in pecas:
+    esperado[peca_id] = esperado.get(peca_id, 0) + quantidade
+  
+  with banco() as session:
+    ordem = session.get(OrdemServico, 1)
+    gravadas = {item.peca_id: item.quantidade for item in session.query(OrdemServicoPeca).filter_by(ordem_servico_id=1)}
+    incluidos = sorted(item.servico_id for item in session.query(OrdemServicoServico).filter_by(ordem_servico_id=1))
+
+  assert all(resultados_pecas)
+  # Cada serviço entra uma única vez; as outras inclusões do mesmo serviço respondem 400
+  assert sum(resultados_servicos) == len(PRECOS_SERVICOS)
+  assert incluidos == sorted(PRECOS_SERVICOS)
+  assert gravadas == esperado
+  assert ordem.valor_pecas == pytest.approx(sum(PRECOS_PECAS[peca_id] * quantidade for peca_id, quantidade in esperado.items()), abs=0.005)
+  assert ordem.valor_servicos == pytest.approx(sum(PRECOS_SERVICOS.values()), abs=0.005)
+
+def test_inclusoes_e_remocoes_simultaneas_mantem_subtotais(banco):
+  preparar(banco)
+  operacoes = []
+  for i in range(90):
+    peca_id = i % 3 + 1
+    operacoes.append((ordem_servico_repository.add_peca, 1, OrdemServicoPecaCreate(peca_id=peca_id, quantidade=i % 4 + 1)))
+    if i % 2:
+      operacoes.append((ordem_servico_repository.remove_peca, 1, peca_id))
+    operacoes.append((ordem_servico_repository.add_servico if i % 3 else ordem_servico_repository.remove_servico, 1, i % 3 + 1))
+
+  with ThreadPoolExecutor(max_workers=8) as executor:
+    list(executor.map(lambda operacao: executar(banco, *operacao), operacoes))
+
+  with banco() as session:
+    ordem = session.get(OrdemServico, 1)
+    pecas = session.query(OrdemServicoPeca).filter_by(ordem_servico_id=1).all()
+    servicos = session.query(OrdemServicoServico).filter_by(ordem_servico_id=1).all()
+    resumo = session.query(RelatorioOrdem).filter_by(situacao="pendente").one()
+
+  # Qualquer que seja a ordem em que as threads rodaram, os subtotais batem com as linhas que sobraram
+  assert all(item.valor_total == pytest.approx(PRECOS_PECAS[item.peca_id] * item.quantidade, abs=0.005) for item in pecas)
+  assert ordem.valor_pecas == pytest.approx(sum(item.valor_total for item in pecas), abs=0.005)
+  assert ordem.valor_servicos == pytest.approx(sum(PRECOS_SERVICOS[item.servico_id] for item in servicos), abs=0.005)
+  assert (resumo.valor_pecas, resumo.valor_servicos) == pytest.approx((ordem.valor_pecas, ordem.valor_servicos), abs=0.005)
+
+def operacao(acao, tipo, id, quantidade=1):
+  return OrdemServicoItemOperacao(acao=acao, tipo=tipo, id=id, quantidade=quantidade)
+
+def test_itens_em_lote_seguem_a_ordem_das_operacoes(banco):
+  preparar(banco)
+  executar(banco, ordem_servico_repository.add_peca, 1, OrdemServicoPecaCreate(peca_id=1, quantidade=2))
+  executar(banco, ordem_servico_repository.add_servico, 1, 1)
+
+  aplicado = executar(banco, ordem_servico_repository.apply_itens, 1, [
+    operacao("adicionar", "peca", 1), operacao("remover", "peca", 1), operacao("adicionar", "peca", 1, 3),
+    operacao("adicionar", "peca", 2), operacao("adicionar", "peca", 2, 2),
+    operacao("remover", "servico", 1), operacao("adicionar", "servico", 2),
+    operacao("adicionar", "servico", 3), operacao("remover", "servico", 3),
+  ])
+  # Lotes inválidos não alteram nada: remover o que não está na ordem, incluir um serviço repetido
+  invalidos = [
+    executar(banco, ordem_servico_repository.apply_itens, 1, [operacao("adicionar", "peca", 3), operacao("remover", "peca", 3), operacao("remover", "peca", 3)]),
+    executar(banco, ordem_servico_repository.apply_itens, 1, [operacao("adicionar", "peca", 3), operacao("adicionar", "servico", 2)]),
+  ]
+
+  with banco() as session:
+    ordem = session.get(OrdemServico, 1)
+    pecas = {item.peca_id: (item.quantidade, item.valor_total) for item in session.query(OrdemServicoPeca).filter_by(ordem_servico_id=1)}
+    servicos = [item.servico_id for item in session.query(OrdemServicoServico).filter_by(ordem_servico_id=1)]
+    categorias = relatorio_repository.categorias(session, 1)
+    resumo = session.query(RelatorioOrdem).filter_by(situacao="pendente").one()
+
+  assert aplicado and invalidos == [False, False]
+  assert pecas == {1: (3, 31.5), 2: (3, 33.75)}
+  assert servicos == [2]
+  assert (ordem.valor_pecas, ordem.valor_servicos) == (65.25, 51.5)
+  assert categorias == {"Manutenção": (1, 51.5)}
+  assert (resumo.valor_pecas, resumo.valor_servicos) == (65.25, 51.5)
+
+def test_itens_em_lote_simultaneos_com_inclusoes(banco):
+  preparar(banco)
+  tarefas = []
+  for i in range(60):
+    if i % 2:
+      tarefas.append((ordem_servico_repository.apply_itens, 1, [operacao("adicionar", "peca", 1, 2), operacao("adicionar", "peca", 2)]))
+    else:
+      tarefas.append((ordem_servico_repository.add_peca, 1, OrdemServicoPecaCreate(peca_id=1, quantidade=1)))
+
+  with ThreadPoolExecutor(max_workers=8) as executor:
+    resultados = list(executor.map(lambda tarefa: executar(banco, *tarefa), tarefas))
+
+  with banco() as session:
+    ordem = session.get(OrdemServico, 1)
+    pecas = {item.peca_id: item.quantidade for item in session.query(OrdemServicoPeca).filter_by(ordem_servico_id=1)}
+
+  assert all(resultados)
+  assert pecas == {1: 90, 2: 30}
+  assert ordem.valor_pecas == pytest.approx(90 * PRECOS_PECAS[1] + 30 * PRECOS_PECAS[2], abs=0.005)
+
+def test_alteracao_de_preco_nao_muda_itens_ja_incluidos(banco):
+  preparar(banco)
+  
+  def passo(fn, *args):
+    with banco() as session:
+      fn(session, *args)
+      session.commit()
+
+  passo(ordem_servico_repository.add_peca, 1, OrdemServicoPecaCreate(peca_id=1, quantidade=2))
+  passo(ordem_servico_repository.add_servico, 1, 1)
+  passo(peca_repository.update, 1, {"valor": 15.0})
+  passo(servico_repository.update, 1, {"valor": 80.0, "categoria": "Revisão"})
+  passo(ordem_servico_repository.remove_peca, 1, 1)
+  passo(ordem_servico_repository.add_peca, 1, OrdemServicoPecaCreate(peca_id=1, quantidade=2))
+  passo(ordem_servico_repository.concluir, 1)
+
+  with banco() as session:
+    ordem = session.get(OrdemServico, 1)
+    mecanicos = relatorio_repository.receita_por_mecanico(session)
+    categorias = relatorio_repository.receita_por_categoria(session)
+
+  # A peça removida sai pelo valor em que entrou (10.5 × 2) e volta pelo novo (15 × 2); o serviço fica no preço antigo
+  assert (ordem.valor_pecas, ordem.valor_servicos, ordem.valor) == (30.0, 50.25, 80.25)
+  assert [(linha["valor_pecas"], linha["valor_servicos"]) for linha in mecanicos] == [(30.0, 50.25)]
+  assert [(linha["categoria"], linha["valor"]) for linha in categorias] == [("Manutenção", 50.25)]
+
+def test_correcao_dos_subtotais_acerta_os_resumos(banco):
+  preparar(banco)
+  executar(banco, ordem_servico_repository.add_peca, 1, OrdemServicoPecaCreate(peca_id=1, quantidade=2))
+  executar(banco, ordem_servico_repository.add_servico, 1, 2)
+  with banco() as session:
+    # Simula um subtotal que divergiu dos itens, junto com o resumo que o acompanhou
+    session.query(OrdemServico).filter_by(id=1).update({"valor_pecas": 99.0})
+    session.query(RelatorioOrdem).update({"valor_pecas": 99.0})
+    session.commit()
+
+  with banco() as session:
+    divergentes = ordem_servico_repository.recalcular_totais(session, corrigir=True)
+    session.commit()
+
+  with banco() as session:
+    ordem = session.get(OrdemServico, 1)
+    resumo = session.query(RelatorioOrdem).filter_by(situacao="pendente").one()
+
+  assert [item["id"] for item in divergentes] == [1]
+  assert (ordem.valor_pecas, ordem.valor_servicos) == (21.0, 51.5)
+  assert (resumo.ordens, resumo.valor_pecas, resumo.valor_servicos) == (1, 21.0, 51.5)
+
+def test_inclusao_usa_o_preco_do_banco_e_nao_o_do_cache(banco):
+  preparar(banco)
+  with banco() as session:
+    catalog_cache.pecas.get_many(session, [1, 2])
+    catalog_cache.servicos.get(session, 1)
+    # Outro processo altera os preços: o cache deste continua com as linhas antigas até o TTL
+    session.query(Peca).filter_by(id=1).update({"valor": 2.675})
+    session.query(Peca).filter_by(id=2).update({"valor": 0.125})
+    session.query(Servico).filter_by(id=1).update({"valor": 60.0, "categoria": "Revisão"})
+    session.commit()
+
+  executar(banco, ordem_servico_repository.add_peca, 1, OrdemServicoPecaCreate(peca_id=1, quantidade=1))
+  executar(banco, ordem_servico_repository.add_servico, 1, 1)
+  executar(banco, ordem_servico_repository.apply_itens, 1, [operacao("adicionar", "peca", 2)])
+
+  with banco() as session:
+    ordem = session.get(OrdemServico, 1)
+    pecas = {item.peca_id: item.valor_total for item in session.query(OrdemServicoPeca).filter_by(ordem_servico_id=1)}
+    categorias = relatorio_repository.categorias(session, 1)
+
+  # Meio centavo é arredondado pelo SQLite, igual na linha e no subtotal
+  assert pecas == {1: 2.68, 2: 0.13}
+  assert (ordem.valor_pecas, ordem.valor_servicos) == (2.81, 60.0)
+  assert categorias == {"Revisão": (1, 60.0)}
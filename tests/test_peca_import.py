@@ -0,0 +1,27 @@
+import io
+from models.models import Peca
+import repositories.peca_repository as peca_repository
+
+def test_importacao_conta_inseridos_e_atualizados_pelas_chaves(banco):
+  with banco() as session:
+    session.add(Peca(nome="Filtro", marca="Bosch", modelo="F1", valor=10.0))
+    session.commit()
+
+  arquivo = io.StringIO(
+    "nome,marca,modelo,valor\n"
+    "Filtro novo,Bosch,F1,12.5\n"
+    "Vela,NGK,V1,\"1.234,56\"\n"
+    "Vela,NGK,V1,20\n"
+    "Pastilha,Cobreq,P1,30\n"
+    "Inválida,Cobreq,P2,abc\n"
+  )
+  with banco() as session:
+    # Lotes de 3 linhas: V1 se repete no mesmo lote, então entra uma vez e é atualizada na outra
+    resumo = peca_repository.import_csv(session, arquivo, chunk_size=3)
+    session.commit()
+
+  with banco() as session:
+    pecas = {peca.modelo: peca.valor for peca in session.query(Peca)}
+
+  assert (resumo["inseridos"], resumo["atualizados"], resumo["rejeitados"]) == (2, 2, 1)
+  assert pecas == {"F1": 12.5, "V1": 20.0, "P1": 30.0}